@@ -14,13 +14,13 @@ class DataSourceAdmin(admin.ModelAdmin):
         "get_external_source",
         "get_session_count",
     )
-    list_filter = ("company", "uploaded_at")
+    list_filter = ("company", "uploaded_at", ("previewed_at", admin.EmptyFieldListFilter))
     search_fields = ("name", "description", "company__name")
     ordering = ("-uploaded_at",)
     readonly_fields = ("get_external_data_status",)
 
     fieldsets = (
-        (None, {"fields": ("name", "description", "company")}),
+        (None, {"fields": ("name", "description", "company", "previewed_at")}),
         (
             "Data Source",
             {
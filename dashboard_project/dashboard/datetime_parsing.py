@@ -0,0 +1,172 @@
+# dashboard/datetime_parsing.py
+
+from datetime import datetime
+
+import pandas as pd
+from django.utils import timezone
+
+# Formats tried when detecting the datetime format of a file, in order of preference.
+# When a sample matches several formats equally well (e.g. 01/02/2025), the first one wins.
+DATETIME_FORMATS = [
+    "%d.%m.%Y %H:%M:%S",  # European format: DD.MM.YYYY HH:MM:SS
+    "%Y-%m-%d %H:%M:%S",  # ISO format: YYYY-MM-DD HH:MM:SS
+    "%m/%d/%Y %H:%M:%S",  # US format: MM/DD/YYYY HH:MM:SS
+    "%d/%m/%Y %H:%M:%S",  # European format with slashes: DD/MM/YYYY HH:MM:SS
+    "%Y-%m-%dT%H:%M:%S",  # ISO format with T separator
+    "%Y-%m-%dT%H:%M:%S.%f%z",  # ISO format with milliseconds and UTC offset or Z
+    "%Y-%m-%dT%H:%M:%S%z",  # ISO format with UTC offset or Z
+    "%Y-%m-%d %H:%M:%S%z",  # ISO format with space separator and UTC offset
+    "%Y-%m-%d %H:%M",  # ISO format without seconds
+    "%d.%m.%Y %H:%M",  # European format without seconds
+    "%Y-%m-%d",  # Date only
+]
+
+# Number of non-empty values inspected when detecting a format
+DETECTION_SAMPLE_SIZE = 1000
+
+# Values pandas parses as the current date or time, whatever the format
+RELATIVE_DATETIMES = ["now", "today"]
+
+
+def _localize(parsed, tz):
+    """
+    Make a parsed datetime column timezone-aware in ``tz``
+
+    Like ``make_aware``, ambiguous local times (in the hour repeated when DST ends)
+    are taken as the first, DST occurrence, and local times that don't exist (in
+    the hour skipped when DST starts) are moved forward to the end of the gap, so
+    neither is lost.
+    """
+    if parsed.dtype == object:
+        # Mixed UTC offsets can't share one dtype; normalise them through UTC
+        parsed = pd.to_datetime(parsed, errors="coerce", utc=True)
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        return parsed.dt.tz_convert(tz)
+    return parsed.dt.tz_localize(tz, ambiguous=True, nonexistent="shift_forward")
+
+
+def _to_datetime(values, datetime_format):
+    """Parse a column of raw values with one format; values that don't match it become NaT"""
+    parsed = pd.to_datetime(values, format=datetime_format, errors="coerce")
+    return parsed.where(~values.isin(RELATIVE_DATETIMES))
+
+
+def _non_empty(values):
+    """Return the non-empty values of a column as stripped strings"""
+    series = pd.Series(values, dtype=object).dropna().astype(str).str.strip()
+    return series[series != ""]
+
+
+class DatetimeParser:
+    """
+    Datetime parser that detects the format of a column once and then reuses it
+
+    The format is chosen from a sample of values (see ``detect``). Whole columns
+    are then parsed in one vectorized pass with that format, and only the values
+    that don't match it are parsed again with the other formats. Single values
+    are parsed with the detected format first, so the other formats are only
+    tried (and only raise) for outliers.
+    """
+
+    def __init__(self, formats=None, datetime_format=None):
+        self.formats = list(formats or DATETIME_FORMATS)
+        self.format = datetime_format
+
+    def __repr__(self):
+        return f"DatetimeParser(format={self.format!r})"
+
+    def detect(self, values):
+        """
+        Pick the format that parses the most values of a sample
+
+        Args:
+            values: Iterable of raw values; only the first ``DETECTION_SAMPLE_SIZE``
+                    non-empty values are inspected
+
+        Returns:
+            str: The detected format, or None if no format matched any value
+        """
+        sample = _non_empty(values).head(DETECTION_SAMPLE_SIZE)
+        best_format, best_count = None, 0
+        for datetime_format in self.formats:
+            count = _to_datetime(sample, datetime_format).notna().sum()
+            if count > best_count:
+                best_format, best_count = datetime_format, count
+            if best_count == len(sample):
+                break
+        self.format = best_format
+        return best_format
+
+    def _fallback_formats(self):
+        return [datetime_format for datetime_format in self.formats if datetime_format != self.format]
+
+    def parse_column(self, series, tz=None):
+        """
+        Parse a column to timezone-aware datetimes
+
+        Values that match none of the formats become NaT. Naive values are interpreted in
+        ``tz`` (the current Django timezone by default), the same way
+        ``make_aware`` does for single values.
+
+        Args:
+            series: Column of raw values
+            tz: Timezone for naive values
+
+        Returns:
+            Series: Timezone-aware datetime column
+        """
+        tz = tz or timezone.get_current_timezone()
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            # Columnar files (e.g. Parquet) store timestamps natively
+            return _localize(series, tz)
+        if self.format is None:
+            self.detect(series)
+
+        if self.format:
+            parsed = _localize(_to_datetime(series, self.format), tz)
+        else:
+            parsed = pd.Series(pd.NaT, index=series.index, dtype=pd.DatetimeTZDtype(tz=tz))
+
+        outliers = parsed.isna() & series.notna()
+        if not outliers.any():
+            return parsed
+
+        # Only the rows that didn't match the detected format get the slower fallbacks
+        remaining = series[outliers]
+        for datetime_format in self._fallback_formats():
+            reparsed = _localize(_to_datetime(remaining, datetime_format), tz)
+            matched = reparsed.notna()
+            parsed = parsed.where(~parsed.index.isin(reparsed.index[matched]), reparsed.reindex(parsed.index))
+            remaining = remaining[~matched]
+            if remaining.empty:
+                break
+        return parsed
+
+    def parse(self, value):
+        """
+        Parse a single value to a timezone-aware datetime
+
+        The detected format is tried first. If no format was detected yet, the first
+        format that matches becomes the preferred one, so a feed settles on its
+        format after the first value.
+
+        Args:
+            value: Raw value
+
+        Returns:
+            datetime: Timezone-aware datetime, or None if the value can't be parsed
+        """
+        if not value or not str(value).strip():
+            return None
+        value = str(value).strip()
+
+        formats = [self.format, *self._fallback_formats()] if self.format else self.formats
+        for datetime_format in formats:
+            try:
+                parsed = datetime.strptime(value, datetime_format)
+            except (ValueError, TypeError):
+                continue
+            if self.format is None:
+                self.format = datetime_format
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+        return None
@@ -0,0 +1,258 @@
+# dashboard/file_formats.py
+
+import gzip
+import os
+
+import pandas as pd
+
+# Parquet and Arrow IPC uploads need pyarrow, zstd-compressed CSV needs zstandard.
+# Both are optional; plain and gzip-compressed CSV work without them.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from pyarrow import ipc
+except ImportError:
+    pa = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+# Supported file name suffixes, mapped to (file format, compression)
+FILE_EXTENSIONS = {
+    ".csv": (FORMAT_CSV, None),
+    ".csv.gz": (FORMAT_CSV, "gzip"),
+    ".csv.zst": (FORMAT_CSV, "zstd"),
+    ".parquet": (FORMAT_PARQUET, None),
+    ".arrow": (FORMAT_ARROW, None),
+    ".feather": (FORMAT_ARROW, None),
+    ".ipc": (FORMAT_ARROW, None),
+}
+
+OPTIONAL_DEPENDENCY_HINT = "Install it with: pip install 'livegraphsdjango[columnar]'"
+
+
+def get_file_format(file_name):
+    """
+    Determine the format of an uploaded file from its name
+
+    Args:
+        file_name: Name or path of the file
+
+    Returns:
+        tuple: (file format, compression), where compression is None, "gzip" or "zstd"
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    name = os.path.basename(str(file_name)).lower()
+    # Check the longest suffixes first, so that .csv.gz is not taken for something else
+    for extension in sorted(FILE_EXTENSIONS, key=len, reverse=True):
+        if name.endswith(extension):
+            return FILE_EXTENSIONS[extension]
+    raise ValueError(f"Unsupported file type. Supported types are: {', '.join(FILE_EXTENSIONS)}")
+
+
+def check_dependencies(file_format, compression=None):
+    """
+    Raise ImportError if a library needed to read the given format is not installed
+
+    Args:
+        file_format: One of the ``FORMAT_*`` constants
+        compression: Compression returned by ``get_file_format``
+    """
+    if file_format in (FORMAT_PARQUET, FORMAT_ARROW) and pa is None:
+        raise ImportError(f"Reading {file_format} files requires pyarrow. {OPTIONAL_DEPENDENCY_HINT}")
+    if compression == "zstd" and zstandard is None:
+        raise ImportError(f"Reading zstd-compressed files requires zstandard. {OPTIONAL_DEPENDENCY_HINT}")
+
+
+def _to_pandas(table, dtype):
+    """
+    Convert an Arrow table or record batch to a DataFrame
+
+    Columns that ``dtype`` maps to ``str`` are cast to strings first, like ``read_csv``
+    does for CSV files, so e.g. integer session IDs keep their exact value.
+    """
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    for name, column_type in (dtype or {}).items():
+        index = table.schema.get_field_index(name)
+        if column_type is not str or index == -1:
+            continue
+        field_type = table.schema.field(index).type
+        if not (pa.types.is_string(field_type) or pa.types.is_large_string(field_type)):
+            table = table.set_column(index, name, table.column(index).cast(pa.string()))
+    return table.to_pandas()
+
+
+def _open_arrow(source):
+    """Open an Arrow IPC file, falling back to the IPC stream format"""
+    try:
+        return ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return ipc.open_stream(source)
+
+
+def _iter_record_batches(file_path, file_format, chunksize):
+    """
+    Yield ``(record batch, bytes_read)`` from a memory-mapped Parquet or Arrow IPC file
+
+    Batches are zero-copy slices of at most ``chunksize`` rows. For formats that
+    know their row count up front, ``bytes_read`` is estimated from the number of
+    rows read so far.
+    """
+    total_bytes = os.path.getsize(file_path)
+
+    with pa.memory_map(file_path) as source:
+        if file_format == FORMAT_PARQUET:
+            parquet_file = pq.ParquetFile(source)
+            total_rows = parquet_file.metadata.num_rows
+            batches = parquet_file.iter_batches(batch_size=chunksize)
+        else:
+            reader = _open_arrow(source)
+            if isinstance(reader, ipc.RecordBatchFileReader):
+                batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+                total_rows = sum(batch.num_rows for batch in batches)
+            else:
+                # Streams don't know their length, but are read front to back
+                batches, total_rows = reader, None
+
+        rows_read = 0
+        for batch in batches:
+            for offset in range(0, batch.num_rows, chunksize):
+                piece = batch.slice(offset, chunksize)
+                rows_read += piece.num_rows
+                yield piece, total_bytes * rows_read // total_rows if total_rows else source.tell()
+
+
+def iter_frames(file_path, chunksize, dtype=None, csv_options=None):
+    """
+    Read an uploaded file in chunks of at most ``chunksize`` rows
+
+    CSV files are parsed by pandas, decompressing gzip and zstd files as a
+    stream. Parquet and Arrow IPC files are memory-mapped and read one record
+    batch at a time.
+
+    Args:
+        file_path: Path of the file
+        chunksize: Maximum number of rows per chunk
+        dtype: Column types, as for ``pandas.read_csv``
+        csv_options: Extra ``pandas.read_csv`` arguments for CSV files, e.g. ``sep``
+
+    Yields:
+        tuple: (DataFrame, number of bytes of the file read so far)
+    """
+    file_format, compression = get_file_format(file_path)
+    check_dependencies(file_format, compression)
+
+    if file_format == FORMAT_CSV:
+        with (
+            open(file_path, "rb") as handle,
+            pd.read_csv(
+                handle, dtype=dtype, chunksize=chunksize, compression=compression, **(csv_options or {})
+            ) as reader,
+        ):
+            for chunk in reader:
+                yield chunk, handle.tell()
+        return
+
+    for batch, bytes_read in _iter_record_batches(file_path, file_format, chunksize):
+        yield _to_pandas(batch, dtype), bytes_read
+
+
+def read_frame(file_path, dtype=None, csv_options=None):
+    """
+    Read a whole uploaded file into a DataFrame
+
+    Args:
+        file_path: Path of the file
+        dtype: Column types, as for ``pandas.read_csv``
+        csv_options: Extra ``pandas.read_csv`` arguments for CSV files, e.g. ``sep``
+
+    Returns:
+        DataFrame: All rows of the file
+    """
+    file_format, compression = get_file_format(file_path)
+    check_dependencies(file_format, compression)
+
+    if file_format == FORMAT_CSV:
+        return pd.read_csv(file_path, dtype=dtype, compression=compression, **(csv_options or {}))
+    if file_format == FORMAT_PARQUET:
+        return _to_pandas(pq.read_table(file_path, memory_map=True), dtype)
+    with pa.memory_map(file_path) as source:
+        return _to_pandas(_open_arrow(source).read_all(), dtype)
+
+
+def read_head_bytes(file_path, size):
+    """
+    Read the first ``size`` bytes of the content of a (possibly compressed) CSV file
+
+    Args:
+        file_path: Path of the file
+        size: Number of decompressed bytes to read
+
+    Returns:
+        tuple: (content bytes, bytes of the file consumed, whether the whole file was read)
+    """
+    _, compression = get_file_format(file_path)
+    check_dependencies(FORMAT_CSV, compression)
+
+    with open(file_path, "rb") as handle:
+        if compression == "gzip":
+            stream = gzip.GzipFile(fileobj=handle)
+        elif compression == "zstd":
+            stream = zstandard.ZstdDecompressor().stream_reader(handle)
+        else:
+            stream = handle
+
+        # Decompressing readers may return fewer bytes than asked for before the end
+        data = bytearray()
+        while len(data) < size and (block := stream.read(size - len(data))):
+            data += block
+        return bytes(data), handle.tell(), len(data) < size
+
+
+def read_head_rows(file_path, nrows, dtype=None):
+    """
+    Read the first rows of a Parquet or Arrow IPC file without reading the rest
+
+    Args:
+        file_path: Path of the file
+        nrows: Maximum number of rows to read
+        dtype: Column types, as for ``pandas.read_csv``
+
+    Returns:
+        tuple: (DataFrame, number of rows in the file, whether that number is exact)
+    """
+    file_format, compression = get_file_format(file_path)
+    check_dependencies(file_format, compression)
+
+    with pa.memory_map(file_path) as source:
+        if file_format == FORMAT_PARQUET:
+            parquet_file = pq.ParquetFile(source)
+            schema = parquet_file.schema_arrow
+            batch = next(parquet_file.iter_batches(batch_size=nrows), None)
+            total_rows, exact = parquet_file.metadata.num_rows, True
+        else:
+            reader = _open_arrow(source)
+            schema = reader.schema
+            if isinstance(reader, ipc.RecordBatchFileReader):
+                batches = [reader.get_batch(i) for i in range(reader.num_record_batches)]
+                batch = batches[0] if batches else None
+                total_rows, exact = sum(record_batch.num_rows for record_batch in batches), True
+            else:
+                # Streams don't record their length; estimate it from the first batch
+                batch = next(iter(reader), None)
+                total_rows = round(batch.num_rows * os.path.getsize(file_path) / source.tell()) if batch else 0
+                exact = batch is None
+
+        if batch is None:
+            batch = pa.RecordBatch.from_pylist([], schema=schema)
+        return _to_pandas(batch.slice(0, nrows), dtype), total_rows, exact
@@ -2,20 +2,33 @@
 
 from django import forms
 
+from .file_formats import FILE_EXTENSIONS, check_dependencies, get_file_format
 from .models import Dashboard, DataSource
 
 
 class DataSourceUploadForm(forms.ModelForm):
-    """Form for uploading CSV files"""
+    """Form for uploading CSV, compressed CSV, Parquet and Arrow IPC files"""
 
     class Meta:
         model = DataSource
         fields = ["name", "description", "file"]
+        widgets = {
+            "file": forms.ClearableFileInput(attrs={"accept": ",".join(FILE_EXTENSIONS)}),
+        }
 
     def __init__(self, *args, **kwargs):
         self.company = kwargs.pop("company", None)
         super().__init__(*args, **kwargs)
 
+    def clean_file(self):
+        file = self.cleaned_data.get("file")
+        if file:
+            try:
+                check_dependencies(*get_file_format(file.name))
+            except (ValueError, ImportError) as e:
+                raise forms.ValidationError(str(e)) from e
+        return file
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         if self.company:
@@ -37,7 +50,9 @@ class DashboardForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         if self.company:
-            self.fields["data_sources"].queryset = DataSource.objects.filter(company=self.company)
+            self.fields["data_sources"].queryset = DataSource.objects.filter(
+                company=self.company, previewed_at__isnull=True
+            )
 
     def save(self, commit=True):
         instance = super().save(commit=False)
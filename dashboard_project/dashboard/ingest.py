@@ -0,0 +1,738 @@
+# dashboard/ingest.py
+
+import io
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+import zoneinfo
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+import numpy as np
+import pandas as pd
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .datetime_parsing import DETECTION_SAMPLE_SIZE, DatetimeParser
+from .file_formats import iter_frames
+from .models import ChatSession, DataSource
+from .validation import validate_rows
+
+logger = logging.getLogger(__name__)
+
+# Values (lower-cased) that are treated as True for boolean columns
+TRUE_VALUES = ["true", "yes", "1", "t", "y"]
+
+# Column groups, keyed by how they are converted
+DATETIME_COLUMNS = ["start_time", "end_time"]
+BOOLEAN_COLUMNS = ["escalated", "forwarded_hr"]
+INTEGER_COLUMNS = ["messages_sent", "tokens"]
+FLOAT_COLUMNS = ["avg_response_time", "tokens_eur"]
+TEXT_COLUMNS = [
+    "session_id",
+    "country",
+    "language",
+    "sentiment",
+    "full_transcript",
+    "category",
+    "initial_msg",
+    "user_rating",
+]
+NULLABLE_TEXT_COLUMNS = ["ip_address"]
+
+SESSION_FIELDS = (
+    DATETIME_COLUMNS + BOOLEAN_COLUMNS + INTEGER_COLUMNS + FLOAT_COLUMNS + TEXT_COLUMNS + NULLABLE_TEXT_COLUMNS
+)
+
+# Fields written when an existing session is updated by an upsert
+UPSERT_FIELDS = [name for name in SESSION_FIELDS if name != "session_id"]
+
+# Bytes read at a time while looking for shard boundaries
+SHARD_SCAN_BLOCK_SIZE = 1024 * 1024
+
+# Counters reported by the ingest functions
+INGEST_COUNTS = ["created", "updated", "unchanged", "rejected"]
+
+# Read free-text columns as strings so that e.g. numeric session IDs are not turned into floats
+CSV_DTYPES = dict.fromkeys(TEXT_COLUMNS + NULLABLE_TEXT_COLUMNS, str)
+
+
+def _column(df, name):
+    """Return a column of the DataFrame, or an all-null column if it is missing"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series(np.nan, index=df.index, dtype=object)
+
+
+def detect_datetime_formats(df):
+    """
+    Detect the format of every datetime column from a sample of rows
+
+    Args:
+        df: DataFrame with raw CSV rows, e.g. the first chunk of a file
+
+    Returns:
+        dict: ``DatetimeParser`` per datetime column, to be reused for the rest of the file
+    """
+    parsers = {}
+    for name in DATETIME_COLUMNS:
+        parsers[name] = DatetimeParser()
+        parsers[name].detect(_column(df, name))
+    return parsers
+
+
+def frame_options(import_options):
+    """
+    Return the ``iter_frames``/``read_frame`` arguments for the options cached by a preview
+
+    Args:
+        import_options: ``DataSource.import_options``; see ``preview.preview_file``
+
+    Returns:
+        dict: ``dtype`` and ``csv_options`` keyword arguments
+    """
+    import_options = import_options or {}
+    dtype = dict(CSV_DTYPES)
+    for column, field in import_options.get("columns", {}).items():
+        if field in CSV_DTYPES:
+            dtype[column] = str
+    return {"dtype": dtype, "csv_options": import_options.get("csv", {})}
+
+
+def map_columns(df, import_options):
+    """
+    Rename the columns of a chunk to ChatSession fields, as mapped by a preview
+
+    Columns that are not imported but are named like a mapped field, e.g. "session_id"
+    when "Session ID" is mapped to session_id, are renamed to "<name> (not imported)" so
+    that every field name is used by a single column.
+    """
+    columns = (import_options or {}).get("columns", {})
+    fields = {field for field in columns.values() if field}
+    renames = {column: field for column, field in columns.items() if field and field != column}
+    renames.update(
+        {column: f"{column} (not imported)" for column, field in columns.items() if not field and column in fields}
+    )
+    return df.rename(columns=renames) if renames else df
+
+
+def cached_datetime_parsers(import_options):
+    """
+    Return parsers for the datetime formats detected by a preview
+
+    Returns:
+        dict: ``DatetimeParser`` per datetime column, or None if no formats were cached
+    """
+    formats = (import_options or {}).get("datetime_formats")
+    if not formats:
+        return None
+    return {name: DatetimeParser(datetime_format=formats.get(name)) for name in DATETIME_COLUMNS}
+
+
+def convert_dataframe(df, tz=None, datetime_parsers=None):
+    """
+    Convert a raw CSV DataFrame to ChatSession field values using column operations
+
+    Args:
+        df: DataFrame as read from the uploaded CSV file
+        tz: Timezone for naive datetimes (defaults to the current Django timezone)
+        datetime_parsers: Parsers returned by ``detect_datetime_formats``. Chunks of one
+                          file should share them so every chunk uses the same formats;
+                          if omitted, the formats are detected from ``df``.
+
+    Returns:
+        DataFrame: One column per ChatSession field, nulls represented as NaN/NaT
+    """
+    converted = pd.DataFrame(index=df.index)
+    datetime_parsers = datetime_parsers or detect_datetime_formats(df)
+
+    for name in DATETIME_COLUMNS:
+        converted[name] = datetime_parsers[name].parse_column(_column(df, name), tz=tz)
+
+    for name in BOOLEAN_COLUMNS:
+        converted[name] = _column(df, name).astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+
+    for name in INTEGER_COLUMNS:
+        numbers = pd.to_numeric(_column(df, name), errors="coerce")
+        # Values that don't fit an int64 (including inf) are rejected by validation
+        converted[name] = numbers.where(numbers.abs() < 2**63).fillna(0).astype("int64")
+
+    for name in FLOAT_COLUMNS:
+        converted[name] = pd.to_numeric(_column(df, name), errors="coerce").astype("float64")
+
+    for name in TEXT_COLUMNS:
+        converted[name] = _column(df, name).fillna("").astype(str)
+
+    for name in NULLABLE_TEXT_COLUMNS:
+        column = _column(df, name).astype(object)
+        converted[name] = column.where(column.notna() & (column.astype(str).str.strip() != ""), None)
+
+    return converted
+
+
+def prepare_chunk(df, tz=None, datetime_parsers=None):
+    """
+    Convert a chunk of raw rows and split off the rows that fail validation
+
+    Args:
+        df: DataFrame as read from the uploaded file, indexed by row number in the file
+        tz: Timezone for naive datetimes (defaults to the current Django timezone)
+        datetime_parsers: Parsers returned by ``detect_datetime_formats``
+
+    Returns:
+        tuple: (converted valid rows, raw rejected rows with an ``errors`` column),
+               both keeping the index of ``df``
+    """
+    converted = convert_dataframe(df, tz=tz, datetime_parsers=datetime_parsers)
+    errors = validate_rows(df, converted)
+    invalid = errors != ""
+    return converted[~invalid], df[invalid].assign(errors=errors[invalid])
+
+
+def _python_values(series):
+    """Return a column as a list of Python values with nulls replaced by None"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return [None if pd.isna(value) else value.to_pydatetime() for value in series]
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def build_sessions(converted, data_source):
+    """
+    Build unsaved ChatSession instances from a converted DataFrame
+
+    Args:
+        converted: DataFrame returned by ``convert_dataframe``
+        data_source: DataSource the sessions belong to
+
+    Returns:
+        list: ChatSession instances ready for ``bulk_create``
+    """
+    columns = [_python_values(converted[name]) for name in SESSION_FIELDS]
+    return [
+        ChatSession(data_source_id=data_source.id, **dict(zip(SESSION_FIELDS, values, strict=True)))
+        for values in zip(*columns, strict=True)
+    ]
+
+
+def upsert_sessions(sessions, data_source, batch_size=None):
+    """
+    Insert new sessions and update changed ones with the database's native upsert
+
+    Rows are written with ``bulk_create(update_conflicts=True)`` (INSERT ... ON
+    CONFLICT DO UPDATE) on the ``(session_id, data_source)`` unique constraint,
+    so re-importing overlapping rows never fails. The current values of each
+    batch are read with one SELECT, which lets unchanged rows be skipped
+    entirely. When a session ID occurs more than once, the last row wins.
+
+    Args:
+        sessions: Unsaved ChatSession instances, e.g. from ``build_sessions``
+        data_source: DataSource the sessions belong to
+        batch_size: Maximum number of rows per SELECT and INSERT statement
+
+    Returns:
+        dict: Number of sessions created, updated and unchanged
+    """
+    counts = dict.fromkeys(INGEST_COUNTS, 0)
+    unique_sessions = list({session.session_id: session for session in sessions}.values())
+    batch_size = min(
+        batch_size or settings.CSV_INGEST_BATCH_SIZE,
+        connection.ops.bulk_batch_size(["session_id", "data_source"], unique_sessions) or 1,
+    )
+
+    for start in range(0, len(unique_sessions), batch_size):
+        batch = unique_sessions[start : start + batch_size]
+        existing = {
+            row[0]: row[1:]
+            for row in ChatSession.objects.filter(
+                data_source=data_source,
+                session_id__in=[session.session_id for session in batch],
+            ).values_list("session_id", *UPSERT_FIELDS)
+        }
+
+        changed = []
+        for session in batch:
+            current = existing.get(session.session_id)
+            if current is None:
+                counts["created"] += 1
+            elif current != tuple(getattr(session, name) for name in UPSERT_FIELDS):
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            changed.append(session)
+
+        if changed:
+            ChatSession.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["session_id", "data_source"],
+                update_fields=UPSERT_FIELDS,
+            )
+
+    return counts
+
+
+def reset_rejects(data_source):
+    """Remove the rejected rows of an earlier import, before importing a file from the start"""
+    if data_source.rejects_file:
+        data_source.rejects_file.delete(save=False)
+    DataSource.objects.filter(pk=data_source.pk).update(rejects_file="", rows_rejected=0)
+    data_source.rows_rejected = 0
+
+
+def append_rejects(data_source, rejects):
+    """
+    Append rejected rows to the rejects file of a DataSource, creating the file if needed
+
+    Args:
+        data_source: DataSource the rows were rejected from
+        rejects: Raw rejected rows with an ``errors`` column, indexed by row number in the file
+    """
+    if not data_source.rejects_file:
+        field = data_source.rejects_file.field
+        data_source.rejects_file.name = field.generate_filename(data_source, f"{data_source.pk}_rejects.csv")
+    path = data_source.rejects_file.path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    report = rejects.drop(columns="errors")
+    report.insert(0, "errors", rejects["errors"])
+    # Row numbers count data records from 1, so the header is not row 1
+    report.insert(0, "row", rejects.index + 1)
+    report.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+
+def write_chunk(converted, data_source, rows_processed, batch_size=None, rejects=None):
+    """
+    Upsert one converted chunk of rows, recording progress on the DataSource
+
+    The sessions and the new ``rows_processed`` value are committed in the same
+    transaction, so after a failure the DataSource points at the first row that
+    still has to be imported.
+
+    Args:
+        converted: Valid rows of the chunk as returned by ``prepare_chunk``
+        data_source: DataSource the sessions belong to
+        rows_processed: Value of ``DataSource.rows_processed`` once this chunk is stored
+        batch_size: Number of rows per SELECT and INSERT statement
+        rejects: Rejected rows of the chunk as returned by ``prepare_chunk``,
+                 appended to the rejects file of the DataSource
+
+    Returns:
+        dict: Number of sessions created, updated and unchanged, and of rows rejected
+    """
+    sessions = build_sessions(converted, data_source)
+    rejected = 0 if rejects is None else len(rejects)
+    with transaction.atomic():
+        counts = upsert_sessions(sessions, data_source, batch_size=batch_size)
+        if rejected:
+            append_rejects(data_source, rejects)
+        DataSource.objects.filter(pk=data_source.pk).update(
+            rows_processed=rows_processed,
+            rows_rejected=F("rows_rejected") + rejected,
+            rejects_file=data_source.rejects_file.name or "",
+        )
+    data_source.rows_processed = rows_processed
+    data_source.rows_rejected += rejected
+    return {**counts, "rejected": rejected}
+
+
+def _ingest_stats(rows, counts, started, data_source, **extra):
+    """Build the statistics dict returned by the ingest functions and log the throughput"""
+    seconds = time.perf_counter() - started
+    stats = {
+        "rows": rows,
+        **counts,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else 0.0,
+        **extra,
+    }
+    logger.info(
+        f"Ingested {rows} rows into data source {data_source.id} "
+        f"({counts['created']} created, {counts['updated']} updated, {counts['unchanged']} unchanged, "
+        f"{counts['rejected']} rejected) "
+        f"in {seconds:.2f}s ({stats['rows_per_second']:.0f} rows/sec)"
+    )
+    return stats
+
+
+def ingest_dataframe(df, data_source, batch_size=None):
+    """
+    Convert a DataFrame and upsert it as ChatSession rows in batches
+
+    Args:
+        df: DataFrame as read from the uploaded CSV file
+        data_source: DataSource the sessions belong to
+        batch_size: Number of rows per SELECT and INSERT statement
+
+    Returns:
+        dict: Ingest statistics (rows, created, updated, unchanged, seconds, rows_per_second)
+    """
+    started = time.perf_counter()
+    reset_rejects(data_source)
+    df = map_columns(df, data_source.import_options)
+    converted, rejects = prepare_chunk(df, datetime_parsers=cached_datetime_parsers(data_source.import_options))
+    counts = write_chunk(converted, data_source, len(df), batch_size=batch_size, rejects=rejects)
+    return _ingest_stats(len(df), counts, started, data_source)
+
+
+def ingest_csv_stream(file_path, data_source, chunksize, batch_size=None, progress_callback=None):
+    """
+    Read an uploaded file in fixed-size chunks, storing each chunk before reading the next
+
+    Any format supported by ``file_formats.iter_frames`` can be streamed: plain,
+    gzip- or zstd-compressed CSV, Parquet and Arrow IPC. Only one chunk is held in memory at a time, so peak memory depends on
+    ``chunksize`` rather than on the size of the file. Rows before
+    ``data_source.rows_processed`` were stored by an earlier, interrupted run and
+    are skipped, which lets a failed import resume where it stopped.
+
+    Args:
+        file_path: Path of the uploaded file
+        data_source: DataSource the sessions belong to
+        chunksize: Number of rows per chunk
+        batch_size: Number of rows per SELECT and INSERT statement
+        progress_callback: Optional callable invoked after every stored chunk with
+                           ``(rows_processed, bytes_read, total_bytes)``
+
+    Returns:
+        dict: Ingest statistics (rows, created, updated, unchanged, seconds, rows_per_second,
+              chunks, resumed_from)
+    """
+    started = time.perf_counter()
+    resume_from = data_source.rows_processed
+    position = 0
+    rows = 0
+    chunks = 0
+    counts = dict.fromkeys(INGEST_COUNTS, 0)
+    import_options = data_source.import_options
+    datetime_parsers = cached_datetime_parsers(import_options)
+
+    total_bytes = os.path.getsize(file_path)
+    if not resume_from:
+        reset_rejects(data_source)
+
+    for frame, bytes_read in iter_frames(file_path, chunksize, **frame_options(import_options)):
+        chunk = map_columns(frame, import_options)
+        if datetime_parsers is None:
+            # Detect the formats on the first chunk, also when resuming, so that a
+            # resumed import parses dates the same way as the original run
+            datetime_parsers = detect_datetime_formats(chunk)
+        chunk_start = position
+        position += len(chunk)
+        if position <= resume_from:
+            continue
+        chunk.index = pd.RangeIndex(chunk_start, position)
+        if chunk_start < resume_from:
+            chunk = chunk.iloc[resume_from - chunk_start :]
+
+        converted, rejects = prepare_chunk(chunk, datetime_parsers=datetime_parsers)
+        chunk_counts = write_chunk(converted, data_source, position, batch_size=batch_size, rejects=rejects)
+        for key, value in chunk_counts.items():
+            counts[key] += value
+        rows += len(chunk)
+        chunks += 1
+        if progress_callback:
+            progress_callback(position, bytes_read, total_bytes)
+
+    if resume_from:
+        logger.info(f"Resumed import of data source {data_source.id} at row {resume_from}")
+    return _ingest_stats(rows, counts, started, data_source, chunks=chunks, resumed_from=resume_from)
+
+
+class IncrementalCSVIngest:
+    """
+    Import a CSV file from a sequence of byte chunks, e.g. while it is being uploaded
+
+    Incoming bytes are buffered until they contain at least ``chunk_bytes`` of
+    complete records. Those records are then parsed and upserted like a chunk of
+    ``ingest_csv_stream``, and removed from the buffer. As for
+    ``find_shard_boundaries``, a newline only ends a record when an even number
+    of quote characters precedes it. The number of quotes in the buffer is kept
+    between chunks, so every byte is scanned once, however large a record gets.
+
+    Progress is recorded in ``data_source.rows_processed``, so a file whose
+    import fails halfway can be finished by ``ingest_csv_stream`` later.
+    """
+
+    def __init__(self, data_source, chunk_bytes, batch_size=None):
+        self.data_source = data_source
+        self.chunk_bytes = chunk_bytes
+        self.batch_size = batch_size
+        self.buffer = bytearray()
+        # Bytes of the buffer scanned for record ends, quotes in them, and end of the last complete record
+        self.scanned = 0
+        self.quotes = 0
+        self.record_end = 0
+        self.columns = None
+        self.datetime_parsers = None
+        self.rows = 0
+        self.chunks = 0
+        self.counts = dict.fromkeys(INGEST_COUNTS, 0)
+        self.started = time.perf_counter()
+
+    def _scan(self):
+        """Move ``record_end`` to the last complete record in the bytes added since the last scan"""
+        start = self.scanned
+        newline = self.buffer.rfind(b"\n", start)
+        quotes = self.quotes + self.buffer.count(b'"', start, max(newline, start))
+        while newline != -1 and quotes % 2:
+            # Newline inside a quoted field
+            previous = self.buffer.rfind(b"\n", start, newline)
+            quotes -= self.buffer.count(b'"', max(previous, start), newline)
+            newline = previous
+        if newline != -1:
+            self.record_end = newline + 1
+        self.quotes += self.buffer.count(b'"', start)
+        self.scanned = len(self.buffer)
+
+    def _read_header(self):
+        """Take the header record off the front of the buffer once it is complete"""
+        newline = self.buffer.find(b"\n")
+        while newline != -1 and self.buffer.count(b'"', 0, newline) % 2:
+            newline = self.buffer.find(b"\n", newline + 1)
+        if newline == -1:
+            return
+        header = bytes(self.buffer[: newline + 1])
+        del self.buffer[: newline + 1]
+        self.columns = pd.read_csv(io.BytesIO(header), nrows=0).columns.tolist()
+
+    def feed(self, data):
+        """Add bytes to the buffer, storing the complete records once there are enough"""
+        self.buffer += data
+        if self.columns is None:
+            self._read_header()
+            if self.columns is None:
+                return
+        self._scan()
+        if self.record_end >= self.chunk_bytes:
+            self._flush(self.record_end)
+
+    def _flush(self, end):
+        """Parse and store the records in the first ``end`` bytes of the buffer"""
+        records = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        # The records hold an even number of quotes, so the parity of the rest is unchanged
+        self.scanned = max(self.scanned - end, 0)
+        self.record_end = max(self.record_end - end, 0)
+        self.quotes %= 2
+
+        chunk = pd.read_csv(io.BytesIO(records), header=None, names=self.columns, dtype=CSV_DTYPES)
+        if chunk.empty:
+            return
+        if self.datetime_parsers is None:
+            self.datetime_parsers = detect_datetime_formats(chunk)
+
+        chunk_start = self.data_source.rows_processed
+        position = chunk_start + len(chunk)
+        chunk.index = pd.RangeIndex(chunk_start, position)
+        converted, rejects = prepare_chunk(chunk, datetime_parsers=self.datetime_parsers)
+        chunk_counts = write_chunk(converted, self.data_source, position, batch_size=self.batch_size, rejects=rejects)
+        for key, value in chunk_counts.items():
+            self.counts[key] += value
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def close(self):
+        """
+        Store the remaining records once all bytes have been fed
+
+        Returns:
+            dict: Ingest statistics (rows, created, updated, unchanged, seconds, rows_per_second, chunks)
+        """
+        if self.columns is None:
+            self._read_header()
+        # The last record may not end with a newline
+        if self.columns is not None and self.buffer.strip():
+            self._flush(len(self.buffer))
+        return _ingest_stats(self.rows, self.counts, self.started, self.data_source, chunks=self.chunks)
+
+
+def find_shard_boundaries(file_path, shard_bytes, quotechar='"'):
+    """
+    Split a CSV file into byte ranges that start and end on record boundaries
+
+    A newline only ends a record when it is not inside a quoted field, i.e. when
+    an even number of quote characters precedes it. The file is scanned once,
+    block by block, counting quotes; escaped quotes (``""``) keep the count even.
+
+    Args:
+        file_path: Path of the CSV file
+        shard_bytes: Approximate size of each shard in bytes
+        quotechar: Quote character of the CSV dialect
+
+    Returns:
+        tuple: (header, shards) where ``header`` is the raw header record and
+               ``shards`` is a list of ``(start, end)`` byte offsets
+    """
+    quote = quotechar.encode()
+    boundaries = []
+    quotes = 0
+    offset = 0
+    target = 0
+
+    with open(file_path, "rb") as handle:
+        while block := handle.read(SHARD_SCAN_BLOCK_SIZE):
+            position = max(target - offset, 0)
+            while position < len(block):
+                newline = block.find(b"\n", position)
+                if newline == -1:
+                    break
+                if (quotes + block.count(quote, 0, newline)) % 2:
+                    # Newline inside a quoted field
+                    position = newline + 1
+                    continue
+                boundaries.append(offset + newline + 1)
+                target = boundaries[-1] + shard_bytes
+                position = target - offset
+            quotes += block.count(quote)
+            offset += len(block)
+
+        if not boundaries or boundaries[-1] < offset:
+            boundaries.append(offset)
+
+        handle.seek(0)
+        header = handle.read(boundaries[0])
+
+    return header, list(zip(boundaries, boundaries[1:], strict=False))
+
+
+def _init_parse_worker():
+    """Set up Django in pool workers that were not forked from an initialised process"""
+    if not apps.ready:
+        django.setup()
+
+
+def parse_shard(file_path, start, end, columns, tz_name, datetime_parsers=None, csv_options=None):
+    """
+    Read and convert the rows in one byte range of a CSV file
+
+    Runs in a worker process, so it only touches the file and never the database.
+    ``datetime_parsers`` are detected once for the whole file by the caller, as a
+    shard on its own may not contain enough rows to tell e.g. DD.MM from MM.DD.
+
+    Returns:
+        tuple: (valid rows, rejected rows) as returned by ``prepare_chunk``, indexed
+               by row number within the shard
+    """
+    with open(file_path, "rb") as handle:
+        handle.seek(start)
+        data = handle.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=CSV_DTYPES, **(csv_options or {}))
+    return prepare_chunk(df, tz=zoneinfo.ZoneInfo(tz_name), datetime_parsers=datetime_parsers)
+
+
+def iter_parsed_shards(file_path, workers, shard_bytes=None, import_options=None):
+    """
+    Parse a CSV file in byte-range shards on a process pool, yielding them in file order
+
+    At most two shards per worker are in flight, so memory stays bounded however
+    large the file is. With a single worker the shards are parsed in-process.
+
+    Args:
+        file_path: Path of the CSV file
+        workers: Number of parser processes
+        shard_bytes: Approximate size of each shard in bytes
+        import_options: Dialect, column mapping and datetime formats cached by a preview
+
+    Yields:
+        tuple: (valid rows, rejected rows, end offset of the shard in bytes), with the
+               rows indexed by row number within the shard
+    """
+    import_options = import_options or {}
+    csv_options = import_options.get("csv", {})
+    header, shards = find_shard_boundaries(
+        file_path, shard_bytes or settings.CSV_INGEST_SHARD_BYTES, quotechar=csv_options.get("quotechar", '"')
+    )
+    # Shards have no header, so they are read with the mapped field names directly
+    header_columns = pd.read_csv(io.BytesIO(header), nrows=0, **csv_options).columns
+    columns = map_columns(pd.DataFrame(columns=header_columns), import_options).columns.tolist()
+    tz_name = timezone.get_current_timezone_name()
+    datetime_parsers = cached_datetime_parsers(import_options) or detect_datetime_formats(
+        pd.read_csv(file_path, nrows=DETECTION_SAMPLE_SIZE, header=0, names=columns, dtype=CSV_DTYPES, **csv_options)
+    )
+    shard_args = (columns, tz_name, datetime_parsers, csv_options)
+
+    if workers <= 1:
+        for start, end in shards:
+            yield *parse_shard(file_path, start, end, *shard_args), end
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker) as executor:
+        pending = deque()
+        shard_iter = iter(shards)
+        for start, end in itertools.islice(shard_iter, workers * 2):
+            pending.append((executor.submit(parse_shard, file_path, start, end, *shard_args), end))
+        while pending:
+            future, end = pending.popleft()
+            for start, next_end in itertools.islice(shard_iter, 1):
+                pending.append((executor.submit(parse_shard, file_path, start, next_end, *shard_args), next_end))
+            yield *future.result(), end
+
+
+def ingest_csv_parallel(file_path, data_source, workers, batch_size=None, progress_callback=None):
+    """
+    Parse a CSV file on several processes and store the rows from a single writer
+
+    The file is split into byte-range shards on record boundaries. Worker
+    processes parse and convert the shards, and this process upserts them in
+    file order, so progress tracking and resuming work as for ``ingest_csv_stream``.
+
+    Args:
+        file_path: Path of the CSV file
+        data_source: DataSource the sessions belong to
+        workers: Number of parser processes
+        batch_size: Number of rows per SELECT and INSERT statement
+        progress_callback: Optional callable invoked after every stored shard with
+                           ``(rows_processed, bytes_read, total_bytes)``
+
+    Returns:
+        dict: Ingest statistics (rows, created, updated, unchanged, seconds, rows_per_second,
+              chunks, resumed_from, workers)
+    """
+    if multiprocessing.current_process().daemon:
+        # Daemonic processes (e.g. Celery prefork workers) can't start child processes
+        logger.warning("Parallel CSV parsing is not available in a daemonic process; parsing in-process")
+        workers = 1
+
+    started = time.perf_counter()
+    resume_from = data_source.rows_processed
+    total_bytes = os.path.getsize(file_path)
+    position = 0
+    rows = 0
+    chunks = 0
+    counts = dict.fromkeys(INGEST_COUNTS, 0)
+
+    if not resume_from:
+        reset_rejects(data_source)
+
+    for converted, rejects, bytes_read in iter_parsed_shards(
+        file_path, workers, import_options=data_source.import_options
+    ):
+        shard_start = position
+        shard_rows = len(converted) + len(rejects)
+        position += shard_rows
+        if position <= resume_from:
+            continue
+        converted.index += shard_start
+        rejects.index += shard_start
+        if shard_start < resume_from:
+            converted = converted[converted.index >= resume_from]
+            rejects = rejects[rejects.index >= resume_from]
+            shard_rows = position - resume_from
+
+        chunk_counts = write_chunk(converted, data_source, position, batch_size=batch_size, rejects=rejects)
+        for key, value in chunk_counts.items():
+            counts[key] += value
+        rows += shard_rows
+        chunks += 1
+        if progress_callback:
+            progress_callback(position, bytes_read, total_bytes)
+
+    if resume_from:
+        logger.info(f"Resumed import of data source {data_source.id} at row {resume_from}")
+    return _ingest_stats(rows, counts, started, data_source, chunks=chunks, resumed_from=resume_from, workers=workers)
@@ -0,0 +1,108 @@
+# dashboard/management/commands/benchmark_csv_ingest.py
+
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from dashboard.ingest import SESSION_FIELDS, iter_parsed_shards
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark parallel CSV parsing for uploads with an increasing number of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            type=str,
+            help="CSV file to parse. A synthetic file is generated if omitted.",
+            required=False,
+        )
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=200000,
+            help="Number of rows in the generated file",
+        )
+        parser.add_argument(
+            "--workers",
+            type=str,
+            default="1,2,4,8",
+            help="Comma-separated worker counts to benchmark",
+        )
+        parser.add_argument(
+            "--shard-bytes",
+            type=int,
+            default=4 * 1024 * 1024,
+            help="Approximate size of each shard in bytes",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        file_path = options.get("file")
+        generated = not file_path
+        if generated:
+            file_path = self.generate_csv(options["rows"])
+
+        try:
+            size_mb = os.path.getsize(file_path) / (1024 * 1024)
+            self.stdout.write(f"Parsing {file_path} ({size_mb:.1f} MB)")
+
+            baseline = None
+            for workers in [int(value) for value in options["workers"].split(",")]:
+                started = time.perf_counter()
+                rows = sum(
+                    len(converted) + len(rejects)
+                    for converted, rejects, _ in iter_parsed_shards(
+                        file_path, workers, shard_bytes=options["shard_bytes"]
+                    )
+                )
+                seconds = time.perf_counter() - started
+                rate = rows / seconds if seconds > 0 else 0.0
+                baseline = baseline or rate
+                self.stdout.write(
+                    f"  - {workers} worker(s): {rows} rows in {seconds:.2f}s "
+                    f"({rate:.0f} rows/sec, {rate / baseline:.2f}x)"
+                )
+        finally:
+            if generated:
+                os.remove(file_path)
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def generate_csv(self, rows):
+        """Write a CSV file with random chat sessions and return its path"""
+        self.stdout.write(f"Generating {rows} sample rows...")
+        start = datetime(2025, 1, 1)
+        handle = tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False)  # noqa: SIM115
+        with handle:
+            writer = csv.DictWriter(handle, fieldnames=SESSION_FIELDS)
+            writer.writeheader()
+            for i in range(rows):
+                started_at = start + timedelta(seconds=random.randint(0, 180 * 24 * 3600))
+                writer.writerow(
+                    {
+                        "session_id": f"bench-{i}",
+                        "start_time": started_at.strftime("%d.%m.%Y %H:%M:%S"),
+                        "end_time": (started_at + timedelta(minutes=random.randint(1, 30))).strftime(
+                            "%d.%m.%Y %H:%M:%S"
+                        ),
+                        "ip_address": f"10.0.{random.randint(0, 255)}.{random.randint(1, 254)}",
+                        "country": random.choice(["NL", "BE", "DE", "FR"]),
+                        "language": random.choice(["nl", "en", "de", "fr"]),
+                        "messages_sent": random.randint(1, 40),
+                        "sentiment": random.choice(["positive", "neutral", "negative"]),
+                        "escalated": random.choice(["True", "False"]),
+                        "forwarded_hr": random.choice(["True", "False"]),
+                        "full_transcript": f"User: Hello\nAssistant: Hi, how can I help? ({i})",
+                        "avg_response_time": round(random.uniform(0.5, 10), 2),
+                        "tokens": random.randint(100, 5000),
+                        "tokens_eur": round(random.uniform(0.01, 2), 4),
+                        "category": random.choice(["billing", "support", "sales"]),
+                        "initial_msg": "Hello, I have a question about my order",
+                        "user_rating": random.choice(["1", "2", "3", "4", "5", ""]),
+                    }
+                )
+        return handle.name
@@ -146,6 +146,7 @@ class Command(BaseCommand):
                             sender="User",
                             message=data.get("initial_msg", ""),
                             timestamp=start_time,
+                            position=0,
                         )
                         message_count += 1
 
@@ -155,6 +156,7 @@ class Command(BaseCommand):
                             sender="Assistant",
                             message=f"This is a test response to {data.get('initial_msg', '')}",
                             timestamp=start_time + timedelta(seconds=30),
+                            position=1,
                         )
                         message_count += 1
 
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dashboard", "0003_alter_chatsession_unique_together"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasource",
+            name="rows_processed",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of CSV rows imported so far. A failed import resumes from this row."
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dashboard", "0005_importjob"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="datasource",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                help_text="Upload a CSV (optionally .csv.gz or .csv.zst), Parquet or Arrow IPC file, or leave empty if using an external data source",
+                null=True,
+                upload_to="data_sources/",
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dashboard", "0006_alter_datasource_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasource",
+            name="rejects_file",
+            field=models.FileField(
+                blank=True,
+                help_text="CSV file with the rejected rows and the reason each was rejected",
+                upload_to="data_sources/rejects/",
+            ),
+        ),
+        migrations.AddField(
+            model_name="datasource",
+            name="rows_rejected",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Number of rows that failed validation and were not imported"
+            ),
+        ),
+    ]
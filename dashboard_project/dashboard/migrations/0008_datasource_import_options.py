@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dashboard", "0007_datasource_rejects"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasource",
+            name="import_options",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="CSV dialect, column mapping and datetime formats detected by the import preview",
+            ),
+        ),
+    ]
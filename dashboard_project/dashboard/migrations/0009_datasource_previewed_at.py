@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("dashboard", "0008_datasource_import_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datasource",
+            name="previewed_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the upload was previewed, while its import waits to be confirmed. Pending uploads are not listed and are deleted after UPLOAD_PREVIEW_EXPIRY_HOURS.",
+                null=True,
+            ),
+        ),
+    ]
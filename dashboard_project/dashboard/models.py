@@ -13,7 +13,10 @@ class DataSource(models.Model):
         upload_to="data_sources/",
         blank=True,
         null=True,
-        help_text="Upload a CSV file or leave empty if using an external data source",
+        help_text=(
+            "Upload a CSV (optionally .csv.gz or .csv.zst), Parquet or Arrow IPC file, "
+            "or leave empty if using an external data source"
+        ),
     )
     external_source = models.ForeignKey(
         "data_integration.ExternalDataSource",
@@ -24,6 +27,32 @@ class DataSource(models.Model):
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
     company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="data_sources")
+    rows_processed = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of CSV rows imported so far. A failed import resumes from this row.",
+    )
+    rows_rejected = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of rows that failed validation and were not imported",
+    )
+    rejects_file = models.FileField(
+        upload_to="data_sources/rejects/",
+        blank=True,
+        help_text="CSV file with the rejected rows and the reason each was rejected",
+    )
+    import_options = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="CSV dialect, column mapping and datetime formats detected by the import preview",
+    )
+    previewed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text=(
+            "When the upload was previewed, while its import waits to be confirmed. "
+            "Pending uploads are not listed and are deleted after UPLOAD_PREVIEW_EXPIRY_HOURS."
+        ),
+    )
 
     def __str__(self):
         return self.name
@@ -58,6 +87,44 @@ class ChatSession(models.Model):
         unique_together = ("session_id", "data_source")
 
 
+class ImportJob(models.Model):
+    """Model to track the background import of an uploaded file into a data source"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = (STATUS_PENDING, STATUS_RUNNING)
+
+    data_source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name="import_jobs")
+    task_id = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    bytes_processed = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import of {self.data_source.name} ({self.status})"
+
+    @property
+    def progress(self):
+        """Import progress as a percentage of the file size"""
+        if self.status == self.STATUS_COMPLETED:
+            return 100
+        if not self.total_bytes:
+            return 0
+        return min(99, int(self.bytes_processed * 100 / self.total_bytes))
+
+
 class Dashboard(models.Model):
     """Model for custom dashboards that can be created by users"""
 
@@ -0,0 +1,182 @@
+# dashboard/preview.py
+
+import csv
+import io
+import os
+import re
+import time
+
+import pandas as pd
+
+from .file_formats import FORMAT_CSV, get_file_format, read_head_bytes, read_head_rows
+from .ingest import DATETIME_COLUMNS, SESSION_FIELDS, detect_datetime_formats, frame_options, map_columns, prepare_chunk
+
+# Bytes of (decompressed) CSV content read for a preview
+PREVIEW_SAMPLE_BYTES = 1024 * 1024
+# Bytes of the sample handed to csv.Sniffer, which gets slow on large inputs
+SNIFF_SAMPLE_BYTES = 64 * 1024
+# Rows read from Parquet and Arrow IPC files for a preview
+PREVIEW_SAMPLE_ROWS = 5000
+# Number of converted and rejected rows shown
+PREVIEW_ROWS = 20
+# Fields shown for the converted rows
+PREVIEW_FIELDS = [
+    "session_id",
+    "start_time",
+    "end_time",
+    "ip_address",
+    "country",
+    "language",
+    "messages_sent",
+    "sentiment",
+    "category",
+]
+
+
+def _normalize(name):
+    """Normalise a column name for matching, e.g. "Session ID" becomes "session_id" """
+    return re.sub(r"[^a-z0-9]+", "_", str(name).strip().lower()).strip("_")
+
+
+def guess_column_mapping(columns):
+    """
+    Map the columns of a file to ChatSession fields by normalised name
+
+    Args:
+        columns: Column names as found in the file
+
+    Returns:
+        dict: Field name per column, or None for columns that are not imported
+    """
+    fields = {_normalize(field): field for field in SESSION_FIELDS}
+    # A column named exactly like a field gets it, e.g. "session_id" rather than "Session ID"
+    taken = {str(column) for column in columns if str(column) in SESSION_FIELDS}
+    mapping = {}
+    for column in map(str, columns):
+        if column in SESSION_FIELDS:
+            mapping[column] = column
+            continue
+        field = fields.get(_normalize(column))
+        mapping[column] = field if field not in taken else None
+        taken.add(field)
+    return mapping
+
+
+def sniff_dialect(sample):
+    """
+    Detect the delimiter and quote character of a CSV sample
+
+    Returns:
+        dict: ``sep`` and ``quotechar`` arguments for ``pandas.read_csv``
+    """
+    text = sample[:SNIFF_SAMPLE_BYTES].decode("utf-8", errors="replace")
+    # Only sniff complete lines
+    text = text[: text.rfind("\n") + 1] or text
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=",;\t|")
+    except csv.Error:
+        return {"sep": ",", "quotechar": '"'}
+    return {"sep": dialect.delimiter, "quotechar": dialect.quotechar or '"'}
+
+
+def _complete_records(sample, quotechar):
+    """Return the length of the part of a CSV sample that ends on a record boundary"""
+    quote = quotechar.encode()
+    newline = sample.rfind(b"\n")
+    while newline != -1 and sample.count(quote, 0, newline) % 2:
+        newline = sample.rfind(b"\n", 0, newline)
+    return newline + 1
+
+
+def _read_csv_sample(file_path):
+    """
+    Read the start of a CSV file, cut at the last complete record
+
+    Returns:
+        tuple: (sample bytes, dialect, bytes of the file the sample took up, whether it is the whole file)
+    """
+    data, consumed, whole_file = read_head_bytes(file_path, PREVIEW_SAMPLE_BYTES)
+    dialect = sniff_dialect(data)
+    if whole_file:
+        return data, dialect, consumed, True
+    sample = data[: _complete_records(data, dialect["quotechar"])]
+    # For compressed files, assume the content compresses evenly
+    return sample, dialect, consumed * len(sample) / len(data), False
+
+
+def _display(value):
+    """Format a converted value for display"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d %H:%M:%S %Z")
+    return str(value)
+
+
+def preview_file(file_path):
+    """
+    Inspect the start of an uploaded file without importing it
+
+    Only a sample is read (about ``PREVIEW_SAMPLE_BYTES`` of CSV, or
+    ``PREVIEW_SAMPLE_ROWS`` rows of Parquet and Arrow IPC), so a preview takes
+    about as long for a file of several gigabytes as for a small one. The number
+    of rows of a CSV file is estimated from the size of the file.
+
+    Args:
+        file_path: Path of the uploaded file
+
+    Returns:
+        dict: Preview, with under ``options`` the dialect, column mapping and datetime
+              formats to store in ``DataSource.import_options`` for the real import
+    """
+    started = time.perf_counter()
+    file_format, compression = get_file_format(file_path)
+
+    if file_format == FORMAT_CSV:
+        sample, dialect, sample_bytes, exact = _read_csv_sample(file_path)
+        raw = pd.read_csv(io.BytesIO(sample), **dialect)
+        # Scale the number of sampled rows by the share of the file they took up
+        estimated_rows = len(raw) if exact else round(len(raw) * os.path.getsize(file_path) / max(sample_bytes, 1))
+        options = {"csv": dialect, "columns": guess_column_mapping(raw.columns)}
+        # Parse the sample again the way the import will read it, e.g. text columns as strings
+        read_options = frame_options(options)
+        df = pd.read_csv(io.BytesIO(sample), dtype=read_options["dtype"], **read_options["csv_options"])
+    else:
+        raw, estimated_rows, exact = read_head_rows(file_path, PREVIEW_SAMPLE_ROWS)
+        options = {"columns": guess_column_mapping(raw.columns)}
+        df, _, _ = read_head_rows(file_path, PREVIEW_SAMPLE_ROWS, dtype=frame_options(options)["dtype"])
+    df = map_columns(df, options)
+
+    datetime_parsers = detect_datetime_formats(df)
+    options["datetime_formats"] = {name: datetime_parsers[name].format for name in DATETIME_COLUMNS}
+    converted, rejects = prepare_chunk(df, datetime_parsers=datetime_parsers)
+
+    mapped_fields = {field for field in options["columns"].values() if field}
+    return {
+        "file_format": file_format,
+        "compression": compression,
+        "estimated_rows": estimated_rows,
+        "rows_exact": exact,
+        "columns": [
+            {
+                "name": str(column),
+                "dtype": str(dtype),
+                "field": options["columns"][str(column)],
+                "datetime_format": options["datetime_formats"].get(options["columns"][str(column)]),
+            }
+            for column, dtype in raw.dtypes.items()
+        ],
+        "missing_fields": [field for field in SESSION_FIELDS if field not in mapped_fields],
+        "sample_rows": len(df),
+        "sample_rejected": len(rejects),
+        "fields": PREVIEW_FIELDS,
+        "rows": [
+            [_display(row[field]) for field in PREVIEW_FIELDS]
+            for row in converted.head(PREVIEW_ROWS).to_dict("records")
+        ],
+        "rejects": [
+            {"row": int(index) + 1, "errors": errors} for index, errors in rejects["errors"].head(PREVIEW_ROWS).items()
+        ],
+        "options": options,
+        "seconds": time.perf_counter() - started,
+    }
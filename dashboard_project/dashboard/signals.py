@@ -11,6 +11,68 @@ from django.dispatch import receiver
 logger = logging.getLogger(__name__)
 
 
+def dashboard_session_fields(instance):
+    """Return the dashboard ChatSession field values for an external chat session"""
+    return {
+        "start_time": instance.start_time,
+        "end_time": instance.end_time,
+        "ip_address": instance.ip_address,
+        "country": instance.country or "",
+        "language": instance.language or "",
+        "messages_sent": instance.messages_sent or 0,
+        "sentiment": instance.sentiment or "",
+        "escalated": instance.escalated or False,
+        "forwarded_hr": instance.forwarded_hr or False,
+        "full_transcript": instance.full_transcript_url or "",
+        "avg_response_time": instance.avg_response_time,
+        "tokens": instance.tokens or 0,
+        "tokens_eur": instance.tokens_eur,
+        "category": instance.category or "",
+        "initial_msg": instance.initial_msg or "",
+        "user_rating": (str(instance.user_rating) if instance.user_rating is not None else ""),
+    }
+
+
+def sync_external_sessions_to_dashboard(sessions, batch_size=None):
+    """
+    Copy many external chat sessions to the linked dashboard data sources at once
+
+    Bulk counterpart of ``sync_external_session_to_dashboard`` for sessions that
+    were written with ``bulk_create``, which doesn't send ``post_save``. Each data
+    source gets one upsert on ``(session_id, data_source)`` per batch.
+
+    Args:
+        sessions: ExternalChatSession instances
+        batch_size: Maximum number of rows per INSERT statement
+
+    Returns:
+        int: Number of dashboard sessions written
+    """
+    if not sessions:
+        return 0
+    data_sources = list(DataSource.objects.exclude(external_source=None))
+    update_fields = list(dashboard_session_fields(sessions[0]))
+    written = 0
+    for data_source in data_sources:
+        dashboard_sessions = [
+            DashboardChatSession(
+                data_source=data_source,
+                session_id=instance.session_id,
+                **dashboard_session_fields(instance),
+            )
+            for instance in sessions
+        ]
+        DashboardChatSession.objects.bulk_create(
+            dashboard_sessions,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["session_id", "data_source"],
+            update_fields=update_fields,
+        )
+        written += len(dashboard_sessions)
+    return written
+
+
 @receiver(post_save, sender=ExternalChatSession)
 def sync_external_session_to_dashboard(
     sender,  # noqa: ARG001
@@ -43,24 +105,7 @@ def sync_external_session_to_dashboard(
             dashboard_session, created = DashboardChatSession.objects.update_or_create(
                 data_source=data_source,
                 session_id=instance.session_id,
-                defaults={
-                    "start_time": instance.start_time,
-                    "end_time": instance.end_time,
-                    "ip_address": instance.ip_address,
-                    "country": instance.country or "",
-                    "language": instance.language or "",
-                    "messages_sent": instance.messages_sent or 0,
-                    "sentiment": instance.sentiment or "",
-                    "escalated": instance.escalated or False,
-                    "forwarded_hr": instance.forwarded_hr or False,
-                    "full_transcript": instance.full_transcript_url or "",
-                    "avg_response_time": instance.avg_response_time,
-                    "tokens": instance.tokens or 0,
-                    "tokens_eur": instance.tokens_eur,
-                    "category": instance.category or "",
-                    "initial_msg": instance.initial_msg or "",
-                    "user_rating": (str(instance.user_rating) if instance.user_rating is not None else ""),
-                },
+                defaults=dashboard_session_fields(instance),
             )
 
             if created:
@@ -0,0 +1,24 @@
+import pandas as pd
+from dashboard.datetime_parsing import DatetimeParser
+from dashboard.ingest import prepare_chunk
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+
+class DatetimeParserTests(SimpleTestCase):
+    def test_local_times_around_dst_transitions_are_kept(self):
+        values = pd.Series(["30.03.2025 02:30:00", "26.10.2025 02:30:00"])
+        with timezone.override("Europe/Amsterdam"):
+            parsed = DatetimeParser().parse_column(values)
+            df = pd.DataFrame({"session_id": ["s1", "s2"], "start_time": values, "end_time": values})
+            _, rejects = prepare_chunk(df)
+
+        # The skipped hour moves to the end of the gap; the repeated hour is taken as DST
+        self.assertEqual(parsed[0].isoformat(), "2025-03-30T03:00:00+02:00")
+        self.assertEqual(parsed[1].isoformat(), "2025-10-26T02:30:00+02:00")
+        self.assertTrue(rejects.empty)
+
+    def test_values_that_match_no_format_are_not_parsed(self):
+        values = pd.Series(["01.03.2025 10:00:00", "now", "2025", "soon"])
+        parsed = DatetimeParser().parse_column(values)
+        self.assertEqual(parsed.isna().tolist(), [False, True, True, True])
@@ -0,0 +1,31 @@
+import os
+import tempfile
+
+import pandas as pd
+from dashboard.ingest import map_columns
+from dashboard.preview import guess_column_mapping, preview_file
+from django.test import SimpleTestCase
+
+
+class ColumnMappingTests(SimpleTestCase):
+    def test_column_named_like_a_field_gets_it(self):
+        mapping = guess_column_mapping(["Session ID", "session_id", "Start Time"])
+        self.assertEqual(mapping, {"Session ID": None, "session_id": "session_id", "Start Time": "start_time"})
+
+    def test_unmapped_column_named_like_a_mapped_field_is_renamed(self):
+        # Mapping stored by an earlier preview
+        options = {"columns": {"Session ID": "session_id", "session_id": None}}
+        df = map_columns(pd.DataFrame({"Session ID": ["s1"], "session_id": ["old-1"]}), options)
+        self.assertEqual(df.columns.tolist(), ["session_id", "session_id (not imported)"])
+        self.assertEqual(df["session_id"].tolist(), ["s1"])
+
+    def test_preview_of_columns_that_normalise_to_the_same_field(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("Session ID,session_id,start_time,end_time\n")
+            f.write("old-1,s1,01.03.2025 10:00:00,01.03.2025 10:05:00\n")
+        self.addCleanup(os.remove, f.name)
+
+        preview = preview_file(f.name)
+        self.assertEqual(preview["options"]["columns"]["session_id"], "session_id")
+        self.assertEqual(preview["sample_rejected"], 0)
+        self.assertEqual(preview["rows"][0][0], "s1")
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from accounts.models import Company
+from dashboard.models import DataSource
+from dashboard.utils import delete_expired_previews
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+CSV = b"session_id,start_time,end_time\ns1,01.03.2025 10:00:00,01.03.2025 10:05:00\n"
+
+
+class UploadPreviewTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CSV_UPLOAD_STREAM_BYTES=0,
+            # The pages are rendered without collected static files
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.company = Company.objects.create(name="Acme")
+        user = get_user_model().objects.create_user("user", password="password", company=self.company)
+        self.client.force_login(user)
+
+    def preview(self):
+        self.client.post(
+            f"{reverse('upload_data')}?preview=1",
+            {"name": "Chats", "file": SimpleUploadedFile("chats.csv", CSV)},
+        )
+        return DataSource.objects.get(name="Chats")
+
+    def test_previewed_upload_is_pending_until_confirmed(self):
+        data_source = self.preview()
+        self.assertIsNotNone(data_source.previewed_at)
+        response = self.client.get(reverse("upload_data"))
+        self.assertNotIn(data_source, response.context["data_sources"])
+
+        with mock.patch("dashboard.views.process_csv_upload.delay", return_value=mock.Mock(id="task-1")):
+            self.client.post(reverse("confirm_import", args=[data_source.id]))
+        data_source.refresh_from_db()
+        self.assertIsNone(data_source.previewed_at)
+        response = self.client.get(reverse("upload_data"))
+        self.assertIn(data_source, response.context["data_sources"])
+
+    def test_only_previewed_uploads_can_be_confirmed_or_cancelled(self):
+        data_source = DataSource.objects.create(name="Imported", company=self.company)
+        url = reverse("confirm_import", args=[data_source.id])
+        with mock.patch("dashboard.views.process_csv_upload.delay") as delay:
+            self.assertEqual(self.client.post(url).status_code, 404)
+            self.assertEqual(self.client.post(url, {"cancel": "1"}).status_code, 404)
+        delay.assert_not_called()
+        self.assertTrue(DataSource.objects.filter(pk=data_source.pk).exists())
+
+    def test_expired_preview_is_deleted_with_its_file(self):
+        data_source = self.preview()
+        storage, path = data_source.file.storage, data_source.file.name
+        self.assertEqual(delete_expired_previews(), 0)
+
+        DataSource.objects.filter(pk=data_source.pk).update(previewed_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(delete_expired_previews(), 1)
+        self.assertFalse(DataSource.objects.filter(pk=data_source.pk).exists())
+        self.assertFalse(storage.exists(path))
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from accounts.models import Company
+from dashboard.ingest import IncrementalCSVIngest
+from dashboard.models import ChatSession, DataSource
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+CSV = b"".join(
+    [b"session_id,start_time,end_time\n"]
+    + [f"s{i},01.03.2025 10:{i:02d}:00,01.03.2025 10:{i:02d}:30\n".encode() for i in range(50)]
+)
+
+
+class StreamingUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CSV_UPLOAD_STREAM_BYTES=256,
+            # The pages are rendered without collected static files
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.company = Company.objects.create(name="Acme")
+        user = get_user_model().objects.create_user("user", password="password", company=self.company)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(user)
+        self.client.get(reverse("upload_data"))
+        self.token = self.client.cookies["csrftoken"].value
+
+    def upload(self, data, **headers):
+        return self.client.post(
+            reverse("upload_data"), {**data, "file": SimpleUploadedFile("chats.csv", CSV)}, headers=headers
+        )
+
+    def test_forged_upload_is_rejected_before_importing(self):
+        with mock.patch("dashboard.upload_handlers.IncrementalCSVIngest") as ingest:
+            response = self.upload({"name": "Chats"})
+        self.assertEqual(response.status_code, 403)
+        ingest.assert_not_called()
+        self.assertFalse(ChatSession.objects.exists())
+        self.assertFalse(DataSource.objects.exists())
+
+    def test_upload_is_imported_while_it_arrives_with_the_token_ahead_of_the_file(self):
+        response = self.upload({"csrfmiddlewaretoken": self.token, "name": "Chats"})
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        data_source = DataSource.objects.get(name="Chats")
+        self.assertEqual(data_source.chat_sessions.count(), 50)
+        self.assertFalse(data_source.import_jobs.exists())
+
+    def test_upload_is_imported_while_it_arrives_with_the_token_in_the_header(self):
+        response = self.upload({"name": "Chats"}, X_CSRFToken=self.token)
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+        data_source = DataSource.objects.get(name="Chats")
+        self.assertEqual(data_source.chat_sessions.count(), 50)
+        self.assertFalse(data_source.import_jobs.exists())
+
+
+class IncrementalCSVIngestTests(TestCase):
+    def test_records_with_quoted_newlines_larger_than_a_chunk(self):
+        data_source = DataSource.objects.create(name="Chats", company=Company.objects.create(name="Acme"))
+        transcripts = {f"s{i}": "\n".join(f'User: "line {j}" of {i}' for j in range(200)) for i in range(5)}
+        content = "session_id,start_time,end_time,full_transcript\n" + "".join(
+            f'{session_id},01.03.2025 10:00:00,01.03.2025 10:05:00,"{text.replace('"', '""')}"\n'
+            for session_id, text in transcripts.items()
+        )
+
+        ingest = IncrementalCSVIngest(data_source, chunk_bytes=256)
+        data = content.encode()
+        for start in range(0, len(data), 100):
+            ingest.feed(data[start : start + 100])
+        stats = ingest.close()
+
+        self.assertEqual(stats["rows"], 5)
+        self.assertGreater(stats["chunks"], 1)
+        stored = dict(ChatSession.objects.values_list("session_id", "full_transcript"))
+        self.assertEqual(stored, transcripts)
@@ -0,0 +1,143 @@
+# dashboard/upload_handlers.py
+
+import copy
+import logging
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import Q
+from django.http import QueryDict
+from django.http.multipartparser import MultiPartParser
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.datastructures import ImmutableList, MultiValueDict
+
+from .file_formats import FORMAT_CSV, get_file_format
+from .ingest import IncrementalCSVIngest
+from .models import DataSource
+
+logger = logging.getLogger(__name__)
+
+
+def csrf_token_is_valid(request, token=None):
+    """
+    Check the CSRF token of a request the way ``CsrfViewMiddleware`` does, without reading its body
+
+    Args:
+        request: Request whose body is being received
+        token: Value of the ``csrfmiddlewaretoken`` field, or None to check the ``X-CSRFToken`` header
+
+    Returns:
+        bool: Whether the request passes the CSRF check
+    """
+    check = copy.copy(request)
+    check._post = QueryDict(mutable=True)
+    check._files = MultiValueDict()
+    if token:
+        check._post["csrfmiddlewaretoken"] = token
+    return CsrfViewMiddleware(lambda _request: None).process_view(check, None, (), {}) is None
+
+
+class StreamingCSVUploadHandler(TemporaryFileUploadHandler):
+    """
+    Upload handler that imports a CSV file while the request body is still arriving
+
+    The file is written to a temporary file as usual, so it can still be saved on
+    the DataSource for audit purposes. Every chunk is also fed to an
+    ``IncrementalCSVIngest``, which stores the sessions in a staged DataSource
+    created when the upload starts.
+
+    The uploaded file gets three extra attributes for the view:
+
+    - ``data_source``: the staged DataSource
+    - ``ingest_stats``: import statistics, or None if the import failed
+    - ``ingest_error``: the exception that stopped the import, if any
+
+    After a failure the file is still received completely; the import can then
+    resume from ``data_source.rows_processed``.
+
+    Rows are only imported during the upload if the request passes the CSRF check
+    before the file arrives: the ``csrfmiddlewaretoken`` field has to come before
+    the file in the form, or be sent in the ``X-CSRFToken`` header. This requires
+    the view to parse the body with ``parse_file_upload``. Otherwise the file is
+    only stored, and the view rejects a forged request before anything is imported.
+    """
+
+    field_name = "file"
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.data_source = None
+        self.ingest = None
+        self.error = None
+        self.parser = None
+
+    def parse_file_upload(self, META, post_data):
+        """Parse the request body like ``HttpRequest.parse_file_upload``, keeping the parser to read the fields"""
+        self.request.upload_handlers = ImmutableList(
+            self.request.upload_handlers,
+            warning="You cannot alter upload handlers after the upload has been processed.",
+        )
+        self.parser = MultiPartParser(META, post_data, self.request.upload_handlers, self.request.encoding)
+        return self.parser.parse()
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.ingest = None
+        company = getattr(self.request.user, "company", None)
+        if field_name != self.field_name or not company:
+            return
+        try:
+            if get_file_format(file_name) != (FORMAT_CSV, None):
+                return
+        except ValueError:
+            # Unsupported file types are rejected by the form
+            return
+        # Fields sent before the file have been parsed already
+        token = self.parser._post.get("csrfmiddlewaretoken") if self.parser else None
+        if not csrf_token_is_valid(self.request, token):
+            return
+
+        self.data_source = DataSource.objects.create(name=file_name, company=company)
+        self.ingest = IncrementalCSVIngest(self.data_source, settings.CSV_UPLOAD_STREAM_BYTES)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.ingest and not self.error:
+            try:
+                self.ingest.feed(raw_data)
+            except Exception as e:
+                logger.error(f"Error importing upload into data source {self.data_source.id}: {e}")
+                self.error = e
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if not self.ingest:
+            return file
+
+        stats = None
+        if not self.error:
+            try:
+                stats = self.ingest.close()
+            except Exception as e:
+                logger.error(f"Error importing upload into data source {self.data_source.id}: {e}")
+                self.error = e
+
+        file.data_source = self.data_source
+        file.ingest_stats = stats
+        file.ingest_error = self.error
+        return file
+
+    def discard_unsaved(self):
+        """Delete the staged DataSource, with its sessions, if the view didn't save the file on it"""
+        if not self.data_source:
+            return
+        unsaved = DataSource.objects.filter(Q(file="") | Q(file__isnull=True), pk=self.data_source.pk)
+        if unsaved.exists():
+            self.data_source.delete()
+            self.data_source = None
+
+    def upload_interrupted(self):
+        super().upload_interrupted()
+        if self.data_source:
+            self.data_source.delete()
+            self.data_source = None
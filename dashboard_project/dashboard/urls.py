@@ -28,6 +28,16 @@ urlpatterns = [
         views.delete_dashboard_view,
         name="delete_dashboard",
     ),
+    path(
+        "data-source/<int:data_source_id>/import/",
+        views.confirm_import_view,
+        name="confirm_import",
+    ),
+    path(
+        "data-source/<int:data_source_id>/rejects/",
+        views.download_rejects_view,
+        name="download_rejects",
+    ),
     path(
         "data-source/<int:data_source_id>/delete/",
         views.delete_data_source_view,
@@ -38,6 +48,11 @@ urlpatterns = [
         views.dashboard_data_api,
         name="dashboard_data_api",
     ),
+    path(
+        "api/import-jobs/<int:job_id>/",
+        views.import_job_status_api,
+        name="import_job_status_api",
+    ),
     path("search/", views.search_chat_sessions, name="search_chat_sessions"),
     path("data-view/", views.data_view, name="data_view"),
     # Export to CSV
@@ -1,86 +1,137 @@
 # dashboard/utils.py
 
-import contextlib
+from datetime import timedelta
 
-import numpy as np
-import pandas as pd
+from django.conf import settings
 from django.db import models
-from django.utils.timezone import make_aware
+from django.utils import timezone
 
-from .models import ChatSession
+from .file_formats import FORMAT_CSV, get_file_format, read_frame
+from .ingest import frame_options, ingest_csv_parallel, ingest_csv_stream, ingest_dataframe
+from .models import ChatSession, Dashboard, DataSource, ImportJob
 
 
-def process_csv_file(data_source):
+def format_ingest_stats(stats):
+    """Describe the statistics returned by the ingest functions for the user"""
+    return (
+        f"Successfully processed {stats['rows']} records "
+        f"({stats['created']} created, {stats['updated']} updated, {stats['unchanged']} unchanged, "
+        f"{stats['rejected']} rejected; {stats['rows_per_second']:.0f} rows/sec)."
+    )
+
+
+def process_csv_file(data_source, chunksize=None, progress_callback=None, workers=None):
     """
-    Process the uploaded CSV file and create ChatSession objects
+    Process the uploaded file and create ChatSession objects
+
+    Besides plain CSV, gzip- and zstd-compressed CSV, Parquet and Arrow IPC files
+    are accepted (see ``file_formats``).
 
     Args:
-        data_source: DataSource model instance containing the CSV file
+        data_source: DataSource model instance containing the uploaded file
+        chunksize: If set, stream the file in chunks of this many rows instead of
+                   loading it at once. Streaming imports resume from
+                   ``data_source.rows_processed``.
+        progress_callback: Optional callable receiving ``(rows_processed, bytes_read, total_bytes)``
+                           after every chunk of a streaming import
+        workers: If greater than 1, split the file into byte-range shards that are parsed
+                 by this many processes, with the rows stored from this process.
+                 Only used for uncompressed CSV files.
     """
     try:
-        # Read the CSV file
         file_path = data_source.file.path
-        df = pd.read_csv(file_path)
-
-        # Process each row and create ChatSession objects
-        for _, row in df.iterrows():
-            # Handle datetime fields
-            start_time = None
-            end_time = None
-            if "start_time" in row and pd.notna(row["start_time"]):
-                with contextlib.suppress(Exception):
-                    start_time = make_aware(pd.to_datetime(row["start_time"]))
-
-            if "end_time" in row and pd.notna(row["end_time"]):
-                with contextlib.suppress(Exception):
-                    end_time = make_aware(pd.to_datetime(row["end_time"]))
-                    pass
-
-            # Convert boolean fields
-            escalated = str(row.get("escalated", "")).lower() in [
-                "true",
-                "yes",
-                "1",
-                "t",
-                "y",
-            ]
-            forwarded_hr = str(row.get("forwarded_hr", "")).lower() in [
-                "true",
-                "yes",
-                "1",
-                "t",
-                "y",
-            ]
-
-            # Create ChatSession object
-            session = ChatSession(
-                data_source=data_source,
-                session_id=str(row.get("session_id", "")),
-                start_time=start_time,
-                end_time=end_time,
-                ip_address=row.get("ip_address") if pd.notna(row.get("ip_address", np.nan)) else None,
-                country=str(row.get("country", "")),
-                language=str(row.get("language", "")),
-                messages_sent=int(row.get("messages_sent", 0)) if pd.notna(row.get("messages_sent", np.nan)) else 0,
-                sentiment=str(row.get("sentiment", "")),
-                escalated=escalated,
-                forwarded_hr=forwarded_hr,
-                full_transcript=str(row.get("full_transcript", "")),
-                avg_response_time=float(row.get("avg_response_time", 0))
-                if pd.notna(row.get("avg_response_time", np.nan))
-                else None,
-                tokens=int(row.get("tokens", 0)) if pd.notna(row.get("tokens", np.nan)) else 0,
-                tokens_eur=float(row.get("tokens_eur", 0)) if pd.notna(row.get("tokens_eur", np.nan)) else None,
-                category=str(row.get("category", "")),
-                initial_msg=str(row.get("initial_msg", "")),
-                user_rating=str(row.get("user_rating", "")),
-            )
-            session.save()
-
-        return True, f"Successfully processed {len(df)} records."
+        file_format, compression = get_file_format(file_path)
+
+        if workers and workers > 1 and file_format == FORMAT_CSV and not compression:
+            # Parse shards of the file on a process pool, storing them in file order
+            stats = ingest_csv_parallel(file_path, data_source, workers, progress_callback=progress_callback)
+        elif chunksize:
+            # Convert and insert one chunk at a time to keep memory usage flat
+            stats = ingest_csv_stream(file_path, data_source, chunksize, progress_callback=progress_callback)
+        else:
+            # Read the whole file, then convert all columns at once and insert in batches
+            df = read_frame(file_path, **frame_options(data_source.import_options))
+            stats = ingest_dataframe(df, data_source)
+
+        return True, format_ingest_stats(stats)
 
     except Exception as e:
-        return False, f"Error processing CSV file: {str(e)}"
+        return False, f"Error processing CSV file after {data_source.rows_processed} rows: {str(e)}"
+
+
+def add_data_source_to_dashboards(data_source):
+    """Add a data source to all existing dashboards of its company"""
+    for dashboard in Dashboard.objects.filter(company=data_source.company):
+        dashboard.data_sources.add(data_source)
+
+
+def delete_expired_previews():
+    """
+    Delete previewed uploads whose import was not confirmed within UPLOAD_PREVIEW_EXPIRY_HOURS
+
+    Returns:
+        int: Number of deleted data sources
+    """
+    expired_before = timezone.now() - timedelta(hours=settings.UPLOAD_PREVIEW_EXPIRY_HOURS)
+    expired = DataSource.objects.filter(previewed_at__lt=expired_before, import_jobs__isnull=True)
+    count = 0
+    for data_source in expired:
+        data_source.file.delete(save=False)
+        data_source.delete()
+        count += 1
+    return count
+
+
+def run_import_job(job, final_attempt=True):
+    """
+    Import the file of an ImportJob, recording progress on the job as it goes
+
+    When the import succeeds, the data source is added to the company's dashboards.
+    A failed import that will be retried is put back to pending; the retry resumes
+    from the last stored chunk.
+
+    Args:
+        job: ImportJob model instance
+        final_attempt: Whether a failure should mark the job as failed
+
+    Returns:
+        tuple: (success, message) as returned by ``process_csv_file``
+    """
+    data_source = job.data_source
+    job.status = ImportJob.STATUS_RUNNING
+    job.total_bytes = data_source.file.size
+    job.save(update_fields=["status", "total_bytes", "updated_at"])
+
+    def report_progress(rows_processed, bytes_read, total_bytes):
+        ImportJob.objects.filter(pk=job.pk).update(
+            bytes_processed=bytes_read,
+            total_bytes=total_bytes,
+            message=f"{rows_processed} rows imported",
+            updated_at=timezone.now(),
+        )
+
+    success, message = process_csv_file(
+        data_source,
+        chunksize=settings.CSV_INGEST_CHUNK_SIZE,
+        progress_callback=report_progress,
+        workers=settings.CSV_INGEST_WORKERS,
+    )
+
+    if success:
+        add_data_source_to_dashboards(data_source)
+        job.status = ImportJob.STATUS_COMPLETED
+        job.bytes_processed = job.total_bytes
+        job.finished_at = timezone.now()
+    elif final_attempt:
+        job.status = ImportJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+    else:
+        job.status = ImportJob.STATUS_PENDING
+        message = f"Retrying after error: {message}"
+
+    job.message = message
+    job.save(update_fields=["status", "bytes_processed", "message", "finished_at", "updated_at"])
+    return success, message
 
 
 def generate_dashboard_data(data_sources):
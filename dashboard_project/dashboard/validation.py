@@ -0,0 +1,90 @@
+# dashboard/validation.py
+
+import ipaddress
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+# Dotted-quad IPv4 address with every octet in 0-255
+IPV4_PATTERN = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)(?:\.(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)){3}"
+
+# Allowed (minimum, maximum) of numeric columns; None means unbounded
+NUMERIC_RANGES = {
+    "messages_sent": (0, 2**31 - 1),
+    "tokens": (0, 2**31 - 1),
+    "avg_response_time": (0, None),
+    "tokens_eur": (0, None),
+}
+
+# Timestamps before this date or later than the tolerance after now are rejected
+MIN_TIMESTAMP = pd.Timestamp("2000-01-01", tz="UTC")
+MAX_FUTURE_TIMESTAMP = timedelta(days=1)
+
+
+def _raw(df, name):
+    """Return a raw column as stripped strings, with missing values as empty strings"""
+    if name not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[name].astype(object).where(df[name].notna(), "").astype(str).str.strip()
+
+
+def _invalid_ip_addresses(values):
+    """Return a mask of the non-empty values that are not valid IP addresses"""
+    present = values != ""
+    invalid = present & ~values.str.fullmatch(IPV4_PATTERN)
+    # Only the few IPv6 candidates go through the (slow) ipaddress module
+    candidates = invalid & values.str.contains(":", regex=False)
+    if candidates.any():
+        valid_ipv6 = []
+        for value in values[candidates]:
+            try:
+                ipaddress.IPv6Address(value)
+                valid_ipv6.append(True)
+            except ValueError:
+                valid_ipv6.append(False)
+        invalid[candidates] = ~np.array(valid_ipv6)
+    return invalid
+
+
+def validate_rows(df, converted):
+    """
+    Check every row of a chunk using column operations
+
+    Args:
+        df: Raw rows as read from the uploaded file
+        converted: The same rows as returned by ``convert_dataframe``
+
+    Returns:
+        Series: Per row a "; "-separated description of its problems, or "" if the row is valid
+    """
+    checks = [("missing session_id", _raw(df, "session_id") == "")]
+
+    checks.append(("invalid ip_address", _invalid_ip_addresses(_raw(df, "ip_address"))))
+
+    for name, (minimum, maximum) in NUMERIC_RANGES.items():
+        raw = _raw(df, name)
+        numbers = pd.to_numeric(raw.where(raw != ""), errors="coerce")
+        checks.append((f"invalid {name}", (raw != "") & numbers.isna()))
+        out_of_range = ~np.isfinite(numbers) & numbers.notna()
+        if minimum is not None:
+            out_of_range |= numbers < minimum
+        if maximum is not None:
+            out_of_range |= numbers > maximum
+        checks.append((f"{name} out of range", out_of_range))
+
+    latest = pd.Timestamp(timezone.now() + MAX_FUTURE_TIMESTAMP)
+    for name in ("start_time", "end_time"):
+        parsed = converted[name]
+        checks.append((f"invalid {name}", (_raw(df, name) != "") & parsed.isna()))
+        checks.append((f"{name} out of range", (parsed < MIN_TIMESTAMP) | (parsed > latest)))
+
+    checks.append(("end_time before start_time", converted["end_time"] < converted["start_time"]))
+
+    errors = pd.Series("", index=df.index, dtype=object)
+    for message, mask in checks:
+        mask = mask.fillna(False).astype(bool)
+        if mask.any():
+            errors = errors.where(~mask, errors + message + "; ")
+    return errors.str.removesuffix("; ")
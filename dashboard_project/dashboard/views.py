@@ -3,18 +3,23 @@
 import json
 from datetime import timedelta
 
+from data_integration.tasks import process_csv_upload
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Avg, Q
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
 
 from .forms import DashboardForm, DataSourceUploadForm
-from .models import ChatSession, Dashboard, DataSource
-from .utils import generate_dashboard_data, process_csv_file
+from .models import ChatSession, Dashboard, DataSource, ImportJob
+from .preview import preview_file
+from .upload_handlers import StreamingCSVUploadHandler
+from .utils import add_data_source_to_dashboards, format_ingest_stats, generate_dashboard_data, run_import_job
 
 
 def is_ajax_navigation(request):
@@ -40,7 +45,7 @@ def dashboard_view(request):
 
     if not dashboards.exists():
         # Create a default dashboard if none exists
-        data_sources = DataSource.objects.filter(company=company)
+        data_sources = DataSource.objects.filter(company=company, previewed_at__isnull=True)
         if data_sources.exists():
             default_dashboard = Dashboard.objects.create(
                 name="Default Dashboard",
@@ -88,8 +93,48 @@ def dashboard_view(request):
 
 
 @login_required
+@csrf_exempt
 def upload_data_view(request):
     """View for uploading CSV files"""
+    # The upload handlers have to be set before the CSRF check reads the request body;
+    # the handler checks the CSRF token itself before importing anything.
+    # Previews only store the file, so they are never imported while uploading.
+    if request.method != "POST" or not settings.CSV_UPLOAD_STREAM_BYTES or request.GET.get("preview"):
+        return _upload_data_view(request)
+
+    handler = StreamingCSVUploadHandler(request)
+    request.upload_handlers.insert(0, handler)
+    request.parse_file_upload = handler.parse_file_upload
+    response = _upload_data_view(request)
+    # Remove the staged import if the upload was rejected, e.g. by the form or the CSRF check
+    handler.discard_unsaved()
+    return response
+
+
+def _start_import(request, data_source):
+    """Import the file of a data source in the background and redirect to the matching page"""
+    # If importing during the upload failed, this resumes after the rows that were already stored
+    job = ImportJob.objects.create(data_source=data_source)
+    try:
+        task = process_csv_upload.delay(job.id)
+        ImportJob.objects.filter(pk=job.pk).update(task_id=task.id)
+        messages.success(
+            request,
+            "File uploaded successfully. It is being imported in the background.",
+        )
+    except Exception:
+        # Fall back to synchronous processing if Celery is not available
+        success, message = run_import_job(job)
+        if success:
+            messages.success(request, f"File uploaded successfully. {message}")
+            return redirect("dashboard")
+        messages.error(request, message)
+
+    return redirect("upload_data")
+
+
+@csrf_protect
+def _upload_data_view(request):
     user = request.user
     company = user.company
 
@@ -100,38 +145,58 @@ def upload_data_view(request):
         )
         return redirect("dashboard")
 
+    preview = None
+    preview_source = None
+
     if request.method == "POST":
-        form = DataSourceUploadForm(request.POST, request.FILES, company=company)
+        # Plain CSV uploads are imported into a staged DataSource while they arrive
+        uploaded = request.FILES.get("file")
+        staged = getattr(uploaded, "data_source", None)
+
+        form = DataSourceUploadForm(request.POST, request.FILES, company=company, instance=staged)
         if form.is_valid():
             data_source = form.save()
 
-            # Process the uploaded CSV file
-            success, message = process_csv_file(data_source)
-
-            if success:
-                messages.success(request, f"File uploaded successfully. {message}")
+            if staged and uploaded.ingest_stats:
+                add_data_source_to_dashboards(data_source)
+                messages.success(request, f"File uploaded successfully. {format_ingest_stats(uploaded.ingest_stats)}")
+                return redirect("dashboard")
 
-                # Add the new data source to all existing dashboards
-                dashboards = Dashboard.objects.filter(company=company)
-                for dashboard in dashboards:
-                    dashboard.data_sources.add(data_source)
+            if not request.GET.get("preview"):
+                return _start_import(request, data_source)
 
-                return redirect("dashboard")
-            else:
-                # If processing failed, delete the data source
+            # Show what the import would do; the detected options are reused when it is confirmed
+            try:
+                preview = preview_file(data_source.file.path)
+            except Exception as e:
                 data_source.delete()
-                messages.error(request, message)
+                messages.error(request, f"Could not preview the file: {str(e)}")
+                return redirect("upload_data")
+            # The upload stays pending, and unlisted, until its import is confirmed
+            data_source.import_options = preview["options"]
+            data_source.previewed_at = timezone.now()
+            data_source.save(update_fields=["import_options", "previewed_at"])
+            preview_source = data_source
+            form = DataSourceUploadForm()
         else:
             messages.error(request, "Form is invalid. Please correct the errors.")
     else:
         form = DataSourceUploadForm()
 
-    # List existing data sources
-    data_sources = DataSource.objects.filter(company=company).order_by("-uploaded_at")
+    # List existing data sources and the imports that are still running
+    data_sources = DataSource.objects.filter(company=company, previewed_at__isnull=True).order_by("-uploaded_at")
+    import_jobs = (
+        ImportJob.objects.filter(data_source__company=company, status__in=ImportJob.ACTIVE_STATUSES)
+        .select_related("data_source")
+        .order_by("created_at")
+    )
 
     context = {
         "form": form,
         "data_sources": data_sources,
+        "import_jobs": import_jobs,
+        "preview": preview,
+        "preview_source": preview_source,
     }
 
     # Check if this is an AJAX navigation request
@@ -142,6 +207,31 @@ def upload_data_view(request):
     return render(request, "dashboard/upload.html", context)
 
 
+@login_required
+def confirm_import_view(request, data_source_id):
+    """Start or cancel the import of a previewed upload"""
+    company = request.user.company
+    # Only previewed uploads wait for confirmation; other data sources can't be imported or deleted here
+    data_source = get_object_or_404(DataSource, id=data_source_id, company=company, previewed_at__isnull=False)
+
+    if request.method != "POST":
+        return redirect("upload_data")
+
+    if data_source.import_jobs.exists():
+        messages.warning(request, f"'{data_source.name}' has already been imported.")
+        return redirect("upload_data")
+
+    if "cancel" in request.POST:
+        data_source.file.delete(save=False)
+        data_source.delete()
+        messages.info(request, f"Upload of '{data_source.name}' cancelled.")
+        return redirect("upload_data")
+
+    data_source.previewed_at = None
+    data_source.save(update_fields=["previewed_at"])
+    return _start_import(request, data_source)
+
+
 @login_required
 def data_source_detail_view(request, data_source_id):
     """View for viewing details of a data source"""
@@ -178,6 +268,21 @@ def data_source_detail_view(request, data_source_id):
     return render(request, "dashboard/data_source_detail.html", context)
 
 
+@login_required
+def download_rejects_view(request, data_source_id):
+    """Download the rows of a data source that failed validation during import"""
+    company = request.user.company
+    data_source = get_object_or_404(DataSource, id=data_source_id, company=company)
+    if not data_source.rejects_file:
+        raise Http404("This data source has no rejected rows.")
+
+    return FileResponse(
+        data_source.rejects_file.open("rb"),
+        as_attachment=True,
+        filename=f"{data_source.name}_rejects.csv",
+    )
+
+
 @login_required
 def chat_session_detail_view(request, session_id):
     """View for viewing details of a chat session"""
@@ -389,6 +494,35 @@ def dashboard_data_api(request, dashboard_id):
     return JsonResponse(dashboard_data)
 
 
+@login_required
+def import_job_status_api(request, job_id):
+    """API endpoint for the progress of a background CSV import"""
+    user = request.user
+    company = user.company
+
+    if not company:
+        return JsonResponse({"error": "User not associated with a company"}, status=403)
+
+    job = get_object_or_404(
+        ImportJob.objects.select_related("data_source"),
+        id=job_id,
+        data_source__company=company,
+    )
+
+    return JsonResponse(
+        {
+            "id": job.id,
+            "status": job.status,
+            "progress": job.progress,
+            "rows_processed": job.data_source.rows_processed,
+            "message": job.message,
+            "data_source_id": job.data_source.id,
+            "data_source_name": job.data_source.name,
+            "finished": job.status not in ImportJob.ACTIVE_STATUSES,
+        }
+    )
+
+
 @login_required
 def search_chat_sessions(request):
     """View for searching chat sessions"""
@@ -488,7 +622,7 @@ def data_view(request):
         return redirect("dashboard")
 
     # Get available data sources
-    data_sources = DataSource.objects.filter(company=company)
+    data_sources = DataSource.objects.filter(company=company, previewed_at__isnull=True)
 
     # Get selected data source if any
     data_source_id = request.GET.get("data_source_id")
@@ -149,6 +149,53 @@ AUTHENTICATION_BACKENDS = [
 SITE_ID = 1
 ACCOUNT_EMAIL_VERIFICATION = "none"
 
+# CSV ingest
+# Number of ChatSession rows written per bulk INSERT when processing uploads
+CSV_INGEST_BATCH_SIZE = int(os.environ.get("CSV_INGEST_BATCH_SIZE", 1000))
+# Number of CSV rows read, converted and committed at a time (0 loads the whole file at once)
+CSV_INGEST_CHUNK_SIZE = int(os.environ.get("CSV_INGEST_CHUNK_SIZE", 50000))
+# Number of processes that parse uploads in parallel (1 disables parallel parsing)
+CSV_INGEST_WORKERS = int(os.environ.get("CSV_INGEST_WORKERS", 1))
+# Approximate size of the byte-range shards handed to each parser process
+CSV_INGEST_SHARD_BYTES = int(os.environ.get("CSV_INGEST_SHARD_BYTES", 16 * 1024 * 1024))
+# Bytes of complete records collected before importing them while a CSV upload is still
+# arriving (0 stores the whole upload first and imports it in the background). Importing
+# while uploading saves reading the file again, but the import runs inside the upload
+# request, which then takes as long as the import and holds a web worker meanwhile.
+CSV_UPLOAD_STREAM_BYTES = int(os.environ.get("CSV_UPLOAD_STREAM_BYTES", 0))
+# Hours a previewed upload waits for its import to be confirmed or cancelled before it is deleted
+UPLOAD_PREVIEW_EXPIRY_HOURS = int(os.environ.get("UPLOAD_PREVIEW_EXPIRY_HOURS", 24))
+
+# External data sync
+# Number of feed rows converted and written per bulk upsert
+EXTERNAL_SYNC_BATCH_SIZE = int(os.environ.get("EXTERNAL_SYNC_BATCH_SIZE", 2000))
+# Number of downloaded transcripts stored per database transaction
+TRANSCRIPT_WRITE_BATCH_SIZE = int(os.environ.get("TRANSCRIPT_WRITE_BATCH_SIZE", 100))
+# Seconds between the checks for data sources that are due for a sync; each source is
+# synced on its own sync_interval, see ExternalDataSource.schedule_next_sync
+EXTERNAL_SYNC_DISPATCH_INTERVAL = int(os.environ.get("EXTERNAL_SYNC_DISPATCH_INTERVAL", 60))
+# Shortest interval in seconds a busy data source is synced at
+EXTERNAL_SYNC_MIN_INTERVAL = int(os.environ.get("EXTERNAL_SYNC_MIN_INTERVAL", 300))
+# Longest interval an idle or failing data source backs off to, as a multiple of its sync_interval
+EXTERNAL_SYNC_MAX_BACKOFF = int(os.environ.get("EXTERNAL_SYNC_MAX_BACKOFF", 4))
+# Random part of each sync interval, so that sources don't all become due at the same time
+# (0.1 spreads them over +/- 10% of the interval)
+EXTERNAL_SYNC_JITTER = float(os.environ.get("EXTERNAL_SYNC_JITTER", 0.1))
+# Comma-separated line prefixes that start a message of the user or the assistant in a
+# transcript, in addition to the built-in ones (e.g. "Kunde:,Klant:")
+TRANSCRIPT_USER_PREFIXES = [
+    prefix.strip() for prefix in os.environ.get("TRANSCRIPT_USER_PREFIXES", "").split(",") if prefix.strip()
+]
+TRANSCRIPT_ASSISTANT_PREFIXES = [
+    prefix.strip() for prefix in os.environ.get("TRANSCRIPT_ASSISTANT_PREFIXES", "").split(",") if prefix.strip()
+]
+# Number of processes that sanitize the HTML of large batches of messages (1 sanitizes in the sync task).
+# Celery prefork workers can't start processes, so it only applies with e.g. --pool=solo or threads.
+MESSAGE_SANITIZE_WORKERS = int(os.environ.get("MESSAGE_SANITIZE_WORKERS", 1))
+# Sanitize the HTML of messages when they are first displayed instead of when they are synced;
+# run prewarm_message_html to sanitize the messages of the sessions that are viewed most
+MESSAGE_SANITIZE_ON_READ = os.environ.get("MESSAGE_SANITIZE_ON_READ", "False") == "True"
+
 # Celery Configuration
 # Check if Redis is available
 try:
@@ -164,6 +211,11 @@ try:
     # Redis is available, use it
     CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/0")
     CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+    # Redis holding the per-source sync locks, see data_integration.locks
+    SYNC_LOCK_REDIS_URL = os.environ.get(
+        "SYNC_LOCK_REDIS_URL",
+        f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:{os.environ.get('REDIS_PORT', 6379)}/{os.environ.get('REDIS_DB', 0)}",
+    )
     logger = logging.getLogger(__name__)
     logger.info("Using Redis for Celery broker and result backend")
 except (
@@ -174,6 +226,8 @@ except (
     # Redis is not available, use SQLite as fallback (works for development)
     CELERY_BROKER_URL = os.environ.get("CELERY_BROKER_URL", "sqla+sqlite:///celery.sqlite")
     CELERY_RESULT_BACKEND = os.environ.get("CELERY_RESULT_BACKEND", "db+sqlite:///results.sqlite")
+    # Without Redis, the per-source sync locks are kept in the database
+    SYNC_LOCK_REDIS_URL = None
     logger = logging.getLogger(__name__)
     logger.warning(f"Redis connection failed: {str(e)}. Using SQLite for Celery.")
 
@@ -183,15 +237,17 @@ CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
-# Get schedule from environment variables or use defaults
-CHAT_DATA_FETCH_INTERVAL = int(os.environ.get("CHAT_DATA_FETCH_INTERVAL", 3600))  # Default: 1 hour
-
+# The beat entry only starts the syncs of the data sources that are due
 CELERY_BEAT_SCHEDULE = {
     "fetch_chat_data_periodic": {
         "task": "data_integration.tasks.periodic_fetch_chat_data",
-        "schedule": CHAT_DATA_FETCH_INTERVAL,
+        "schedule": EXTERNAL_SYNC_DISPATCH_INTERVAL,
         "options": {
-            "expires": CHAT_DATA_FETCH_INTERVAL - 10,  # 10 seconds before next run
+            "expires": EXTERNAL_SYNC_DISPATCH_INTERVAL - 10,  # 10 seconds before next run
         },
     },
+    "delete_expired_upload_previews": {
+        "task": "data_integration.tasks.delete_expired_upload_previews",
+        "schedule": 3600,
+    },
 }
@@ -1,8 +1,9 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.shortcuts import get_object_or_404, redirect
 from django.utils.html import format_html
 
-from .models import ChatMessage, ChatSession, ExternalDataSource
-from .tasks import refresh_specific_source
+from .models import ChatMessage, ChatSession, ExternalDataSource, TranscriptCache
+from .tasks import queue_source_refresh
 
 
 @admin.register(ExternalDataSource)
@@ -13,12 +14,28 @@ class ExternalDataSourceAdmin(admin.ModelAdmin):
         "is_active",
         "last_synced",
         "status_badge",
+        "sync_state",
         "sync_interval",
+        "next_sync_at",
         "refresh_action",
     )
-    list_filter = ("is_active",)
+    list_filter = ("is_active", "sync_state")
     search_fields = ("name", "api_url")
-    readonly_fields = ("last_synced", "error_count", "last_error")
+    readonly_fields = (
+        "last_synced",
+        "error_count",
+        "last_error",
+        "next_sync_at",
+        "current_interval",
+        "sync_state",
+        "sync_task_id",
+        "sync_lease_expires",
+        "etag",
+        "last_modified",
+        "sync_watermark",
+        "failed_transcripts",
+    )
+    actions = ["reset_sync_state"]
     fieldsets = (
         (None, {"fields": ("name", "api_url", "is_active")}),
         (
@@ -28,10 +45,25 @@ class ExternalDataSourceAdmin(admin.ModelAdmin):
                 "description": "Credentials can also be provided via environment variables.",
             },
         ),
-        ("Sync Settings", {"fields": ("sync_interval", "timeout")}),
-        ("Status", {"fields": ("last_synced", "error_count", "last_error")}),
+        ("Sync Settings", {"fields": ("sync_interval", "timeout", "transcript_concurrency")}),
+        ("Status", {"fields": ("last_synced", "error_count", "last_error", "next_sync_at", "current_interval")}),
+        ("Current Sync", {"fields": ("sync_state", "sync_task_id", "sync_lease_expires")}),
+        (
+            "Incremental Sync",
+            {
+                "fields": ("etag", "last_modified", "sync_watermark", "failed_transcripts"),
+                "description": "Reset the sync state to process the whole feed again on the next sync.",
+            },
+        ),
     )
 
+    @admin.action(description="Reset sync state (next sync processes the whole feed)")
+    def reset_sync_state(self, request, queryset):
+        """Clear the ETag, Last-Modified and watermark of the selected sources"""
+        for source in queryset:
+            source.reset_sync_state()
+        self.message_user(request, f"Sync state reset for {queryset.count()} data source(s)")
+
     @admin.display(description="Status")
     def status_badge(self, obj):
         """Display a colored status badge"""
@@ -66,9 +98,16 @@ class ExternalDataSourceAdmin(admin.ModelAdmin):
         return "Inactive"
 
     def refresh_source(self, request, source_id):
-        """Run a task to refresh the source data"""
-        task = refresh_specific_source.delay(source_id)
-        self.message_user(request, f"Data refresh task started (Task ID: {task.id})")
+        """Run a task to refresh the source data, unless a sync of it is already queued or running"""
+        source = get_object_or_404(ExternalDataSource, pk=source_id)
+        task_id, started = queue_source_refresh(source)
+        if started:
+            self.message_user(request, f"Data refresh task started (Task ID: {task_id})")
+        else:
+            self.message_user(
+                request, f"A refresh of {source.name} is already in progress (Task ID: {task_id})", messages.INFO
+            )
+        return redirect("admin:data_integration_externaldatasource_changelist")
 
     def get_urls(self):
         from django.urls import path
@@ -102,7 +141,7 @@ class ChatSessionAdmin(admin.ModelAdmin):
 
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
-    list_display = ("session", "sender", "timestamp", "message_preview")
+    list_display = ("session", "position", "sender", "timestamp", "message_preview")
     list_filter = ("sender", "timestamp")
     search_fields = ("message", "session__session_id")
     readonly_fields = ("safe_html_display",)
@@ -117,9 +156,17 @@ class ChatMessageAdmin(admin.ModelAdmin):
     @admin.display(description="Sanitized HTML Preview")
     def safe_html_display(self, obj):
         """Display the sanitized HTML"""
-        if obj.safe_html_message:
+        safe_html = obj.get_safe_html()
+        if safe_html:
             return format_html(
                 '<div style="padding: 10px; border: 1px solid #ccc; background-color: #f9f9f9;">{}</div>',
-                obj.safe_html_message,
+                safe_html,
             )
         return "No HTML content"
+
+
+@admin.register(TranscriptCache)
+class TranscriptCacheAdmin(admin.ModelAdmin):
+    list_display = ("url", "etag", "last_modified", "fetched_at")
+    search_fields = ("url",)
+    readonly_fields = ("url", "etag", "last_modified", "content_hash", "fetched_at")
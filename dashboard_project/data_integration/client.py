@@ -0,0 +1,90 @@
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ExternalAPIClient:
+    """HTTP client shared by all requests of one sync of an external data source.
+
+    Requests go through one ``requests.Session`` whose connection pools keep
+    connections alive, so the CSV fetch and every transcript download to the
+    same host reuse a handful of TCP/TLS connections instead of opening one per
+    request. The client is safe to share between the transcript download threads;
+    ``pool_size`` should be at least the number of threads, otherwise surplus
+    connections are closed after each request instead of being reused.
+
+    Credentials are only sent to the host of ``base_url``, so transcripts hosted
+    elsewhere never receive them.
+    """
+
+    def __init__(self, base_url=None, auth=None, timeout=30, pool_size=10):
+        self.base_url = base_url
+        self.auth = auth
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(1, pool_size))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._adapter = adapter
+
+    @classmethod
+    def for_source(cls, source):
+        """Create a client with the URL, credentials, timeout and concurrency of an ExternalDataSource"""
+        username = source.get_auth_username()
+        return cls(
+            base_url=source.api_url,
+            auth=(username, source.get_auth_password()) if username else None,
+            timeout=source.timeout,
+            pool_size=source.transcript_concurrency,
+        )
+
+    def _auth_for(self, url):
+        """Return the credentials to send to ``url``, or None for other hosts than the API"""
+        if not self.auth or not self.base_url:
+            return None
+        api, target = urlsplit(self.base_url), urlsplit(url)
+        return self.auth if (api.scheme, api.netloc) == (target.scheme, target.netloc) else None
+
+    def get(self, url, **kwargs):
+        """Send a GET request over the pooled connections.
+
+        Args:
+            url: URL to fetch
+            **kwargs: Extra arguments for ``requests.Session.get``
+
+        Returns:
+            Response: The response; call ``raise_for_status`` to check it
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs.setdefault("auth", self._auth_for(url))
+        return self.session.get(url, **kwargs)
+
+    def connection_stats(self):
+        """Return how many requests were sent and how many connections were opened for them.
+
+        Returns:
+            dict: ``http_requests``, ``connections_opened`` and ``connections_reused``
+        """
+        pools = self._adapter.poolmanager.pools
+        opened = sent = 0
+        # The pool container of urllib3 can't be iterated directly, only its keys()
+        for key in pools.keys():  # noqa: SIM118
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+        return {
+            "http_requests": sent,
+            "connections_opened": opened,
+            "connections_reused": max(0, sent - opened),
+        }
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
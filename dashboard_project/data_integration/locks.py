@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+from functools import cache
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ExternalDataSource
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Deletes the lock only if it is still held by the given owner, so a sync whose lease
+# expired can't release the lock of the sync that took over
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@cache
+def _redis():
+    """Return the Redis client holding the sync locks, or None to keep them in the database"""
+    if redis is None or not settings.SYNC_LOCK_REDIS_URL:
+        return None
+    return redis.Redis.from_url(settings.SYNC_LOCK_REDIS_URL, socket_connect_timeout=2)
+
+
+def _lock_key(source_id):
+    return f"data_integration:sync_lock:{source_id}"
+
+
+def _available(now):
+    """Filter for sources without a queued or running sync, or whose sync's lease expired"""
+    return Q(sync_state=ExternalDataSource.SYNC_IDLE) | Q(sync_lease_expires__lt=now)
+
+
+def claim_sync(source_id, task_id, ttl, **fields):
+    """Mark a data source as queued for a sync by ``task_id``.
+
+    Triggers of a sync (the beat schedule, the admin and the refresh views) claim
+    the source before starting a task, so a source gets at most one queued or
+    running sync at a time. The claim expires after ``ttl`` seconds, in case the
+    task is lost.
+
+    Args:
+        source_id: ID of the ExternalDataSource
+        task_id: ID of the Celery task that will sync the source
+        ttl: Seconds until the claim expires
+        **fields: Other fields of the source to update along with the claim
+
+    Returns:
+        bool: False if a sync of the source is already queued or running
+    """
+    now = timezone.now()
+    claimed = ExternalDataSource.objects.filter(_available(now), id=source_id).update(
+        sync_state=ExternalDataSource.SYNC_QUEUED,
+        sync_task_id=task_id,
+        sync_lease_expires=now + timedelta(seconds=ttl),
+        **fields,
+    )
+    return bool(claimed)
+
+
+def acquire_sync_lock(source_id, task_id, ttl):
+    """Take the lock of a data source for the sync by ``task_id``.
+
+    With Redis (``settings.SYNC_LOCK_REDIS_URL``), the lock is a key set with
+    ``SET NX PX``. Otherwise, or while Redis can't be reached, it is a lease on the
+    source in the database, which the task that claimed the source can take, or any
+    task if the source is idle or its lease expired. Either way the source is marked
+    as running.
+
+    Args:
+        source_id: ID of the ExternalDataSource
+        task_id: ID of the Celery task syncing the source
+        ttl: Seconds until the lock expires; should be longer than the sync can take
+
+    Returns:
+        bool: False if another sync holds the lock
+    """
+    now = timezone.now()
+    running = {
+        "sync_state": ExternalDataSource.SYNC_RUNNING,
+        "sync_task_id": task_id,
+        "sync_lease_expires": now + timedelta(seconds=ttl),
+    }
+
+    client = _redis()
+    if client is not None:
+        try:
+            acquired = client.set(_lock_key(source_id), task_id, nx=True, px=ttl * 1000)
+        except redis.RedisError as e:
+            logger.warning(f"Could not take the sync lock of data source {source_id} in Redis, using the database: {e}")
+        else:
+            if not acquired:
+                return False
+            ExternalDataSource.objects.filter(id=source_id).update(**running)
+            return True
+
+    sources = ExternalDataSource.objects.filter(_available(now) | Q(sync_task_id=task_id), id=source_id)
+    return bool(sources.update(**running))
+
+
+def release_sync_lock(source_id, task_id):
+    """Release the lock of a data source taken by ``task_id`` and mark the source as idle.
+
+    Does nothing if the lock expired and was taken by another sync meanwhile.
+
+    Args:
+        source_id: ID of the ExternalDataSource
+        task_id: ID of the Celery task that synced the source
+    """
+    client = _redis()
+    if client is not None:
+        try:
+            client.eval(RELEASE_SCRIPT, 1, _lock_key(source_id), task_id)
+        except redis.RedisError as e:
+            # The lock expires by itself
+            logger.warning(f"Could not release the sync lock of data source {source_id}: {e}")
+
+    ExternalDataSource.objects.filter(id=source_id, sync_task_id=task_id).update(
+        sync_state=ExternalDataSource.SYNC_IDLE, sync_task_id=None, sync_lease_expires=None
+    )
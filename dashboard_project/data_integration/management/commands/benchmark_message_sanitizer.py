@@ -0,0 +1,101 @@
+# data_integration/management/commands/benchmark_message_sanitizer.py
+
+import random
+import time
+
+import bleach
+from bleach.css_sanitizer import CSSSanitizer
+from data_integration.sanitizer import (
+    ALLOWED_ATTRIBUTES,
+    ALLOWED_CSS_PROPERTIES,
+    ALLOWED_TAGS,
+    get_cleaner,
+    sanitize_many,
+)
+from django.core.management.base import BaseCommand
+
+
+def clean_per_message(text):
+    """Sanitize a message the way messages used to be: with a new CSS sanitizer and cleaner per call"""
+    css_sanitizer = CSSSanitizer(allowed_css_properties=ALLOWED_CSS_PROPERTIES)
+    return bleach.clean(
+        text,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        css_sanitizer=css_sanitizer,
+        strip=True,
+    )
+
+
+class Command(BaseCommand):
+    help = "Benchmark sanitizing the HTML of chat messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=20000,
+            help="Number of generated messages",
+        )
+        parser.add_argument(
+            "--markup-ratio",
+            type=float,
+            default=0.2,
+            help="Share of the messages that contain HTML",
+        )
+        parser.add_argument(
+            "--workers",
+            type=str,
+            default="2,4",
+            help="Comma-separated numbers of processes to benchmark sanitize_many with",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        texts = self.generate_messages(options["messages"], options["markup_ratio"])
+        self.stdout.write(f"Sanitizing {len(texts)} messages ({options['markup_ratio']:.0%} with HTML)")
+
+        def shared_cleaner(batch):
+            cleaner = get_cleaner()
+            return [cleaner.clean(text) for text in batch]
+
+        sanitizers = [
+            ("new cleaner per message", lambda batch: [clean_per_message(text) for text in batch]),
+            ("shared cleaner", shared_cleaner),
+            ("shared cleaner, plain text skipped", lambda batch: sanitize_many(batch, workers=1)),
+        ]
+        sanitizers.extend(
+            (f"{workers} processes, plain text skipped", lambda batch, n=workers: sanitize_many(batch, workers=n))
+            for workers in [int(value) for value in options["workers"].split(",") if value]
+        )
+
+        expected = None
+        baseline = None
+        for name, sanitize in sanitizers:
+            started = time.perf_counter()
+            results = sanitize(texts)
+            seconds = time.perf_counter() - started
+            rate = len(texts) / seconds if seconds > 0 else 0.0
+            baseline = baseline or rate
+            self.stdout.write(f"  - {name}: {seconds:.2f}s ({rate:.0f} messages/sec, {rate / baseline:.2f}x)")
+
+            expected = expected or results
+            differences = sum(1 for a, b in zip(expected, results, strict=True) if a != b)
+            if differences:
+                self.stdout.write(self.style.WARNING(f"    {differences} messages differ from the first sanitizer"))
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def generate_messages(self, count, markup_ratio):
+        """Return plain-text chat messages, some of them with HTML markup"""
+        rng = random.Random(0)
+        messages = []
+        for i in range(count):
+            if rng.random() < markup_ratio:
+                messages.append(
+                    f'<p style="color: red; position: fixed;">Order <b>{i}</b> & its '
+                    f'<a href="https://example.com/{i}" onclick="steal()">tracking link</a></p>'
+                    "<script>alert(1)</script>"
+                )
+            else:
+                messages.append(f"Message {i}: when will my order arrive? It was due on Monday, thanks!")
+        return messages
@@ -0,0 +1,113 @@
+# data_integration/management/commands/benchmark_transcript_fetch.py
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from data_integration.client import ExternalAPIClient
+from data_integration.models import ChatSession
+from data_integration.utils import iter_transcripts
+from django.core.management.base import BaseCommand
+
+
+class StubTranscriptHandler(BaseHTTPRequestHandler):
+    """Serve a fixed transcript after a delay that simulates the round trip to a remote API"""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; with Nagle's algorithm the body of every
+    # response on a kept-alive connection would wait for the client's delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.05
+    body = b""
+
+    def do_GET(self):  # noqa: N802
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):  # noqa: A002, ARG002
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections at high concurrency
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent transcript downloads against a local stub HTTP server"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--transcripts",
+            type=int,
+            default=500,
+            help="Number of transcripts to download per run",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=str,
+            default="1,2,4,8,16,32",
+            help="Comma-separated concurrency limits to benchmark",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=50,
+            help="Simulated server latency per request in milliseconds",
+        )
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=20,
+            help="Number of messages in the served transcript",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        lines = []
+        for i in range(options["messages"]):
+            lines.append(f"User: Question {i} about my order?")
+            lines.append(f"Assistant: Answer {i}, your order is on its way.")
+        handler = type(
+            "Handler",
+            (StubTranscriptHandler,),
+            {"latency": options["latency"] / 1000, "body": "\n".join(lines).encode()},
+        )
+
+        server = StubServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        self.stdout.write(
+            f"Stub server at {base_url} ({options['latency']:.0f} ms latency), "
+            f"{options['transcripts']} transcripts per run"
+        )
+
+        # Unsaved sessions; only the downloads are measured, nothing is written
+        sessions = [
+            ChatSession(session_id=f"bench-{i}", full_transcript_url=f"{base_url}/transcripts/{i}")
+            for i in range(options["transcripts"])
+        ]
+
+        try:
+            baseline = None
+            for concurrency in [int(value) for value in options["concurrency"].split(",")]:
+                with ExternalAPIClient(pool_size=concurrency) as client:
+                    started = time.perf_counter()
+                    failed = sum(1 for _, _, error in iter_transcripts(sessions, client, concurrency) if error)
+                    seconds = time.perf_counter() - started
+                    connections = client.connection_stats()["connections_opened"]
+                rate = len(sessions) / seconds if seconds > 0 else 0.0
+                baseline = baseline or rate
+                self.stdout.write(
+                    f"  - concurrency {concurrency}: {len(sessions)} transcripts in {seconds:.2f}s "
+                    f"({rate:.0f} transcripts/sec, {rate / baseline:.2f}x, {connections} connections, {failed} failed)"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
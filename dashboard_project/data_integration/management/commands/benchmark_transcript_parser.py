@@ -0,0 +1,90 @@
+# data_integration/management/commands/benchmark_transcript_parser.py
+
+import random
+import time
+
+from data_integration.utils import ASSISTANT_PREFIXES, USER_PREFIXES, match_speaker
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def scan_speaker(line, user_prefixes, assistant_prefixes):
+    """Match the speaker prefix of a line the way the parser used to: by trying every prefix in turn"""
+    is_user = any(line.startswith(prefix) for prefix in user_prefixes)
+    is_assistant = any(line.startswith(prefix) for prefix in assistant_prefixes)
+    if not (is_user or is_assistant):
+        return None
+    sender, prefixes = ("User", user_prefixes) if is_user else ("Assistant", assistant_prefixes)
+    for prefix in prefixes:
+        if line.startswith(prefix):
+            return sender, len(prefix)
+
+
+class Command(BaseCommand):
+    help = "Benchmark matching the speaker prefixes of transcript lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            type=str,
+            help="Transcript file to parse. A synthetic transcript is generated if omitted.",
+            required=False,
+        )
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=200000,
+            help="Number of lines in the generated transcript",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Number of runs per matcher; the fastest one is reported",
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        if options.get("file"):
+            with open(options["file"], encoding="utf-8") as handle:
+                lines = [line.strip() for line in handle.read().splitlines()]
+        else:
+            lines = self.generate_lines(options["lines"])
+        self.stdout.write(f"Matching {len(lines)} transcript lines")
+
+        user_prefixes = USER_PREFIXES + settings.TRANSCRIPT_USER_PREFIXES
+        assistant_prefixes = ASSISTANT_PREFIXES + settings.TRANSCRIPT_ASSISTANT_PREFIXES
+        matchers = [
+            ("prefix scan", lambda line: scan_speaker(line, user_prefixes, assistant_prefixes)),
+            ("compiled regex", match_speaker),
+        ]
+
+        results = {}
+        baseline = None
+        for name, matcher in matchers:
+            seconds = float("inf")
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                results[name] = [matcher(line) for line in lines]
+                seconds = min(seconds, time.perf_counter() - started)
+            per_line = seconds / len(lines) * 1e9 if lines else 0.0
+            baseline = baseline or per_line
+            self.stdout.write(
+                f"  - {name}: {seconds:.3f}s ({per_line:.0f} ns/line, {baseline / per_line if per_line else 0.0:.2f}x)"
+            )
+
+        differences = sum(1 for a, b in zip(*results.values(), strict=True) if a != b)
+        if differences:
+            self.stdout.write(self.style.WARNING(f"The matchers disagree on {differences} lines"))
+        self.stdout.write(self.style.SUCCESS("Benchmark complete"))
+
+    def generate_lines(self, count):
+        """Return transcript lines with random speaker prefixes and continuation lines"""
+        rng = random.Random(0)
+        prefixes = USER_PREFIXES + ASSISTANT_PREFIXES
+        lines = []
+        for i in range(count):
+            if i % 3:
+                lines.append(f"{rng.choice(prefixes)} Message {i} about my order and the delivery date")
+            else:
+                lines.append(f"continued text of message {i}, without a speaker prefix")
+        return lines
@@ -1,11 +1,29 @@
-from data_integration.utils import fetch_and_store_chat_data
+from data_integration.models import ExternalDataSource
+from data_integration.tasks import sync_source_now
 from django.core.management.base import BaseCommand
 
 
 class Command(BaseCommand):
     help = "Fetches chat data from the external API and stores it in the database"
 
-    def handle(self, *_args, **_options):  # Mark as unused
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Process the whole feed instead of only the sessions since the last sync",
+        )
+
+    def handle(self, *_args, **options):
+        source = ExternalDataSource.objects.filter(is_active=True).first()
+        if source is None:
+            self.stdout.write(self.style.WARNING("No active data source found."))
+            return
+
         self.stdout.write(self.style.SUCCESS("Starting data fetch..."))
-        fetch_and_store_chat_data()
-        self.stdout.write(self.style.SUCCESS("Successfully fetched and stored chat data."))
+        result = sync_source_now(source.id, full=options["full"])
+        if result["skipped"]:
+            self.stdout.write(self.style.WARNING(f"Data source {source.name} is already being synced."))
+        elif not result["success"]:
+            self.stdout.write(self.style.ERROR(f"Failed to fetch chat data: {result['error']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Successfully fetched and stored chat data."))
@@ -0,0 +1,64 @@
+# data_integration/management/commands/prewarm_message_html.py
+
+import time
+from datetime import timedelta
+
+from data_integration.models import ChatMessage
+from data_integration.utils import sanitize_stored_messages
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Sanitize the HTML of messages synced with MESSAGE_SANITIZE_ON_READ ahead of their first display, "
+        "for recent sessions or the given ones"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--session-id",
+            action="append",
+            dest="session_ids",
+            help="Session whose messages to sanitize; can be given several times",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Sanitize the messages of sessions started in the last number of days (ignored with --session-id)",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Sanitize the messages of all sessions",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of messages sanitized and updated at a time",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Number of processes sanitizing each batch (defaults to MESSAGE_SANITIZE_WORKERS)",
+            required=False,
+        )
+
+    def handle(self, *args, **options):  # noqa: ARG002
+        messages = ChatMessage.objects.all()
+        if options["session_ids"]:
+            messages = messages.filter(session__session_id__in=options["session_ids"])
+            scope = f"{len(options['session_ids'])} sessions"
+        elif not options["all"]:
+            since = timezone.now() - timedelta(days=options["days"])
+            messages = messages.filter(session__start_time__gte=since)
+            scope = f"sessions of the last {options['days']} days"
+        else:
+            scope = "all sessions"
+
+        started = time.perf_counter()
+        sanitized = sanitize_stored_messages(messages, batch_size=options["batch_size"], workers=options["workers"])
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Sanitized {sanitized} messages of {scope} in {seconds:.2f}s"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0002_externaldatasource_error_count_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="transcript_concurrency",
+            field=models.PositiveSmallIntegerField(
+                default=8, help_text="Number of transcripts downloaded at the same time. Default is 8"
+            ),
+        ),
+    ]
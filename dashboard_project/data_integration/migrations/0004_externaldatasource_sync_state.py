@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0003_externaldatasource_transcript_concurrency"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="etag",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="last_modified",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="sync_watermark",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Start time of the newest synced session; older sessions are skipped by the next sync",
+                null=True,
+            ),
+        ),
+    ]
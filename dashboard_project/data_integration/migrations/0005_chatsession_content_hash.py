@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0004_externaldatasource_sync_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatsession",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0005_chatsession_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TranscriptCache",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("url", models.URLField(max_length=1024, unique=True)),
+                ("etag", models.CharField(blank=True, max_length=255, null=True)),
+                ("last_modified", models.CharField(blank=True, max_length=64, null=True)),
+                ("content_hash", models.CharField(max_length=32)),
+                ("fetched_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="chatsession",
+            name="transcript_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0006_transcript_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="current_interval",
+            field=models.IntegerField(
+                blank=True,
+                help_text="Seconds until the next sync, adapted to how much changed in recent syncs",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="next_sync_at",
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
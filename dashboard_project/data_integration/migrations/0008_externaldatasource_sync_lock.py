@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0007_externaldatasource_schedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="sync_lease_expires",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Time after which a queued or running sync is presumed lost and the source can be synced again",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="sync_state",
+            field=models.CharField(
+                choices=[("idle", "Idle"), ("queued", "Queued"), ("running", "Running")], default="idle", max_length=16
+            ),
+        ),
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="sync_task_id",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:01
+
+import hashlib
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_positions(apps, schema_editor):  # noqa: ARG001
+    """Number the stored messages of each session in the order they were created, and hash them"""
+    ChatMessage = apps.get_model("data_integration", "ChatMessage")
+    next_position = {}
+    last_pk = 0
+    while True:
+        batch = list(
+            ChatMessage.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("id", "session_id", "sender", "message")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        for message in batch:
+            message.position = next_position.get(message.session_id, 0)
+            next_position[message.session_id] = message.position + 1
+            # Same hash as data_integration.utils.message_content_hash
+            content = f"{message.sender}\x1f{message.message}"
+            message.content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        ChatMessage.objects.bulk_update(batch, ["position", "content_hash"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0008_externaldatasource_sync_lock"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatmessage",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="chatmessage",
+            name="position",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0009_chatmessage_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="externaldatasource",
+            name="failed_transcripts",
+            field=models.JSONField(
+                blank=True,
+                default=list,
+                help_text="Primary keys of the sessions whose transcript could not be stored; retried by every sync",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("data_integration", "0010_externaldatasource_failed_transcripts"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="externaldatasource",
+            name="sync_watermark",
+            field=models.DateTimeField(
+                blank=True, help_text="Start time up to which every session of the feed has been stored", null=True
+            ),
+        ),
+    ]
@@ -1,6 +1,12 @@
 import os
+import random
+from datetime import timedelta
 
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .sanitizer import sanitize_html
 
 
 class ChatSession(models.Model):
@@ -21,6 +27,10 @@ class ChatSession(models.Model):
     category = models.CharField(max_length=255, null=True, blank=True)
     initial_msg = models.TextField(null=True, blank=True)
     user_rating = models.IntegerField(null=True, blank=True)
+    # Hash of the feed row the session was last stored from; unchanged rows are not written again
+    content_hash = models.CharField(max_length=32, null=True, blank=True)
+    # Hash of the transcript the session's messages were parsed from; unchanged transcripts aren't parsed again
+    transcript_hash = models.CharField(max_length=32, null=True, blank=True)
 
     def __str__(self):
         return self.session_id
@@ -31,13 +41,55 @@ class ChatMessage(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)  # Changed to auto_now_add for simplicity
     sender = models.CharField(max_length=255)  # "User" or "Assistant"
     message = models.TextField()
-    safe_html_message = models.TextField(blank=True, null=True)  # For storing sanitized HTML
+    # Sanitized HTML of the message; None until it is sanitized when settings.MESSAGE_SANITIZE_ON_READ is set
+    safe_html_message = models.TextField(blank=True, null=True)
+    # Index of the message in its transcript and hash of its sender and text; a transcript that is
+    # stored again only writes the messages that differ from the stored ones at the same position
+    position = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=32, null=True, blank=True)
+
+    def get_safe_html(self):
+        """Return the sanitized HTML of the message, sanitizing and storing it on first use.
+
+        Messages synced with ``settings.MESSAGE_SANITIZE_ON_READ`` are stored without
+        their sanitized HTML; it is written back the first time the message is displayed,
+        so every message is sanitized at most once.
+        """
+        if self.safe_html_message is None:
+            self.safe_html_message = sanitize_html(self.message)
+            if self.pk is not None:
+                ChatMessage.objects.filter(pk=self.pk, safe_html_message__isnull=True).update(
+                    safe_html_message=self.safe_html_message
+                )
+        return self.safe_html_message
 
     def __str__(self):
         return f"{self.session.session_id} - {self.sender} at {self.timestamp}"
 
 
+class TranscriptCache(models.Model):
+    """HTTP validators and content hash of the last downloaded version of a transcript"""
+
+    url = models.URLField(max_length=1024, unique=True)
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    last_modified = models.CharField(max_length=64, blank=True, null=True)
+    content_hash = models.CharField(max_length=32)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.url
+
+
 class ExternalDataSource(models.Model):
+    SYNC_IDLE = "idle"
+    SYNC_QUEUED = "queued"
+    SYNC_RUNNING = "running"
+    SYNC_STATE_CHOICES = [
+        (SYNC_IDLE, "Idle"),
+        (SYNC_QUEUED, "Queued"),
+        (SYNC_RUNNING, "Running"),
+    ]
+
     name = models.CharField(max_length=255, default="External API")
     api_url = models.URLField(default="https://proto.notso.ai/jumbo/chats")
     auth_username = models.CharField(max_length=255, blank=True, null=True)
@@ -53,6 +105,38 @@ class ExternalDataSource(models.Model):
         default=300,
         help_text="Timeout in seconds for each sync operation. Default is 300 (5 minutes)",
     )
+    transcript_concurrency = models.PositiveSmallIntegerField(
+        default=8,
+        help_text="Number of transcripts downloaded at the same time. Default is 8",
+    )
+    # Incremental sync state, see data_integration.utils.sync_source
+    etag = models.CharField(max_length=255, blank=True, null=True)
+    last_modified = models.CharField(max_length=64, blank=True, null=True)
+    sync_watermark = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Start time up to which every session of the feed has been stored",
+    )
+    failed_transcripts = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Primary keys of the sessions whose transcript could not be stored; retried by every sync",
+    )
+    # Adaptive schedule, see schedule_next_sync
+    next_sync_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    current_interval = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text="Seconds until the next sync, adapted to how much changed in recent syncs",
+    )
+    # Queued or running sync, see data_integration.locks
+    sync_state = models.CharField(max_length=16, choices=SYNC_STATE_CHOICES, default=SYNC_IDLE)
+    sync_task_id = models.CharField(max_length=255, blank=True, null=True)
+    sync_lease_expires = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Time after which a queued or running sync is presumed lost and the source can be synced again",
+    )
 
     def get_auth_username(self):
         """Get username from environment variable if set, otherwise use stored value"""
@@ -64,6 +148,40 @@ class ExternalDataSource(models.Model):
         env_password = os.environ.get("EXTERNAL_API_PASSWORD")
         return env_password if env_password else self.auth_password
 
+    def reset_sync_state(self):
+        """Forget the incremental sync state, so the next sync processes the whole feed again"""
+        self.etag = None
+        self.last_modified = None
+        self.sync_watermark = None
+        self.save(update_fields=["etag", "last_modified", "sync_watermark"])
+
+    def schedule_next_sync(self, changes, failed=False):
+        """Adapt the sync interval to the outcome of a sync and set the time of the next one.
+
+        The interval starts at ``sync_interval``. It halves after every sync that created
+        or updated sessions, down to ``settings.EXTERNAL_SYNC_MIN_INTERVAL``, and grows by
+        half after every sync that didn't, or doubles after a failed one, up to
+        ``settings.EXTERNAL_SYNC_MAX_BACKOFF`` times ``sync_interval``. The time of the
+        next sync is jittered by ``settings.EXTERNAL_SYNC_JITTER``. Doesn't save the source.
+
+        Args:
+            changes: Number of sessions the sync created or updated
+            failed: Whether the sync failed
+        """
+        shortest = min(self.sync_interval, settings.EXTERNAL_SYNC_MIN_INTERVAL)
+        longest = self.sync_interval * settings.EXTERNAL_SYNC_MAX_BACKOFF
+        interval = self.current_interval or self.sync_interval
+        if failed:
+            interval *= 2
+        elif changes:
+            interval //= 2
+        else:
+            interval = interval * 3 // 2
+        self.current_interval = max(shortest, min(longest, interval))
+
+        jitter = random.uniform(-settings.EXTERNAL_SYNC_JITTER, settings.EXTERNAL_SYNC_JITTER)
+        self.next_sync_at = timezone.now() + timedelta(seconds=self.current_interval * (1 + jitter))
+
     def get_status(self):
         """Get the status of this data source"""
         if not self.is_active:
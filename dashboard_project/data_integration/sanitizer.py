@@ -0,0 +1,215 @@
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from bleach.css_sanitizer import CSSSanitizer
+from bleach.sanitizer import Cleaner
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_TAGS = [
+    "b",
+    "i",
+    "u",
+    "em",
+    "strong",
+    "a",
+    "br",
+    "p",
+    "ul",
+    "ol",
+    "li",
+    "span",
+    "div",
+    "pre",
+    "code",
+    "blockquote",
+]
+
+ALLOWED_ATTRIBUTES = {
+    "a": ["href", "title", "target"],
+    "span": ["style", "class"],
+    "div": ["style", "class"],
+    "p": ["style", "class"],
+    "pre": ["style", "class"],
+}
+
+ALLOWED_CSS_PROPERTIES = [
+    "color",
+    "background-color",
+    "font-family",
+    "font-size",
+    "font-weight",
+    "font-style",
+    "text-decoration",
+    "text-align",
+    "margin",
+    "margin-left",
+    "margin-right",
+    "margin-top",
+    "margin-bottom",
+    "padding",
+    "padding-left",
+    "padding-right",
+    "padding-top",
+    "padding-bottom",
+    "border",
+    "border-radius",
+    "width",
+    "height",
+    "line-height",
+]
+
+# The only characters the cleaner changes in text without markup: the HTML special
+# characters, which it escapes, and the control characters other than tab and newline,
+# which it replaces. Text without any of them comes out of the cleaner unchanged.
+NEEDS_CLEANING_RE = re.compile(r"[<>&\x00-\x08\x0b-\x1f]")
+
+# Below this many texts to clean, starting the worker processes costs more than it saves
+PARALLEL_MIN_TEXTS = 500
+
+# bleach's Cleaner keeps parser state between calls, so each thread gets its own,
+# as well as its own pool of worker processes (see sanitizer_pool)
+_local = threading.local()
+
+
+def get_cleaner():
+    """Return the Cleaner of the current thread, built on first use.
+
+    Building a Cleaner sets up an html5lib parser, serializer and CSS sanitizer,
+    which takes longer than cleaning a typical message, so it is built once and
+    reused for every message the thread sanitizes.
+    """
+    cleaner = getattr(_local, "cleaner", None)
+    if cleaner is None:
+        cleaner = Cleaner(
+            tags=ALLOWED_TAGS,
+            attributes=ALLOWED_ATTRIBUTES,
+            css_sanitizer=CSSSanitizer(allowed_css_properties=ALLOWED_CSS_PROPERTIES),
+            strip=True,
+        )
+        _local.cleaner = cleaner
+    return cleaner
+
+
+def sanitize_html(text):
+    """Sanitize the HTML of a message so it is safe to display.
+
+    Only the tags, attributes and CSS properties above are kept. Text without
+    markup, entities or control characters is returned as is, without parsing it.
+
+    Args:
+        text: The message text, which may contain HTML
+
+    Returns:
+        str: The sanitized HTML
+    """
+    if not NEEDS_CLEANING_RE.search(text):
+        return text
+    return get_cleaner().clean(text)
+
+
+def _process_count(workers):
+    """Return the number of processes to sanitize with, 1 where child processes can't be started"""
+    if workers is None:
+        workers = settings.MESSAGE_SANITIZE_WORKERS
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # Daemonic processes (e.g. Celery prefork workers) can't start child processes
+        logger.warning("Parallel sanitizing is not available in a daemonic process; sanitizing in-process")
+        return 1
+    return workers
+
+
+class _LazyPool:
+    """Process pool that is only started when a batch is large enough to use it"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = None
+
+    def get(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+@contextmanager
+def sanitizer_pool(workers=None):
+    """Share one pool of worker processes between the ``sanitize_many`` calls of the current thread.
+
+    Without it, every large batch starts and stops a pool of its own. The processes
+    are only started by the first batch of at least ``PARALLEL_MIN_TEXTS`` texts, and
+    stopped at the end of the block. Nested blocks use the outer pool.
+
+    Args:
+        workers: Number of processes (defaults to ``settings.MESSAGE_SANITIZE_WORKERS``;
+                 1 sanitizes in this process)
+    """
+    if getattr(_local, "pool", None) is not None:
+        yield
+        return
+    _local.pool = _LazyPool(_process_count(workers))
+    try:
+        yield
+    finally:
+        _local.pool.shutdown()
+        _local.pool = None
+
+
+def _sanitize_chunk(texts):
+    """Clean a list of texts that need cleaning, in a pool worker"""
+    cleaner = get_cleaner()
+    return [cleaner.clean(text) for text in texts]
+
+
+def sanitize_many(texts, workers=None):
+    """Sanitize the HTML of many messages, in parallel processes for large batches.
+
+    Texts that need no cleaning are skipped first; the rest are split into chunks
+    for a pool of ``workers`` processes when there are at least
+    ``PARALLEL_MIN_TEXTS`` of them, and cleaned in this process otherwise. The
+    pool of the enclosing ``sanitizer_pool`` block is used if there is one. In a
+    daemonic process, e.g. a Celery prefork worker, texts are always cleaned in
+    this process.
+
+    Args:
+        texts: The message texts
+        workers: Number of processes (defaults to the ``sanitizer_pool`` block or
+                 ``settings.MESSAGE_SANITIZE_WORKERS``; 1 sanitizes in this process)
+
+    Returns:
+        list: The sanitized HTML of each text, in the order of ``texts``
+    """
+    results = list(texts)
+    pending = [i for i, text in enumerate(results) if NEEDS_CLEANING_RE.search(text)]
+    pool = getattr(_local, "pool", None)
+    if workers is None and pool is not None:
+        workers = pool.workers
+    workers = _process_count(workers)
+
+    if workers <= 1 or len(pending) < PARALLEL_MIN_TEXTS:
+        cleaner = get_cleaner()
+        for i in pending:
+            results[i] = cleaner.clean(results[i])
+        return results
+
+    # A few chunks per worker balance the load without paying the IPC per text
+    chunk_size = -(-len(pending) // (workers * 4))
+    chunks = [[results[i] for i in pending[start : start + chunk_size]] for start in range(0, len(pending), chunk_size)]
+    if pool is not None and pool.workers == workers:
+        cleaned = [text for chunk in pool.get().map(_sanitize_chunk, chunks) for text in chunk]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            cleaned = [text for chunk in executor.map(_sanitize_chunk, chunks) for text in chunk]
+    for i, text in zip(pending, cleaned, strict=True):
+        results[i] = text
+    return results
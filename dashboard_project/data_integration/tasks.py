@@ -1,10 +1,17 @@
 import logging
 import os
+from datetime import timedelta
+from uuid import uuid4
 
-from celery import shared_task
-from django.db import utils as django_db_utils
+from celery import chord, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from dashboard.models import ImportJob
+from dashboard.utils import delete_expired_previews, run_import_job
+from django.conf import settings
+from django.db.models import F, Q
 from django.utils import timezone
 
+from .locks import acquire_sync_lock, claim_sync, release_sync_lock
 from .models import ExternalDataSource
 from .utils import fetch_and_store_chat_data
 
@@ -23,69 +30,199 @@ def test_task(self):
     bind=True,
     autoretry_for=(Exception,),
     retry_kwargs={"max_retries": 3, "countdown": 60},
-    soft_time_limit=int(os.environ.get("FETCH_DATA_TIMEOUT", 300)),  # 5 minutes default
 )
-def periodic_fetch_chat_data(self):
+def periodic_fetch_chat_data(self, force=False):
     """Periodically fetch and process chat data from external sources.
 
-    This task:
-    1. Fetches data from all active external data sources
-    2. Processes and stores the data in the database
-    3. Updates the last_synced timestamp on each source
-    4. Handles errors with retries
+    Runs every EXTERNAL_SYNC_DISPATCH_INTERVAL seconds. This task:
+    1. Claims the active external data sources whose next_sync_at has passed
+    2. Starts one sync_external_source task per claimed source, limited to the
+       timeout of the source, and runs them in parallel as a chord
+    3. Records the results and schedules the next syncs with record_sync_results
+
+    Sources with a queued or running sync aren't claimed again; their sync takes
+    the place of this one. A claimed source isn't due again until its timeout has
+    passed, so a sync whose results never get recorded is retried after that.
+
+    Args:
+        force: Sync all active sources, whether they are due or not
     """
     logger.info("Starting periodic chat data fetch (task_id: %s)...", self.request.id)
+    now = timezone.now()
+    due = ExternalDataSource.objects.filter(is_active=True)
+    if not force:
+        due = due.filter(Q(next_sync_at__isnull=True) | Q(next_sync_at__lte=now))
+
+    header = []
+    for source in due.only("id", "timeout"):
+        task_id = str(uuid4())
+        lease = _lease_seconds(source)
+        if claim_sync(source.id, task_id, lease, next_sync_at=now + timedelta(seconds=lease)):
+            header.append(sync_external_source.s(source.id).set(task_id=task_id, soft_time_limit=source.timeout))
+
+    if not header:
+        logger.info("No external data sources are due for a sync.")
+        return "No data sources due"
+
+    result = chord(header)(record_sync_results.s())
+    result_message = f"Started sync of {len(header)} data sources (callback task_id: {result.id})"
+    logger.info(result_message)
+    return result_message
+
+
+@shared_task(
+    name="data_integration.tasks.sync_external_source",
+    bind=True,
+    soft_time_limit=int(os.environ.get("FETCH_DATA_TIMEOUT", 300)),  # 5 minutes default
+)
+def sync_external_source(self, source_id, full=False):
+    """Sync one external data source, as part of the chord of periodic_fetch_chat_data.
+
+    Errors are returned instead of raised, so one failing source doesn't keep the
+    chord callback from recording the results of the others. The sync is skipped
+    if another sync of the source holds its lock.
+
+    Args:
+        source_id: ID of the ExternalDataSource to sync
+        full: Process and store the whole feed, ignoring the incremental sync state
+
+    Returns:
+        dict: ``source_id``, ``success``, ``skipped`` and ``error``, plus the stats of the sync
+    """
+    logger.info(f"Syncing data source ID: {source_id} (task_id: {self.request.id})")
+    return _sync_locked(source_id, self.request.id or str(uuid4()), full=full)
+
+
+def _lease_seconds(source):
+    """Return how long a queued or running sync of a source holds it"""
+    return source.timeout + settings.EXTERNAL_SYNC_DISPATCH_INTERVAL
+
+
+def _sync_locked(source_id, task_id, full=False):
+    """Sync a data source while holding its lock; see sync_external_source.
+
+    Never raises: errors, including ones while taking or releasing the lock, are
+    returned in the result.
+    """
+    result = {"source_id": source_id, "success": False, "skipped": False, "error": None}
     try:
-        # Get all active data sources
-        active_sources = ExternalDataSource.objects.filter(is_active=True)
-
-        if not active_sources.exists():
-            logger.warning("No active external data sources found. Skipping fetch.")
-            return "No active data sources found"
-
-        successful_sources = []
-        failed_sources = []
-
-        for source in active_sources:
-            try:
-                logger.info(f"Processing source: {source.name} (ID: {source.id})")
-                fetch_and_store_chat_data(source_id=source.id)
-                source.last_synced = timezone.now()
-                # Check if error_count field exists in the model
-                update_fields = ["last_synced"]
-                try:
-                    source.error_count = 0
-                    source.last_error = None
-                    update_fields.extend(["error_count", "last_error"])
-                except AttributeError:
-                    # Fields might not exist yet if migrations haven't been applied
-                    logger.warning("New fields not available. Run migrations to enable error tracking.")
-                source.save(update_fields=update_fields)
-                successful_sources.append(source.name)
-            except Exception as e:
-                logger.error(f"Error fetching data from source {source.name}: {e}", exc_info=True)
-                try:
-                    source.error_count = getattr(source, "error_count", 0) + 1
-                    source.last_error = str(e)[:255]  # Truncate to fit in the field
-                    source.save(update_fields=["error_count", "last_error"])
-                except (AttributeError, django_db_utils.OperationalError):
-                    # If fields don't exist, just update last_synced
-                    logger.warning("Could not update error fields. Run migrations to enable error tracking.")
-                    source.last_synced = timezone.now()
-                    source.save(update_fields=["last_synced"])
-                failed_sources.append(source.name)
-
-        if failed_sources and not successful_sources:
-            # If all sources failed, we should raise an exception to trigger retry
-            raise Exception(f"All data sources failed: {', '.join(failed_sources)}")
-
-        result_message = f"Completed: {len(successful_sources)} successful, {len(failed_sources)} failed"
-        logger.info(result_message)
-        return result_message
+        source = ExternalDataSource.objects.filter(id=source_id).only("timeout").first()
+        locked = source is not None and acquire_sync_lock(source_id, task_id, _lease_seconds(source))
+    except Exception as e:
+        logger.error(f"Could not lock data source {source_id} for a sync: {e}", exc_info=True)
+        _release_lock(source_id, task_id)
+        return {**result, "error": f"Could not lock the data source: {e}"}
+    if not locked:
+        logger.info(f"Skipping sync of data source {source_id}, another sync of it is running")
+        return {**result, "skipped": True}
+
+    try:
+        stats = fetch_and_store_chat_data(source_id=source_id, full=full)
+    except SoftTimeLimitExceeded:
+        logger.error(f"Sync of data source {source_id} exceeded its time limit")
+        stats = {"success": False, "error": "Sync exceeded the timeout of the data source"}
+    except Exception as e:
+        logger.error(f"Error fetching data from source {source_id}: {e}", exc_info=True)
+        stats = {"success": False, "error": str(e)}
+    finally:
+        _release_lock(source_id, task_id)
+    return {**result, **stats}
+
 
+def _release_lock(source_id, task_id):
+    """Release the lock of a data source, logging errors instead of raising them"""
+    try:
+        release_sync_lock(source_id, task_id)
     except Exception as e:
-        logger.error(f"Error during periodic chat data fetch: {e}", exc_info=True)
-        raise  # Re-raise to trigger Celery retry
+        # The lease expires by itself
+        logger.error(f"Could not release the sync lock of data source {source_id}: {e}", exc_info=True)
+
+
+def sync_source_now(source_id, full=False):
+    """Sync a data source in this process while holding its lock, and record the result.
+
+    For syncs that don't go through a Celery task, like the fetch_chat_data command
+    and the synchronous fallback of the manual refresh, so they can't overlap with
+    other syncs of the source either.
+
+    Args:
+        source_id: ID of the ExternalDataSource to sync
+        full: Process and store the whole feed, ignoring the incremental sync state
+
+    Returns:
+        dict: ``source_id``, ``success``, ``skipped`` and ``error``, plus the stats of the sync
+    """
+    result = _sync_locked(source_id, str(uuid4()), full=full)
+    if not result["skipped"]:
+        record_sync_results([result])
+    return result
+
+
+def queue_source_refresh(source):
+    """Start refresh_specific_source for a data source, unless a sync of it is already queued or running.
+
+    The task is limited to the timeout of the source, like the syncs started by
+    periodic_fetch_chat_data. Duplicate triggers, e.g. repeated clicks on "Refresh
+    Now", are merged into the sync that is already queued or running.
+
+    Args:
+        source: The ExternalDataSource to refresh
+
+    Returns:
+        tuple: (ID of the task syncing the source, whether a new task was started)
+    """
+    task_id = str(uuid4())
+    if not claim_sync(source.id, task_id, _lease_seconds(source)):
+        source.refresh_from_db(fields=["sync_state", "sync_task_id"])
+        return source.sync_task_id, False
+    try:
+        refresh_specific_source.apply_async(args=(source.id,), task_id=task_id, soft_time_limit=source.timeout)
+    except Exception:
+        release_sync_lock(source.id, task_id)
+        raise
+    return task_id, True
+
+
+@shared_task(name="data_integration.tasks.record_sync_results")
+def record_sync_results(results):
+    """Update the status of the synced data sources and schedule their next syncs.
+
+    Args:
+        results: Results of the sync_external_source tasks
+
+    Returns:
+        str: Summary of the sync
+    """
+    # Skipped syncs were merged into another sync of the source, which records its own result
+    results = [result for result in results if not result.get("skipped")]
+    sources = ExternalDataSource.objects.in_bulk([result["source_id"] for result in results])
+    failed = []
+    for result in results:
+        source = sources.get(result["source_id"])
+        if source is None:
+            continue
+
+        changes = result.get("sessions_created", 0) + result.get("sessions_updated", 0)
+        source.schedule_next_sync(changes, failed=not result["success"])
+        update_fields = ["next_sync_at", "current_interval", "error_count", "last_error"]
+        if result["success"]:
+            source.last_synced = timezone.now()
+            source.error_count = 0
+            source.last_error = None
+            update_fields.append("last_synced")
+        else:
+            source.error_count = F("error_count") + 1
+            source.last_error = str(result["error"])[:255]  # Truncate to fit in the field
+            failed.append(source.id)
+        source.save(update_fields=update_fields)
+        logger.info(f"Next sync of data source {source.name} in {source.current_interval}s")
+
+    result_message = f"Completed: {len(results) - len(failed)} successful, {len(failed)} failed"
+    if failed:
+        logger.error(f"{result_message}. Failed sources: {failed}")
+    else:
+        logger.info(result_message)
+    return result_message
 
 
 @shared_task(name="data_integration.tasks.refresh_specific_source", bind=True)
@@ -96,21 +233,56 @@ def refresh_specific_source(self, source_id):
         source_id: ID of the ExternalDataSource to refresh
     """
     logger.info(f"Starting manual refresh of data source ID: {source_id} (task_id: {self.request.id})")
-    try:
-        source = ExternalDataSource.objects.get(id=source_id)
-        fetch_and_store_chat_data(source_id=source_id)
-        source.last_synced = timezone.now()
-        source.error_count = 0
-        source.last_error = None
-        source.save(update_fields=["last_synced", "error_count", "last_error"])
-        logger.info(f"Manual refresh of data source {source.name} completed successfully")
-        return f"Successfully refreshed data source: {source.name}"
-    except ExternalDataSource.DoesNotExist:
+    source = ExternalDataSource.objects.filter(id=source_id).first()
+    if source is None:
         logger.error(f"Data source with ID {source_id} does not exist")
         return f"Error: Data source with ID {source_id} does not exist"
-    except Exception as e:
-        logger.error(
-            f"Error during manual refresh of data source {source_id}: {e}",
-            exc_info=True,
-        )
-        return f"Error: {str(e)}"
+
+    result = _sync_locked(source_id, self.request.id or str(uuid4()))
+    if result["skipped"]:
+        return f"Data source {source.name} is already being synced"
+    record_sync_results([result])
+    if not result["success"]:
+        logger.error(f"Error during manual refresh of data source {source_id}: {result['error']}")
+        return f"Error: {result['error']}"
+    logger.info(f"Manual refresh of data source {source.name} completed successfully")
+    return f"Successfully refreshed data source: {source.name}"
+
+
+@shared_task(
+    name="data_integration.tasks.process_csv_upload",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+)
+def process_csv_upload(self, job_id):
+    """Import an uploaded CSV file in the background.
+
+    Failed imports are retried; each retry resumes from the last chunk that was stored.
+
+    Args:
+        job_id: ID of the dashboard ImportJob to run
+    """
+    logger.info(f"Starting CSV import job ID: {job_id} (task_id: {self.request.id})")
+    try:
+        job = ImportJob.objects.select_related("data_source").get(id=job_id)
+    except ImportJob.DoesNotExist:
+        logger.error(f"Import job with ID {job_id} does not exist")
+        return f"Error: Import job with ID {job_id} does not exist"
+
+    final_attempt = self.request.retries >= self.max_retries
+    success, message = run_import_job(job, final_attempt=final_attempt)
+    if not success:
+        logger.error(f"CSV import job {job_id} failed: {message}")
+        if not final_attempt:
+            raise self.retry(exc=Exception(message))
+    return message
+
+
+@shared_task(name="data_integration.tasks.delete_expired_upload_previews")
+def delete_expired_upload_previews():
+    """Delete the previewed uploads that were neither imported nor cancelled in time."""
+    deleted = delete_expired_previews()
+    if deleted:
+        logger.info(f"Deleted {deleted} expired upload previews")
+    return deleted
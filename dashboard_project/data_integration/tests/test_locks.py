@@ -0,0 +1,82 @@
+from unittest import mock, skipIf
+
+from data_integration import locks
+from data_integration.models import ExternalDataSource
+from data_integration.tasks import _sync_locked, queue_source_refresh, sync_source_now
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+
+class UnreachableRedis:
+    """Redis client whose every command fails as if the server were down"""
+
+    def set(self, *args, **kwargs):  # noqa: ARG002
+        raise locks.redis.ConnectionError("Error 111 connecting to localhost:6379. Connection refused.")
+
+    def eval(self, *args, **kwargs):  # noqa: ARG002
+        raise locks.redis.ConnectionError("Error 111 connecting to localhost:6379. Connection refused.")
+
+
+@skipIf(locks.redis is None, "redis is not installed")
+class SyncLockTests(TestCase):
+    def setUp(self):
+        self.source = ExternalDataSource.objects.create(name="Stub", api_url="http://127.0.0.1:9/chats")
+        patcher = mock.patch.object(locks, "_redis", return_value=UnreachableRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lock_falls_back_to_the_database_when_redis_is_down(self):
+        self.assertTrue(locks.acquire_sync_lock(self.source.id, "task-1", 60))
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_state, ExternalDataSource.SYNC_RUNNING)
+        self.assertEqual(self.source.sync_task_id, "task-1")
+
+        self.assertFalse(locks.acquire_sync_lock(self.source.id, "task-2", 60))
+
+        locks.release_sync_lock(self.source.id, "task-1")
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_state, ExternalDataSource.SYNC_IDLE)
+
+    def test_sync_returns_lock_errors_and_releases_the_claim(self):
+        self.assertTrue(locks.claim_sync(self.source.id, "task-1", 60))
+        with mock.patch("data_integration.tasks.acquire_sync_lock", side_effect=RuntimeError("database is locked")):
+            result = _sync_locked(self.source.id, "task-1")
+
+        self.assertFalse(result["success"])
+        self.assertFalse(result["skipped"])
+        self.assertIn("database is locked", result["error"])
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_state, ExternalDataSource.SYNC_IDLE)
+
+
+class SyncNowTests(TestCase):
+    def setUp(self):
+        self.source = ExternalDataSource.objects.create(name="Stub", api_url="http://127.0.0.1:9/chats")
+        # Another sync of the source is queued
+        locks.claim_sync(self.source.id, "other-task", 60)
+
+    def test_sync_now_skips_a_source_that_is_being_synced(self):
+        with mock.patch("data_integration.tasks.fetch_and_store_chat_data") as fetch:
+            result = sync_source_now(self.source.id)
+        self.assertTrue(result["skipped"])
+        fetch.assert_not_called()
+
+    def test_synchronous_manual_refresh_takes_the_lock(self):
+        admin = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(admin)
+        with (
+            mock.patch("data_integration.views.periodic_fetch_chat_data.delay", side_effect=OSError("no broker")),
+            mock.patch("data_integration.tasks.fetch_and_store_chat_data") as fetch,
+        ):
+            self.client.post(reverse("data_integration:manual_data_refresh"))
+        fetch.assert_not_called()
+
+
+class QueueSourceRefreshTests(TestCase):
+    def test_refresh_is_limited_to_the_timeout_of_the_source(self):
+        source = ExternalDataSource.objects.create(name="Stub", api_url="http://127.0.0.1:9/chats", timeout=42)
+        with mock.patch("data_integration.tasks.refresh_specific_source.apply_async") as apply_async:
+            task_id, started = queue_source_refresh(source)
+        self.assertTrue(started)
+        apply_async.assert_called_once_with(args=(source.id,), task_id=task_id, soft_time_limit=42)
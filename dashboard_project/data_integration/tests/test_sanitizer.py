@@ -0,0 +1,39 @@
+from concurrent.futures import Executor
+from unittest import mock
+
+from data_integration import sanitizer
+from data_integration.sanitizer import PARALLEL_MIN_TEXTS, sanitize_many, sanitizer_pool
+from django.test import SimpleTestCase
+
+TEXTS = [f"<b>Order {i}</b><script>alert({i})</script>" for i in range(PARALLEL_MIN_TEXTS)]
+EXPECTED = [f"<b>Order {i}</b>alert({i})" for i in range(PARALLEL_MIN_TEXTS)]
+
+
+class InlineExecutor(Executor):
+    """Executor that runs every call in this process"""
+
+    def __init__(self, max_workers=None):  # noqa: ARG002
+        pass
+
+    def map(self, fn, *iterables, **kwargs):  # noqa: ARG002
+        return map(fn, *iterables)
+
+
+class SanitizeManyTests(SimpleTestCase):
+    def test_daemonic_process_sanitizes_in_process(self):
+        with (
+            mock.patch.object(sanitizer.multiprocessing, "current_process", return_value=mock.Mock(daemon=True)),
+            mock.patch.object(sanitizer, "ProcessPoolExecutor") as executor,
+        ):
+            self.assertEqual(sanitize_many(TEXTS, workers=4), EXPECTED)
+        executor.assert_not_called()
+
+    def test_batches_share_the_pool_of_the_block(self):
+        with (
+            mock.patch.object(sanitizer, "ProcessPoolExecutor", side_effect=InlineExecutor) as executor,
+            sanitizer_pool(workers=2),
+        ):
+            self.assertEqual(sanitize_many(TEXTS), EXPECTED)
+            self.assertEqual(sanitize_many(TEXTS), EXPECTED)
+            self.assertEqual(sanitize_many(TEXTS[:10]), EXPECTED[:10])
+        executor.assert_called_once_with(max_workers=2)
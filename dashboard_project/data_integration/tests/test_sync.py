@@ -0,0 +1,199 @@
+import csv
+import hashlib
+import io
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from data_integration.models import ChatMessage, ChatSession, ExternalDataSource
+from data_integration.utils import EXPECTED_HEADERS, fetch_and_store_chat_data
+from django.test import TestCase
+from django.utils import timezone
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """Serve the chat feed at /chats, with an ETag, and the transcripts at /transcripts/<session_id>"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        api = self.server.api
+        if self.path == "/chats":
+            body = api.feed()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.respond(304, b"", etag)
+            else:
+                self.respond(200, body, etag)
+            return
+
+        session_id = self.path.rsplit("/", 1)[-1]
+        if session_id in api.failing_transcripts:
+            self.respond(500, b"Internal Server Error")
+        else:
+            self.respond(200, f"User: Hello from {session_id}\nAssistant: How can I help?".encode())
+
+    def respond(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002, ARG002
+        pass
+
+
+class StubAPI:
+    """Local external API serving a feed of chat sessions and their transcripts"""
+
+    def __init__(self):
+        self.sessions = []
+        self.failing_transcripts = set()
+        self.invalid_sessions = set()
+        # Values per session and column that replace the generated ones
+        self.overrides = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubAPIHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def add_session(self, session_id, start_time):
+        self.sessions.append((session_id, start_time))
+
+    def feed(self):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for session_id, start_time in self.sessions:
+            end_time = start_time + timedelta(minutes=5)
+            row = {
+                "session_id": session_id,
+                "start_time": start_time.strftime("%d.%m.%Y %H:%M:%S"),
+                "end_time": end_time.strftime("%d.%m.%Y %H:%M:%S"),
+                "ip_address": "10.0.0.1",
+                "country": "NL",
+                "language": "nl",
+                "messages_sent": "many" if session_id in self.invalid_sessions else "2",
+                "sentiment": "positive",
+                "escalated": "False",
+                "forwarded_hr": "False",
+                "full_transcript": f"{self.base_url}/transcripts/{session_id}",
+                "avg_response_time": "1.5",
+                "tokens": "100",
+                "tokens_eur": "0.01",
+                "category": "billing",
+                "initial_msg": "Hello",
+                "user_rating": "4",
+                **self.overrides.get(session_id, {}),
+            }
+            writer.writerow([row[name] for name in EXPECTED_HEADERS])
+        return out.getvalue().encode()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SyncSourceTests(TestCase):
+    def setUp(self):
+        self.api = StubAPI()
+        self.addCleanup(self.api.close)
+        self.source = ExternalDataSource.objects.create(name="Stub", api_url=f"{self.api.base_url}/chats", timeout=5)
+        self.start = datetime(2025, 3, 1, 10, 0)
+        for i in range(5):
+            self.api.add_session(f"s{i}", self.start + timedelta(minutes=i))
+
+    def sync(self):
+        stats = fetch_and_store_chat_data(self.source.id)
+        self.source.refresh_from_db()
+        return stats
+
+    def messages_of(self, session_id):
+        return ChatMessage.objects.filter(session__session_id=session_id).count()
+
+    def test_failed_transcript_is_retried_when_the_feed_is_not_modified(self):
+        self.sync()
+        self.api.failing_transcripts = {"s5"}
+        self.api.add_session("s5", self.start + timedelta(hours=1))
+        self.sync()
+        self.assertEqual(self.messages_of("s5"), 0)
+        self.assertEqual(self.source.failed_transcripts, [ChatSession.objects.get(session_id="s5").pk])
+
+        # The feed validators of the first sync are still valid if the feed changes back
+        self.api.sessions.pop()
+        self.api.failing_transcripts = set()
+        stats = self.sync()
+        self.assertTrue(stats["not_modified"])
+        self.assertEqual(stats["transcripts_retried"], 1)
+        self.assertEqual(self.messages_of("s5"), 2)
+        self.assertEqual(self.source.failed_transcripts, [])
+
+    def test_failed_transcript_is_retried_when_its_session_is_older_than_the_watermark(self):
+        self.api.failing_transcripts = {"s3"}
+        self.sync()
+        self.sync()  # The transcript fails again
+        self.assertEqual(self.messages_of("s3"), 0)
+
+        self.api.failing_transcripts = set()
+        self.api.add_session("s5", self.start + timedelta(hours=1))
+        self.sync()
+        self.assertEqual(self.messages_of("s3"), 2)
+        self.assertEqual(self.messages_of("s5"), 2)
+        self.assertEqual(self.source.failed_transcripts, [])
+
+    def test_changed_session_older_than_the_watermark_is_updated(self):
+        self.sync()
+        self.assertEqual(self.source.sync_watermark, timezone.make_aware(self.start + timedelta(minutes=4)))
+
+        self.api.overrides = {"s0": {"category": "shipping"}}
+        stats = self.sync()
+        self.assertEqual(stats["sessions_updated"], 1)
+        self.assertEqual(stats["sessions_unchanged"], 4)
+        self.assertEqual(ChatSession.objects.get(session_id="s0").category, "shipping")
+
+    def test_invalid_row_keeps_the_validators_and_caps_the_watermark(self):
+        self.api.invalid_sessions = {"s2"}
+        stats = self.sync()
+        self.assertEqual(stats["errors"], 1)
+        self.assertIsNone(self.source.etag)
+        self.assertEqual(self.source.sync_watermark, timezone.make_aware(self.start + timedelta(minutes=2)))
+
+        self.api.invalid_sessions = set()
+        stats = self.sync()
+        self.assertFalse(stats["not_modified"])
+        self.assertTrue(ChatSession.objects.filter(session_id="s2").exists())
+        self.assertIsNotNone(self.source.etag)
+
+    def test_rows_that_dont_fit_their_columns_are_skipped(self):
+        self.api.overrides = {"s1": {"ip_address": "10.0.0.999"}, "s3": {"tokens": str(2**40)}}
+        stats = self.sync()
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["sessions_created"], 3)
+        self.assertFalse(ChatSession.objects.filter(session_id__in=["s1", "s3"]).exists())
+
+    def test_failed_transcript_keeps_the_validators(self):
+        self.api.failing_transcripts = {"s3"}
+        self.sync()
+        self.assertIsNone(self.source.etag)
+        self.assertEqual(self.source.sync_watermark, timezone.make_aware(self.start + timedelta(minutes=3)))
+
+        self.api.failing_transcripts = set()
+        self.sync()
+        self.assertIsNotNone(self.source.etag)
+        self.assertEqual(self.messages_of("s3"), 2)
+
+    def test_failed_batch_keeps_the_validators_and_the_watermark(self):
+        self.sync()
+        watermark = self.source.sync_watermark
+        self.api.add_session("s5", self.start + timedelta(hours=1))
+        with mock.patch("data_integration.utils.upsert_feed_rows", side_effect=RuntimeError("database is locked")):
+            stats = self.sync()
+        self.assertEqual(stats["errors"], 6)
+        self.assertEqual(self.source.sync_watermark, watermark)
+
+        stats = self.sync()
+        self.assertFalse(stats["not_modified"])
+        self.assertEqual(stats["sessions_created"], 1)
@@ -1,13 +1,27 @@
 import csv
+import hashlib
+import io
 import logging
+import re
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import batched, chain, islice
 
-import bleach
+import pandas as pd
 import requests
-from bleach.css_sanitizer import CSSSanitizer
+import urllib3
+from celery.exceptions import SoftTimeLimitExceeded
+from dashboard.datetime_parsing import DETECTION_SAMPLE_SIZE, DatetimeParser
+from dashboard.signals import sync_external_sessions_to_dashboard
+from dashboard.validation import validate_rows
+from django.conf import settings
+from django.db import transaction
 from django.utils.timezone import make_aware
 
-from .models import ChatMessage, ChatSession, ExternalDataSource
+from .client import ExternalAPIClient
+from .models import ChatMessage, ChatSession, ExternalDataSource, TranscriptCache
+from .sanitizer import sanitize_many, sanitizer_pool
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +45,405 @@ EXPECTED_HEADERS = [
     "user_rating",
 ]
 
+# Number of sessions per query when looking up stored sessions by key
+LOOKUP_BATCH_SIZE = 1000
 
-def fetch_and_store_chat_data(source_id=None):
+# ChatSession fields written by the bulk upsert of a sync
+UPSERT_FIELDS = [
+    "start_time",
+    "end_time",
+    "ip_address",
+    "country",
+    "language",
+    "messages_sent",
+    "sentiment",
+    "escalated",
+    "forwarded_hr",
+    "full_transcript_url",
+    "avg_response_time",
+    "tokens",
+    "tokens_eur",
+    "category",
+    "initial_msg",
+    "user_rating",
+    "content_hash",
+]
+
+# Number of failing rows of a batch that are logged individually
+LOGGED_ERRORS_PER_BATCH = 5
+
+# Line prefixes that start a message of the user or the assistant in a transcript.
+# settings.TRANSCRIPT_USER_PREFIXES and TRANSCRIPT_ASSISTANT_PREFIXES add to them.
+USER_PREFIXES = [
+    "User:",
+    "[User]:",
+    "Customer:",
+    "[Customer]:",
+    "Client:",
+    "[Client]:",
+    "Human:",
+    "[Human]:",
+    "Me:",
+    "[Me]:",
+    "Question:",
+    "User >",
+    "Customer >",
+    "User said:",
+    "Customer said:",
+    "User writes:",
+    "User asked:",
+    "User message:",
+    "From user:",
+    "Client message:",
+    "Q:",
+    "Input:",
+    "Query:",
+    "Person:",
+    "Visitor:",
+    "Guest:",
+    "User input:",
+    "User query:",
+]
+ASSISTANT_PREFIXES = [
+    "Assistant:",
+    "[Assistant]:",
+    "Agent:",
+    "[Agent]:",
+    "Bot:",
+    "[Bot]:",
+    "AI:",
+    "[AI]:",
+    "ChatGPT:",
+    "[ChatGPT]:",
+    "System:",
+    "[System]:",
+    "Support:",
+    "[Support]:",
+    "Answer:",
+    "Assistant >",
+    "Bot >",
+    "Assistant said:",
+    "Assistant writes:",
+    "AI responded:",
+    "LLM:",
+    "[LLM]:",
+    "Response:",
+    "A:",
+    "Output:",
+    "AI output:",
+    "Model:",
+    "[Model]:",
+    "Assistant message:",
+    "From assistant:",
+    "Bot response:",
+    "AI says:",
+    "NotsoAI:",
+    "[NotsoAI]:",
+    "Notso:",
+    "[Notso]:",
+]
+
+
+def _speaker_prefix_regex(user_prefixes, assistant_prefixes):
+    """Compile one anchored regex matching any speaker prefix, with the sender as the name of the matching group.
+
+    Alternatives are tried in order, so user prefixes take precedence over assistant
+    prefixes, and earlier prefixes over later ones.
+    """
+    user = "|".join(re.escape(prefix) for prefix in user_prefixes)
+    assistant = "|".join(re.escape(prefix) for prefix in assistant_prefixes)
+    return re.compile(f"(?P<User>{user})|(?P<Assistant>{assistant})")
+
+
+SPEAKER_PREFIX_RE = _speaker_prefix_regex(
+    USER_PREFIXES + settings.TRANSCRIPT_USER_PREFIXES,
+    ASSISTANT_PREFIXES + settings.TRANSCRIPT_ASSISTANT_PREFIXES,
+)
+
+# Timestamps at the start of a line that may mark the start of a message
+TIMESTAMP_PREFIX_RE = re.compile(
+    r"\[\d{2}:\d{2}:\d{2}\]"  # [HH:MM:SS]
+    r"|\[\d{2}:\d{2}\]"  # [HH:MM]
+    r"|\(\d{2}:\d{2}:\d{2}\)"  # (HH:MM:SS)
+    r"|\(\d{2}:\d{2}\)"  # (HH:MM)
+    r"|\d{2}:\d{2}:\d{2} -"  # HH:MM:SS -
+    r"|\d{2}:\d{2} -"  # HH:MM -
+    r"|\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"  # YYYY-MM-DD HH:MM:SS
+)
+
+
+def match_speaker(line):
+    """Match the speaker prefix at the start of a stripped transcript line.
+
+    Args:
+        line: Transcript line without leading whitespace
+
+    Returns:
+        tuple: (sender, length of the prefix), or None if the line doesn't start with a speaker prefix
+    """
+    match = SPEAKER_PREFIX_RE.match(line)
+    if match is None:
+        return None
+    return match.lastgroup, match.end()
+
+
+def row_content_hash(row):
+    """Return a hash of the raw values of a feed row, used to detect changed sessions"""
+    return hashlib.blake2b("\x1f".join(row).encode(), digest_size=16).hexdigest()
+
+
+def transcript_content_hash(content):
+    """Return a hash of a transcript, used to detect changed transcripts"""
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def message_content_hash(sender, message_text):
+    """Return a hash of the sender and text of a message, used to detect changed messages"""
+    return hashlib.blake2b(f"{sender}\x1f{message_text}".encode(), digest_size=16).hexdigest()
+
+
+def stored_content_hashes(session_ids):
+    """Look up the content hashes of the stored sessions among ``session_ids``.
+
+    Returns:
+        dict: Content hash per session ID for the sessions that exist (None if it has no hash)
+    """
+    hashes = {}
+    for batch in batched(session_ids, LOOKUP_BATCH_SIZE, strict=False):
+        hashes.update(ChatSession.objects.filter(session_id__in=batch).values_list("session_id", "content_hash"))
+    return hashes
+
+
+def iter_sessions(pks):
+    """Load sessions by primary key, a batch at a time, in the order of ``pks``.
+
+    Only the fields needed to download and store their transcripts are loaded.
+    Each session gets its ``TranscriptCache`` entry, or None, as ``cached_transcript``.
+    """
+    for batch in batched(pks, LOOKUP_BATCH_SIZE, strict=False):
+        sessions = ChatSession.objects.only(
+            "id", "session_id", "start_time", "full_transcript_url", "transcript_hash"
+        ).in_bulk(batch)
+        cache = TranscriptCache.objects.in_bulk(
+            [session.full_transcript_url for session in sessions.values()], field_name="url"
+        )
+        for pk in batch:
+            if pk in sessions:
+                session = sessions[pk]
+                session.cached_transcript = cache.get(session.full_transcript_url)
+                yield session
+
+
+def iter_feed_rows(response):
+    """Yield the non-empty rows of a CSV feed while it is being downloaded.
+
+    The body of a streamed response is decoded and parsed as it arrives, so only
+    a small read buffer of it is held in memory at a time.
+
+    Args:
+        response: Response of a request made with ``stream=True``
+
+    Yields:
+        list: The values of a row
+    """
+    # Let urllib3 undo a gzip or deflate Content-Encoding, like response.content does
+    response.raw.decode_content = True
+    # Otherwise urllib3 reports the body as closed once it is read, which TextIOWrapper can't handle
+    response.raw.auto_close = False
+    for row in csv.reader(io.TextIOWrapper(response.raw, encoding="utf-8", newline="")):
+        if row:  # Skip empty rows
+            yield row
+
+
+def _optional_number(values, integer=False):
+    """Convert a column of raw strings to numbers, with empty strings as missing values.
+
+    Returns:
+        tuple: (numbers, mask of the non-empty values that are not valid numbers)
+    """
+    values = values.str.strip()
+    present = values != ""
+    numbers = pd.to_numeric(values.where(present), errors="coerce")
+    invalid = present & numbers.isna()
+    if integer:
+        invalid |= present & ~values.str.fullmatch(r"[+-]?\d+")
+        # Values that don't fit the column are invalid as well
+        invalid |= numbers.abs() >= 2**63
+        numbers = numbers.where(~invalid).astype("Int64")
+    return numbers, invalid
+
+
+def _optional_bool(values):
+    """Convert a column of raw strings to booleans, with empty strings as missing values"""
+    return (values.str.lower() == "true").astype(object).where(values != "", None)
+
+
+def _python_values(series):
+    """Return a column as a list of Python values with missing values as None"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return [None if pd.isna(value) else value.to_pydatetime() for value in series]
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def convert_feed_rows(df, start_time_parser, end_time_parser):
+    """Convert raw feed rows to ChatSession field values using column operations.
+
+    Rows are checked like uploaded rows (see ``dashboard.validation.validate_rows``),
+    e.g. for invalid IP addresses and numbers that don't fit their column, so that an
+    invalid row is skipped instead of failing the bulk upsert of its whole batch. The
+    feed also requires both times, and whole numbers in the integer columns.
+
+    Args:
+        df: Raw feed rows, one string column per name in ``EXPECTED_HEADERS``
+        start_time_parser: DatetimeParser for the start times of the feed
+        end_time_parser: DatetimeParser for the end times of the feed
+
+    Returns:
+        tuple: (DataFrame with one column per ChatSession field, Series with per row a
+               "; "-separated description of its problems, or "" if it is valid)
+    """
+    converted = pd.DataFrame(index=df.index)
+    converted["session_id"] = df["session_id"]
+    converted["start_time"] = start_time_parser.parse_column(df["start_time"])
+    converted["end_time"] = end_time_parser.parse_column(df["end_time"])
+    # Values that are present but invalid are reported by validate_rows
+    checks = [
+        ("missing start_time", df["start_time"].str.strip() == ""),
+        ("missing end_time", df["end_time"].str.strip() == ""),
+    ]
+
+    for name in ("messages_sent", "tokens"):
+        converted[name], invalid = _optional_number(df[name], integer=True)
+        numeric = pd.to_numeric(df[name].str.strip(), errors="coerce").notna()
+        checks.append((f"{name} is not a whole number", invalid & numeric))
+    for name in ("avg_response_time", "tokens_eur"):
+        converted[name], _ = _optional_number(df[name])
+
+    converted["escalated"] = _optional_bool(df["escalated"])
+    converted["forwarded_hr"] = _optional_bool(df["forwarded_hr"])
+    # Ratings that are not plain digits are ignored rather than rejected
+    ratings = df["user_rating"].where(df["user_rating"].str.isdigit(), "")
+    converted["user_rating"], _ = _optional_number(ratings, integer=True)
+
+    for name in ("ip_address", "country", "language", "sentiment", "category", "initial_msg"):
+        converted[name] = df[name]
+    converted["full_transcript_url"] = df["full_transcript"]
+
+    errors = validate_rows(df, converted)
+    errors = errors.where(errors == "", errors + "; ")
+    for message, mask in checks:
+        if mask.any():
+            errors = errors.where(~mask, errors + message + "; ")
+    return converted, errors.str.removesuffix("; ")
+
+
+def upsert_feed_rows(rows, start_time_parser, end_time_parser, full=False):
+    """Convert a batch of feed rows and write the changed ones with one bulk upsert.
+
+    Rows are compared with the stored sessions by content hash first, so unchanged
+    rows are never converted or written. The others are converted in one pass and
+    written with ``bulk_create(update_conflicts=True)`` (INSERT ... ON CONFLICT DO
+    UPDATE) on ``session_id``, which doesn't send ``post_save``; the dashboard
+    sessions are therefore synced in bulk as well. When a session ID occurs more
+    than once, the last row wins.
+
+    Every changed row is written, however long ago its session started, so sessions
+    that were still in progress get their later end time, messages and transcript.
+
+    Args:
+        rows: Feed rows (lists of strings in the order of ``EXPECTED_HEADERS``)
+        start_time_parser: DatetimeParser for the start times of the feed
+        end_time_parser: DatetimeParser for the end times of the feed
+        full: Write all rows, even if their content hash is unchanged
+
+    Returns:
+        dict: Counts of created, updated, unchanged and failed sessions, the
+              ``errors`` of the failed rows and their start times (``failed_start_times``,
+              None where the start time is invalid), the primary keys of the stored sessions
+              with a transcript URL (``transcript_pks``), and the ``newest_start_time`` of
+              the stored sessions
+    """
+    result = {
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "failed": 0,
+        "errors": [],
+        "failed_start_times": [],
+        "transcript_pks": [],
+        "newest_start_time": None,
+    }
+    width = len(EXPECTED_HEADERS)
+    # Pad short rows with empty strings and drop extra columns; the last row per session ID wins
+    unique_rows = {row[0]: (row + [""] * (width - len(row)))[:width] for row in rows}
+    stored_hashes = stored_content_hashes(list(unique_rows))
+
+    changed_rows, hashes = [], []
+    for session_id, row in unique_rows.items():
+        content_hash = row_content_hash(row)
+        if not full and stored_hashes.get(session_id) == content_hash:
+            result["unchanged"] += 1
+            continue
+        changed_rows.append(row)
+        hashes.append(content_hash)
+    if not changed_rows:
+        return result
+
+    df = pd.DataFrame(changed_rows, columns=EXPECTED_HEADERS)
+    converted, errors = convert_feed_rows(df, start_time_parser, end_time_parser)
+    converted["content_hash"] = hashes
+
+    failed = errors != ""
+    result["failed"] = int(failed.sum())
+    result["errors"] = [
+        f"Session {session_id}: {message}"
+        for session_id, message in zip(df["session_id"][failed], errors[failed], strict=True)
+    ]
+    result["failed_start_times"] = [
+        None if pd.isna(start_time) else start_time.to_pydatetime() for start_time in converted["start_time"][failed]
+    ]
+    converted = converted[~failed]
+    if converted.empty:
+        return result
+
+    fields = ["session_id", *UPSERT_FIELDS]
+    columns = [_python_values(converted[name]) for name in fields]
+    sessions = [ChatSession(**dict(zip(fields, values, strict=True))) for values in zip(*columns, strict=True)]
+
+    with transaction.atomic():
+        ChatSession.objects.bulk_create(
+            sessions,
+            update_conflicts=True,
+            unique_fields=["session_id"],
+            update_fields=UPSERT_FIELDS,
+        )
+        sync_external_sessions_to_dashboard(sessions)
+
+    for session in sessions:
+        if session.session_id in stored_hashes:
+            result["updated"] += 1
+            logger.debug(f"Updated session: {session.session_id}")
+        else:
+            result["created"] += 1
+            logger.debug(f"Created session: {session.session_id}")
+
+    # Not every database returns the primary keys of upserted rows, so read them back
+    with_transcript = [session.session_id for session in sessions if session.full_transcript_url]
+    result["transcript_pks"] = list(
+        ChatSession.objects.filter(session_id__in=with_transcript).order_by("pk").values_list("pk", flat=True)
+    )
+    result["newest_start_time"] = converted["start_time"].max().to_pydatetime()
+    return result
+
+
+def fetch_and_store_chat_data(source_id=None, full=False):
     """Fetch chat data from an external API and store it in the database.
 
     Args:
         source_id: Optional ID of specific ExternalDataSource to use.
                   If None, will use the first active source.
+        full: Process and store the whole feed, ignoring the incremental sync state of the
+              source and the content hashes of stored sessions
 
     Returns:
         dict: Stats about the operation (sessions created, updated, errors)
@@ -56,155 +462,557 @@ def fetch_and_store_chat_data(source_id=None):
             logger.warning("No active data source found.")
             return {"success": False, "error": "No active data source found."}
 
+    # One client per sync, so the CSV fetch and all transcript downloads share its connections,
+    # and one pool of sanitizer processes for all transcripts
+    with ExternalAPIClient.for_source(source) as client, sanitizer_pool():
+        stats = sync_source(source, client, full=full)
+        if stats["success"]:
+            stats.update(client.connection_stats())
+            logger.info(f"Data sync complete. Stats: {stats}")
+        return stats
+
+
+def sync_source(source, client, full=False):
+    """Fetch the chat data of an external data source and store it in the database.
+
+    Syncs are incremental. The feed is requested with the ETag and Last-Modified
+    validators of the previous sync, so an unchanged feed costs one round trip
+    that returns 304 Not Modified and writes nothing. Of a changed feed, only the
+    sessions whose content hash differs from the stored session are written. Rows
+    that didn't change skip the database write, the ``post_save`` signal and the
+    transcript download.
+
+    The validators are only remembered if every row and transcript was stored.
+    Otherwise the next sync downloads the whole feed again, and
+    ``source.sync_watermark``, the start time up to which every session is stored,
+    doesn't move past the oldest row that failed.
+
+    Transcripts that could not be stored are remembered in ``source.failed_transcripts``
+    and retried at the start of every following sync, whatever the feed returns, until
+    they are stored.
+
+    Args:
+        source: The ExternalDataSource to sync
+        client: ExternalAPIClient used for all requests of the sync
+        full: Process and store the whole feed, ignoring the incremental sync state
+
+    Returns:
+        dict: Stats about the operation (sessions created, updated, unchanged, errors)
+    """
     stats = {
         "sessions_created": 0,
         "sessions_updated": 0,
+        "sessions_unchanged": 0,
         "transcripts_processed": 0,
+        "transcripts_unchanged": 0,
+        "transcripts_retried": 0,
         "errors": 0,
+        "not_modified": False,
         "success": True,
     }
 
+    # The sessions of the feed are stored without their transcripts if they didn't change,
+    # so the transcripts that failed before are retried on their own
+    retried = set(source.failed_transcripts)
+    still_failed = retry_failed_transcripts(source, client, stats)
+
+    headers = {}
+    if not full:
+        if source.etag:
+            headers["If-None-Match"] = source.etag
+        if source.last_modified:
+            headers["If-Modified-Since"] = source.last_modified
+
     try:
-        # Fetch data from API with timeout from source settings or default
-        timeout = getattr(source, "timeout", 30)
-        response = requests.get(
-            source.api_url,
-            auth=((source.get_auth_username(), source.get_auth_password()) if source.get_auth_username() else None),
-            timeout=timeout,
-        )
+        # The feed is streamed, and parsed and stored a batch at a time while it downloads
+        response = client.get(source.api_url, headers=headers, stream=True)
         response.raise_for_status()
     except requests.RequestException as e:
         error_msg = f"Error fetching data from API {source.api_url}: {e}"
         logger.error(error_msg)
         return {"success": False, "error": error_msg}
 
-    # Process CSV data
-    csv_data = response.content.decode("utf-8").splitlines()
-    reader = csv.reader(csv_data)
-    # Skip header if present, or use predefined if not
-    # header = next(reader) # Assuming the first row is a header
-    # For this specific case, we know the header is missing.
-    header = EXPECTED_HEADERS
+    with response:
+        if response.status_code == 304:
+            logger.info(f"Data from API {source.api_url} not modified since the last sync")
+            stats["not_modified"] = True
+            return stats
 
-    for row in reader:
-        if not row:  # Skip empty rows
-            continue
         try:
-            # Fix for zip() argument mismatch: pad the row with empty strings if needed
-            padded_row = row + [""] * (len(header) - len(row))
-            data = dict(zip(header, padded_row, strict=False))
-
-            # Parse date fields with multiple format support
-            start_time = None
-            end_time = None
-
-            # List of date formats to try
-            date_formats = [
-                "%d.%m.%Y %H:%M:%S",  # European format: DD.MM.YYYY HH:MM:SS
-                "%Y-%m-%d %H:%M:%S",  # ISO format: YYYY-MM-DD HH:MM:SS
-                "%m/%d/%Y %H:%M:%S",  # US format: MM/DD/YYYY HH:MM:SS
-                "%Y-%m-%dT%H:%M:%S",  # ISO format with T separator
-                "%Y-%m-%dT%H:%M:%S.%fZ",  # ISO format with milliseconds and Z
-            ]
-
-            # Try to parse start_time with multiple formats
-            for date_format in date_formats:
-                try:
-                    start_time = make_aware(datetime.strptime(data["start_time"], date_format))
-                    break
-                except (ValueError, TypeError):
-                    continue
-
-            # Try to parse end_time with multiple formats
-            for date_format in date_formats:
-                try:
-                    end_time = make_aware(datetime.strptime(data["end_time"], date_format))
-                    break
-                except (ValueError, TypeError):
-                    continue
-
-            # If we couldn't parse the dates, log an error and skip this row
-            if not start_time or not end_time:
-                error_msg = f"Could not parse date fields for session {data['session_id']}: start_time={data['start_time']}, end_time={data['end_time']}"
-                logger.error(error_msg)
-                stats["errors"] += 1
-                continue
+            newest_start_time, transcript_pks, failed_start_times = store_feed(response, source, stats, full=full)
+        except (requests.RequestException, urllib3.exceptions.HTTPError, UnicodeDecodeError, csv.Error) as e:
+            error_msg = f"Error reading data from API {source.api_url}: {e}"
+            logger.error(error_msg)
+            return {"success": False, "error": error_msg}
+
+    # Transcripts are downloaded concurrently once the whole feed is stored
+    transcript_pks = [pk for pk in transcript_pks if pk not in retried]
+    transcripts = iter_transcripts(iter_sessions(transcript_pks), client, source.transcript_concurrency)
+    processed, unchanged, failed = store_transcripts(transcripts)
+    stats["transcripts_processed"] += processed
+    stats["transcripts_unchanged"] += unchanged
+
+    source.failed_transcripts = sorted(still_failed | {session.pk for session in failed})
+    source.last_synced = make_aware(datetime.now())
+    failed_start_times.extend(session.start_time for session in failed)
+    if stats["errors"] or failed_start_times or still_failed:
+        # Keep the validators of the previous sync, so the next one gets the whole feed
+        # again, and don't move the watermark past the oldest row that failed
+        if None in failed_start_times:
+            newest_start_time = source.sync_watermark
+        elif failed_start_times:
+            oldest_failed = min(failed_start_times)
+            newest_start_time = min(newest_start_time, oldest_failed) if newest_start_time else oldest_failed
+        logger.warning(
+            f"Data from API {source.api_url} was not stored completely; the next sync downloads the whole feed again"
+        )
+        source.sync_watermark = newest_start_time
+        source.save(update_fields=["sync_watermark", "failed_transcripts", "last_synced"])
+        return stats
 
-            messages_sent = int(data["messages_sent"]) if data["messages_sent"] else None
-            escalated = data["escalated"].lower() == "true" if data["escalated"] else None
-            forwarded_hr = data["forwarded_hr"].lower() == "true" if data["forwarded_hr"] else None
-            avg_response_time = float(data["avg_response_time"]) if data["avg_response_time"] else None
-            tokens = int(data["tokens"]) if data["tokens"] else None
-            tokens_eur = float(data["tokens_eur"]) if data["tokens_eur"] else None
-            user_rating = int(data["user_rating"]) if data["user_rating"] and data["user_rating"].isdigit() else None
-
-            session, created = ChatSession.objects.update_or_create(
-                session_id=data["session_id"],
-                defaults={
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "ip_address": data.get("ip_address"),
-                    "country": data.get("country"),
-                    "language": data.get("language"),
-                    "messages_sent": messages_sent,
-                    "sentiment": data.get("sentiment"),
-                    "escalated": escalated,
-                    "forwarded_hr": forwarded_hr,
-                    "full_transcript_url": data.get("full_transcript"),
-                    "avg_response_time": avg_response_time,
-                    "tokens": tokens,
-                    "tokens_eur": tokens_eur,
-                    "category": data.get("category"),
-                    "initial_msg": data.get("initial_msg"),
-                    "user_rating": user_rating,
-                },
-            )
+    # Only remember the validators once the whole feed has been stored
+    source.etag = response.headers.get("ETag")
+    source.last_modified = response.headers.get("Last-Modified")
+    source.sync_watermark = newest_start_time
+    source.save(update_fields=["etag", "last_modified", "sync_watermark", "failed_transcripts", "last_synced"])
 
-            if created:
-                stats["sessions_created"] += 1
-                logger.info(f"Created session: {session.session_id}")
-            else:
-                stats["sessions_updated"] += 1
-                logger.info(f"Updated session: {session.session_id}")
+    return stats
+
+
+def retry_failed_transcripts(source, client, stats):
+    """Download and store the transcripts that previous syncs of a data source failed to store.
 
-            # Fetch and process transcript if URL is present
-            if session.full_transcript_url:
-                transcript_result = fetch_and_store_transcript(session, timeout)
-                if transcript_result["success"]:
-                    stats["transcripts_processed"] += 1
+    ``source.failed_transcripts`` is updated to the ones that failed again right away,
+    so they are retried by the next sync even if this one stops early.
 
+    Args:
+        source: The ExternalDataSource being synced
+        client: ExternalAPIClient used for all requests of the sync
+        stats: Stats of the sync, updated in place
+
+    Returns:
+        set: Primary keys of the sessions whose transcript failed again
+    """
+    if not source.failed_transcripts:
+        return set()
+
+    transcripts = iter_transcripts(iter_sessions(source.failed_transcripts), client, source.transcript_concurrency)
+    processed, unchanged, failed = store_transcripts(transcripts)
+    stats["transcripts_processed"] += processed
+    stats["transcripts_unchanged"] += unchanged
+    stats["transcripts_retried"] += processed + unchanged
+
+    # Sessions that were deleted meanwhile are dropped from the list
+    still_failed = {session.pk for session in failed}
+    logger.info(
+        f"Retried {len(source.failed_transcripts)} failed transcripts of data source {source.name}: "
+        f"{len(still_failed)} failed again"
+    )
+    source.failed_transcripts = sorted(still_failed)
+    source.save(update_fields=["failed_transcripts"])
+    return still_failed
+
+
+def store_feed(response, source, stats, full=False):
+    """Parse a streamed CSV feed and store its sessions, a batch at a time.
+
+    At most ``settings.EXTERNAL_SYNC_BATCH_SIZE`` rows of the feed are held in
+    memory at once.
+
+    Args:
+        response: Streamed response with the feed
+        source: The ExternalDataSource being synced
+        stats: Stats of the sync, updated in place
+        full: Store all rows, ignoring the content hashes
+
+    Returns:
+        tuple: (start time of the newest stored session or the previous watermark,
+               primary keys of the stored sessions that have a transcript URL,
+               start times of the rows that could not be stored, None where unknown)
+    """
+    newest_start_time = source.sync_watermark
+
+    # The feed has no header row; its columns are always EXPECTED_HEADERS
+    header = EXPECTED_HEADERS
+    rows = iter_feed_rows(response)
+
+    # Detect the datetime format of the feed once, instead of trying every format on every value
+    first_rows = list(islice(rows, DETECTION_SAMPLE_SIZE))
+    sample = [dict(zip(header, row, strict=False)) for row in first_rows]
+    start_time_parser = DatetimeParser()
+    start_time_parser.detect([data.get("start_time") for data in sample])
+    end_time_parser = DatetimeParser()
+    end_time_parser.detect([data.get("end_time") for data in sample])
+
+    transcript_pks = []
+    failed_start_times = []
+    for batch in batched(chain(first_rows, rows), settings.EXTERNAL_SYNC_BATCH_SIZE, strict=False):
+        try:
+            result = upsert_feed_rows(batch, start_time_parser, end_time_parser, full=full)
+        except SoftTimeLimitExceeded:
+            raise
         except Exception as e:
-            logger.error(f"Error processing row: {row}. Error: {e}", exc_info=True)
-            stats["errors"] += 1
+            logger.error(f"Error storing a batch of {len(batch)} rows: {e}", exc_info=True)
+            stats["errors"] += len(batch)
+            failed_start_times.append(None)
             continue
 
-    source.last_synced = make_aware(datetime.now())
-    source.save()
-    logger.info("Data sync complete. Stats: {stats}")
+        for name in ("created", "updated", "unchanged"):
+            stats[f"sessions_{name}"] += result[name]
+        if result["errors"]:
+            stats["errors"] += result["failed"]
+            shown = "; ".join(result["errors"][:LOGGED_ERRORS_PER_BATCH])
+            more = len(result["errors"]) - LOGGED_ERRORS_PER_BATCH
+            logger.error(
+                f"Skipped {result['failed']} invalid rows of a batch of {len(batch)}: {shown}"
+                + (f" (and {more} more)" if more > 0 else "")
+            )
+        failed_start_times.extend(result["failed_start_times"])
+        transcript_pks.extend(result["transcript_pks"])
+        if result["newest_start_time"] and (not newest_start_time or result["newest_start_time"] > newest_start_time):
+            newest_start_time = result["newest_start_time"]
 
-    return stats
+    return newest_start_time, transcript_pks, failed_start_times
+
+
+def _conditional_headers(session):
+    """Return the headers to download a transcript only if it changed since the session's messages were stored"""
+    cached = getattr(session, "cached_transcript", None)
+    # Without messages parsed from the cached version, the content is needed even if it didn't change
+    if not cached or not session.transcript_hash or cached.content_hash != session.transcript_hash:
+        return {}
+    headers = {}
+    if cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def download_transcript(client, url, headers=None):
+    """Download a transcript.
+
+    Runs in the worker threads of ``iter_transcripts``, so it must not touch the database.
+
+    Args:
+        client: ExternalAPIClient to send the request with
+        url: URL of the transcript
+        headers: Extra request headers, e.g. from ``_conditional_headers``
+
+    Returns:
+        dict: The raw transcript ``content`` (None if the server answered 304 Not
+              Modified) and the ``etag`` and ``last_modified`` validators of the response
+    """
+    response = client.get(url, headers=headers)
+    response.raise_for_status()
+    return {
+        "content": None if response.status_code == 304 else response.content.decode("utf-8"),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+
+def _parse_download(session, download):
+    """Parse a downloaded transcript, unless the session's messages were parsed from the same content.
+
+    Returns:
+        tuple: ((session, messages) for ``store_transcript_messages``, or None if the transcript
+               is unchanged; TranscriptCache row with the validators and hash of the download)
+    """
+    content_hash = transcript_content_hash(download["content"])
+    cache_row = TranscriptCache(
+        url=session.full_transcript_url,
+        etag=download["etag"],
+        last_modified=download["last_modified"],
+        content_hash=content_hash,
+    )
+    if content_hash == session.transcript_hash:
+        return None, cache_row
+    messages = parse_transcript_messages(session, download["content"])
+    session.transcript_hash = content_hash
+    return (session, messages), cache_row
+
+
+def _store_downloaded_transcripts(parsed, cache_rows):
+    """Store the messages and transcript hashes of sessions, and the transcript cache rows, in one transaction.
+
+    Returns:
+        dict: Message counts as returned by ``store_transcript_messages``
+    """
+    with transaction.atomic(savepoint=False):
+        counts = store_transcript_messages(parsed)
+        if parsed:
+            ChatSession.objects.bulk_update([session for session, _ in parsed], ["transcript_hash"])
+        if cache_rows:
+            TranscriptCache.objects.bulk_create(
+                cache_rows,
+                update_conflicts=True,
+                unique_fields=["url"],
+                update_fields=["etag", "last_modified", "content_hash", "fetched_at"],
+            )
+    return counts
+
+
+def store_transcript(session, download):
+    """Store the messages of a downloaded transcript, unless they were parsed from the same content before.
+
+    Args:
+        session: The ChatSession the transcript belongs to
+        download: Result of ``download_transcript``
+
+    Returns:
+        int: Number of messages created, or None if the transcript was unchanged
+    """
+    if download["content"] is None:
+        return None
+
+    parsed, cache_row = _parse_download(session, download)
+    counts = _store_downloaded_transcripts([parsed] if parsed else [], [cache_row])
+    if parsed is None:
+        return None
+    return counts["created"]
+
+
+def store_transcript_messages(parsed):
+    """Reconcile the stored messages of chat sessions with newly parsed ones.
+
+    Parsed messages are matched with the stored ones at the same position in the
+    transcript. Stored messages with the same content hash are kept as they are,
+    changed ones are updated in place, new ones are inserted and stored ones past
+    the end of the transcript are deleted, so a transcript that only grew costs
+    an INSERT of its new messages. The messages of all sessions are written
+    together, with one SELECT of the stored messages and bulk queries for each
+    kind of change, in one transaction.
+
+    The HTML of new and changed messages is sanitized just before, in parallel
+    processes for large batches (see ``sanitize_many``), unless
+    ``settings.MESSAGE_SANITIZE_ON_READ`` defers it to ``ChatMessage.get_safe_html``.
+
+    Args:
+        parsed: (session, messages) tuples, with messages as returned by ``parse_transcript_messages``;
+                the stored messages of sessions whose messages are None are kept
+
+    Returns:
+        dict: Number of messages ``created``, ``updated``, ``deleted`` and ``unchanged``
+    """
+    sessions = {session.pk: messages for session, messages in parsed if messages is not None}
+    stored = defaultdict(dict)
+    stale = []
+    for batch in batched(sessions, LOOKUP_BATCH_SIZE, strict=False):
+        rows = (
+            ChatMessage.objects.filter(session_id__in=batch)
+            .order_by("pk")
+            .values_list("session_id", "position", "pk", "content_hash")
+        )
+        for session_id, position, pk, content_hash in rows:
+            if position in stored[session_id]:
+                # Messages added without a position, e.g. in the admin, are replaced
+                stale.append(pk)
+            else:
+                stored[session_id][position] = (pk, content_hash)
+
+    created = []
+    changed = []
+    unchanged = 0
+    for session_id, messages in sessions.items():
+        session_stored = stored.pop(session_id, {})
+        for message in messages:
+            match = session_stored.pop(message.position, None)
+            if match is None:
+                created.append(message)
+            elif match[1] == message.content_hash:
+                unchanged += 1
+            else:
+                message.pk = match[0]
+                changed.append(message)
+        stale.extend(pk for pk, _ in session_stored.values())
+
+    written = created + changed
+    if not settings.MESSAGE_SANITIZE_ON_READ:
+        safe_html = sanitize_many([message.message for message in written])
+        for message, html in zip(written, safe_html, strict=True):
+            message.safe_html_message = html
+    with transaction.atomic(savepoint=False):
+        for batch in batched(stale, LOOKUP_BATCH_SIZE, strict=False):
+            ChatMessage.objects.filter(pk__in=batch).delete()
+        if changed:
+            ChatMessage.objects.bulk_update(changed, ["sender", "message", "safe_html_message", "content_hash"])
+        if created:
+            ChatMessage.objects.bulk_create(created)
+
+    counts = {"created": len(created), "updated": len(changed), "deleted": len(stale), "unchanged": unchanged}
+    logger.debug(f"Stored the messages of {len(sessions)} transcripts: {counts}")
+    return counts
+
+
+def sanitize_stored_messages(messages, batch_size=1000, workers=None):
+    """Sanitize and store the HTML of messages that were synced without it.
+
+    Messages are read and updated ``batch_size`` at a time, in the order of their
+    primary key, so any number of them can be sanitized with bounded memory.
+
+    Args:
+        messages: ChatMessage queryset to sanitize; messages that already have their
+                  sanitized HTML are skipped
+        batch_size: Number of messages sanitized and updated at a time
+        workers: Number of processes sanitizing each batch (see ``sanitize_many``)
+
+    Returns:
+        int: Number of messages sanitized
+    """
+    pending = messages.filter(safe_html_message__isnull=True).only("id", "message").order_by("pk")
+    sanitized = 0
+    last_pk = None
+    with sanitizer_pool(workers):
+        while True:
+            batch = list((pending if last_pk is None else pending.filter(pk__gt=last_pk))[:batch_size])
+            if not batch:
+                return sanitized
+            safe_html = sanitize_many([message.message for message in batch])
+            for message, html in zip(batch, safe_html, strict=True):
+                message.safe_html_message = html
+            ChatMessage.objects.bulk_update(batch, ["safe_html_message"])
+            sanitized += len(batch)
+            last_pk = batch[-1].pk
+
+
+def _transcript_result(session, future):
+    """Wait for a transcript download and return (session, download, error)"""
+    # Errors raised while waiting, e.g. the soft time limit of the sync task, are not the download's
+    error = future.exception()
+    if error is not None:
+        return session, None, error
+    return session, future.result(), None
+
+
+def iter_transcripts(sessions, client, concurrency):
+    """Download the transcripts of chat sessions concurrently.
+
+    Downloads run in a pool of ``concurrency`` threads, ahead of the caller by at
+    most ``2 * concurrency`` transcripts, so memory use stays bounded however many
+    sessions are synced. Results are yielded in the order of ``sessions``, which
+    keeps the database writes of the caller in a predictable order.
+
+    Args:
+        sessions: ChatSession objects with a ``full_transcript_url``
+        client: ExternalAPIClient shared by the download threads
+        concurrency: Maximum number of downloads running at the same time
+
+    Transcripts whose messages are up to date with the ``cached_transcript`` of
+    the session are requested conditionally.
+
+    Yields:
+        tuple: (session, result of ``download_transcript``, None), or (session, None, exception)
+               if the download failed
+    """
+    concurrency = max(1, concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="transcripts")
+    pending = deque()
+    try:
+        for session in sessions:
+            future = executor.submit(
+                download_transcript, client, session.full_transcript_url, _conditional_headers(session)
+            )
+            pending.append((session, future))
+            if len(pending) >= 2 * concurrency:
+                yield _transcript_result(*pending.popleft())
+        while pending:
+            yield _transcript_result(*pending.popleft())
+    finally:
+        # Don't start queued downloads if the caller stopped early
+        executor.shutdown(cancel_futures=True)
+
+
+def store_transcripts(transcripts, batch_size=None):
+    """Store downloaded transcripts, committing them in batches.
+
+    Transcripts are parsed one by one, but the messages of all transcripts of a
+    batch are stored together, see ``store_transcript_messages``, so the number
+    of queries grows with the number of batches rather than the number of messages.
+
+    Args:
+        transcripts: (session, download, error) tuples as yielded by ``iter_transcripts``
+        batch_size: Number of transcripts per transaction, defaults to ``settings.TRANSCRIPT_WRITE_BATCH_SIZE``
+
+    Returns:
+        tuple: (number of transcripts stored, number of unchanged transcripts,
+               sessions whose transcript could not be downloaded or stored)
+    """
+    stored = unchanged = 0
+    failed = []
+    for batch in batched(transcripts, batch_size or settings.TRANSCRIPT_WRITE_BATCH_SIZE, strict=False):
+        parsed = []
+        cache_rows = []
+        for session, download, error in batch:
+            if isinstance(error, requests.RequestException):
+                logger.error(f"Error fetching transcript for session {session.session_id}: {error}")
+                failed.append(session)
+                continue
+            if error:
+                logger.error(f"Error processing transcript for session {session.session_id}: {error}")
+                failed.append(session)
+                continue
+            if download["content"] is None:
+                # Not modified since the session's messages were stored
+                unchanged += 1
+                continue
+            try:
+                session_messages, cache_row = _parse_download(session, download)
+            except SoftTimeLimitExceeded:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing transcript for session {session.session_id}: {e}", exc_info=True)
+                failed.append(session)
+                continue
+            cache_rows.append(cache_row)
+            if session_messages is None:
+                unchanged += 1
+            else:
+                parsed.append(session_messages)
+
+        # The messages of all transcripts of the batch are written together
+        try:
+            _store_downloaded_transcripts(parsed, cache_rows)
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error storing a batch of {len(parsed)} transcripts: {e}", exc_info=True)
+            failed.extend(session for session, _ in parsed)
+            continue
+        stored += len(parsed)
+    return stored, unchanged, failed
 
 
-def fetch_and_store_transcript(session, timeout=30):
+def fetch_and_store_transcript(session, timeout=30, client=None):
     """Fetch and process transcript for a chat session.
 
+    The transcript is skipped if it didn't change since the session's messages
+    were stored, see ``store_transcript``.
+
     Args:
         session: The ChatSession object
         timeout: Timeout in seconds for the request
+        client: Optional ExternalAPIClient to reuse the connections of
 
     Returns:
         dict: Result of the operation
     """
-    result = {"success": False, "messages_created": 0, "error": None}
+    result = {"success": False, "messages_created": 0, "unchanged": False, "error": None}
 
     try:
-        transcript_response = requests.get(session.full_transcript_url, timeout=timeout)
-        transcript_response.raise_for_status()
-        transcript_content = transcript_response.content.decode("utf-8")
-        messages_created = parse_and_store_transcript_messages(session, transcript_content)
+        session.cached_transcript = TranscriptCache.objects.filter(url=session.full_transcript_url).first()
+        headers = _conditional_headers(session)
+        if client:
+            download = download_transcript(client, session.full_transcript_url, headers)
+        else:
+            with ExternalAPIClient(timeout=timeout) as own_client:
+                download = download_transcript(own_client, session.full_transcript_url, headers)
+        with transaction.atomic():
+            messages_created = store_transcript(session, download)
+        result["unchanged"] = messages_created is None
+        result["messages_created"] = messages_created or 0
 
         result["success"] = True
-        result["messages_created"] = messages_created
         return result
     except requests.RequestException as e:
         error_msg = f"Error fetching transcript for session {session.session_id}: {e}"
@@ -219,147 +1027,61 @@ def fetch_and_store_transcript(session, timeout=30):
 
 
 def parse_and_store_transcript_messages(session, transcript_content):
-    """Parse and store messages from a transcript.
+    """Parse a transcript and reconcile the stored messages of its session with its messages.
+
+    Args:
+        session: The ChatSession object
+        transcript_content: The raw transcript content
+
+    Returns:
+        int: Number of messages created
+    """
+    messages = parse_transcript_messages(session, transcript_content)
+    if messages is None:
+        return 0
+    return store_transcript_messages([(session, messages)])["created"]
+
+
+def parse_transcript_messages(session, transcript_content):
+    """Parse the messages of a transcript, without storing them.
 
     This function parses a chat transcript that contains messages from both User and Assistant.
     It identifies message boundaries by looking for lines that start with common sender patterns,
     and groups all following lines until the next sender change as part of that message.
 
     Args:
-        session: The ChatSession object
+        session: The ChatSession object the transcript belongs to
         transcript_content: The raw transcript content
 
     Returns:
-        int: Number of messages created
+        list: Unsaved ChatMessage objects in transcript order, or None if the transcript is empty
     """
     # Handle empty transcripts
     if not transcript_content or transcript_content.strip() == "":
         logger.warning(f"Empty transcript received for session {session.session_id}")
-        return 0
+        return None
 
     lines = transcript_content.splitlines()
     current_sender = None
     current_message_lines = []
-    messages_created = 0
-
-    # First, delete existing messages for this session to avoid duplicates
-    existing_count = ChatMessage.objects.filter(session=session).count()
-    if existing_count > 0:
-        logger.info(f"Deleting {existing_count} existing messages for session {session.session_id}")
-        ChatMessage.objects.filter(session=session).delete()
-
-    # Define common message patterns to detect - expanded to include more variations
-    user_patterns = [
-        "User:",
-        "[User]:",
-        "Customer:",
-        "[Customer]:",
-        "Client:",
-        "[Client]:",
-        "Human:",
-        "[Human]:",
-        "Me:",
-        "[Me]:",
-        "Question:",
-        "User >",
-        "Customer >",
-        "User said:",
-        "Customer said:",
-        "User writes:",
-        "User asked:",
-        "User message:",
-        "From user:",
-        "Client message:",
-        "Q:",
-        "Input:",
-        "Query:",
-        "Person:",
-        "Visitor:",
-        "Guest:",
-        "User input:",
-        "User query:",
-    ]
-    assistant_patterns = [
-        "Assistant:",
-        "[Assistant]:",
-        "Agent:",
-        "[Agent]:",
-        "Bot:",
-        "[Bot]:",
-        "AI:",
-        "[AI]:",
-        "ChatGPT:",
-        "[ChatGPT]:",
-        "System:",
-        "[System]:",
-        "Support:",
-        "[Support]:",
-        "Answer:",
-        "Assistant >",
-        "Bot >",
-        "Assistant said:",
-        "Assistant writes:",
-        "AI responded:",
-        "LLM:",
-        "[LLM]:",
-        "Response:",
-        "A:",
-        "Output:",
-        "AI output:",
-        "Model:",
-        "[Model]:",
-        "Assistant message:",
-        "From assistant:",
-        "Bot response:",
-        "AI says:",
-        "NotsoAI:",
-        "[NotsoAI]:",
-        "Notso:",
-        "[Notso]:",
-    ]
+    messages = []
 
-    # Function to save current message before starting a new one
+    def add_message(sender, message_text):
+        # Only keep messages with actual content (not just whitespace)
+        if message_text.strip():
+            messages.append(build_message(session, sender, message_text, len(messages)))
+
+    # Function to add the current message before starting a new one
     def save_current_message():
-        nonlocal current_sender, current_message_lines, messages_created
         if current_sender and current_message_lines:
-            message_text = "\n".join(current_message_lines)
-            # Only save if there's actual content (not just whitespace)
-            if message_text.strip() and save_message(session, current_sender, message_text):
-                messages_created += 1
-                logger.debug(f"Saved {current_sender} message with {len(current_message_lines)} lines")
-
-    # Initial scan to detect format type and potential message boundaries
-    has_recognized_patterns = False
-    potential_timestamps = []
-    timestamp_pattern_count = 0
-
-    # Regex patterns for common timestamp formats
-    import re
-
-    timestamp_patterns = [
-        r"^\[\d{2}:\d{2}:\d{2}\]",  # [HH:MM:SS]
-        r"^\[\d{2}:\d{2}\]",  # [HH:MM]
-        r"^\(\d{2}:\d{2}:\d{2}\)",  # (HH:MM:SS)
-        r"^\(\d{2}:\d{2}\)",  # (HH:MM)
-        r"^\d{2}:\d{2}:\d{2} -",  # HH:MM:SS -
-        r"^\d{2}:\d{2} -",  # HH:MM -
-        r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}",  # YYYY-MM-DD HH:MM:SS
-    ]
-
-    # First pass: detect format and message boundaries
-    for i, line in enumerate(lines):
-        line_stripped = line.strip()
-
-        # Check for standard message patterns
-        if any(line_stripped.startswith(pattern) for pattern in user_patterns + assistant_patterns):
-            has_recognized_patterns = True
+            add_message(current_sender, "\n".join(current_message_lines))
 
-        # Check for timestamp patterns that might indicate message boundaries
-        for pattern in timestamp_patterns:
-            if re.match(pattern, line_stripped):
-                timestamp_pattern_count += 1
-                potential_timestamps.append(i)
-                break
+    # First pass: match the speaker of every line once, and find timestamps that may mark message boundaries
+    stripped_lines = [line.strip() for line in lines]
+    speakers = [match_speaker(line) for line in stripped_lines]
+    has_recognized_patterns = any(speakers)
+    potential_timestamps = [i for i, line in enumerate(stripped_lines) if TIMESTAMP_PREFIX_RE.match(line)]
+    timestamp_pattern_count = len(potential_timestamps)
 
     # If no recognized patterns are found, try to intelligently split the transcript
     if not has_recognized_patterns and len(lines) > 0:
@@ -394,11 +1116,10 @@ def parse_and_store_transcript_messages(session, transcript_content):
 
                 sender = "User" if (is_user or (not is_assistant and i % 2 == 0)) else "Assistant"
 
-                if save_message(session, sender, message_content):
-                    messages_created += 1
+                add_message(sender, message_content)
 
-            logger.info(f"Created {messages_created} messages using timestamp-based parsing")
-            return messages_created
+            logger.info(f"Parsed {len(messages)} messages using timestamp-based parsing")
+            return messages
 
         # Simple heuristic: alternate between user and assistant, with first message from user
         # Start with paragraphs (blank line separations) as message boundaries
@@ -418,8 +1139,6 @@ def parse_and_store_transcript_messages(session, transcript_content):
 
         # If we have just one paragraph, try to split by sentence boundaries for very long transcripts
         if len(paragraphs) == 1 and len(paragraphs[0].split()) > 100:
-            import re
-
             # Try to split by sentence boundaries
             text = paragraphs[0]
             # Define sentence ending patterns
@@ -444,58 +1163,34 @@ def parse_and_store_transcript_messages(session, transcript_content):
             for i, chunk in enumerate(chunks):
                 if chunk.strip():
                     sender = "User" if i % 2 == 0 else "Assistant"
-                    if save_message(session, sender, chunk):
-                        messages_created += 1
+                    add_message(sender, chunk)
 
-            logger.info(f"Created {messages_created} messages by splitting single paragraph into sentences")
-            return messages_created
+            logger.info(f"Parsed {len(messages)} messages by splitting single paragraph into sentences")
+            return messages
 
         # Save messages alternating between user and assistant
         for i, paragraph in enumerate(paragraphs):
             if paragraph.strip():  # Only save non-empty paragraphs
                 sender = "User" if i % 2 == 0 else "Assistant"
-                if save_message(session, sender, paragraph):
-                    messages_created += 1
+                add_message(sender, paragraph)
 
-        logger.info(f"Created {messages_created} messages using intelligent split for session {session.session_id}")
-        return messages_created
+        logger.info(f"Parsed {len(messages)} messages using intelligent split for session {session.session_id}")
+        return messages
 
     # Standard processing with recognized patterns
-    for line in lines:
-        line_stripped = line.strip()
-
+    for line, line_stripped, speaker in zip(lines, stripped_lines, speakers, strict=True):
         # Skip empty lines at the beginning
         if not line_stripped and not current_sender:
             continue
 
-        # Check if this line indicates a new sender
-        is_user_message = any(line_stripped.startswith(pattern) for pattern in user_patterns)
-        is_assistant_message = any(line_stripped.startswith(pattern) for pattern in assistant_patterns)
-
-        if is_user_message:
-            # Save previous message if any
-            save_current_message()
-
-            # Start new user message
-            current_sender = "User"
-            # Remove the prefix from the line
-            for pattern in user_patterns:
-                if line_stripped.startswith(pattern):
-                    line = line[len(pattern) :].strip()
-                    break
-            current_message_lines = [line] if line.strip() else []
-        elif is_assistant_message:
+        if speaker:
             # Save previous message if any
             save_current_message()
 
-            # Start new assistant message
-            current_sender = "Assistant"
-            # Remove the prefix from the line
-            for pattern in assistant_patterns:
-                if line_stripped.startswith(pattern):
-                    line = line[len(pattern) :].strip()
-                    break
-            current_message_lines = [line] if line.strip() else []
+            # Start a new message, without the speaker prefix
+            current_sender, prefix_length = speaker
+            line = line_stripped[prefix_length:].strip()
+            current_message_lines = [line] if line else []
         elif current_sender:
             # Continue adding to current message
             current_message_lines.append(line)
@@ -509,7 +1204,7 @@ def parse_and_store_transcript_messages(session, transcript_content):
     save_current_message()
 
     # Handle case with no messages parsed (possibly incorrectly formatted transcript)
-    if messages_created == 0 and lines:
+    if not messages and lines:
         logger.warning(
             f"No messages were parsed from transcript for session {session.session_id}. Using fallback parsing."
         )
@@ -520,102 +1215,34 @@ def parse_and_store_transcript_messages(session, transcript_content):
         assistant_content = "\n".join(lines[mid_point:])
 
         # Save the split messages if they have content
-        if user_content.strip() and save_message(session, "User", user_content):
-            messages_created += 1
+        add_message("User", user_content)
+        add_message("Assistant", assistant_content)
 
-        if assistant_content.strip() and save_message(session, "Assistant", assistant_content):
-            messages_created += 1
+        logger.info(f"Parsed {len(messages)} messages using fallback parsing")
 
-        logger.info(f"Created {messages_created} messages using fallback parsing")
+    logger.info(f"Parsed {len(messages)} messages for session {session.session_id}")
+    return messages
 
-    logger.info(f"Created {messages_created} messages for session {session.session_id}")
-    return messages_created
 
+def build_message(session, sender, message_text, position=0):
+    """Build an unsaved message of a chat session.
 
-def save_message(session, sender, message_text):
-    """Save a message for a chat session.
+    Its sanitized HTML is filled in by ``store_transcript_messages``, for all
+    messages of a batch at once.
 
     Args:
         session: The ChatSession object
         sender: The sender of the message ("User" or "Assistant")
         message_text: The message text, which may contain HTML
+        position: Index of the message in the transcript
 
     Returns:
-        bool: True if message was created, False otherwise
+        ChatMessage: The message, to be saved with ``store_transcript_messages``
     """
-    if not message_text.strip():
-        return False
-
-    try:
-        # Create a CSS sanitizer with allowed CSS properties
-        css_sanitizer = CSSSanitizer(
-            allowed_css_properties=[
-                "color",
-                "background-color",
-                "font-family",
-                "font-size",
-                "font-weight",
-                "font-style",
-                "text-decoration",
-                "text-align",
-                "margin",
-                "margin-left",
-                "margin-right",
-                "margin-top",
-                "margin-bottom",
-                "padding",
-                "padding-left",
-                "padding-right",
-                "padding-top",
-                "padding-bottom",
-                "border",
-                "border-radius",
-                "width",
-                "height",
-                "line-height",
-            ]
-        )
-
-        # Sanitize HTML content before saving if necessary
-        safe_html = bleach.clean(
-            message_text,
-            tags=[
-                "b",
-                "i",
-                "u",
-                "em",
-                "strong",
-                "a",
-                "br",
-                "p",
-                "ul",
-                "ol",
-                "li",
-                "span",
-                "div",
-                "pre",
-                "code",
-                "blockquote",
-            ],
-            attributes={
-                "a": ["href", "title", "target"],
-                "span": ["style", "class"],
-                "div": ["style", "class"],
-                "p": ["style", "class"],
-                "pre": ["style", "class"],
-            },
-            css_sanitizer=css_sanitizer,
-            strip=True,
-        )
-
-        ChatMessage.objects.create(
-            session=session,
-            sender=sender,
-            message=message_text,
-            safe_html_message=safe_html,
-        )
-        logger.debug(f"Stored message for session {session.session_id} from {sender}")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving message for session {session.session_id}: {e}", exc_info=True)
-        return False
+    return ChatMessage(
+        session=session,
+        sender=sender,
+        message=message_text,
+        position=position,
+        content_hash=message_content_hash(sender, message_text),
+    )
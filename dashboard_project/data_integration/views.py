@@ -4,8 +4,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import get_object_or_404, redirect
 
 from .models import ExternalDataSource
-from .tasks import periodic_fetch_chat_data, refresh_specific_source
-from .utils import fetch_and_store_chat_data
+from .tasks import periodic_fetch_chat_data, queue_source_refresh, sync_source_now
 
 # Create your views here.
 
@@ -22,18 +21,26 @@ def manual_data_refresh(request):
             # Try to use Celery first
             try:
                 # Asynchronous with Celery
-                periodic_fetch_chat_data.delay()
+                periodic_fetch_chat_data.delay(force=True)
                 messages.success(
                     request,
                     "Manual data refresh triggered successfully. The data will be updated shortly.",
                 )
             except Exception:
-                # Fall back to synchronous if Celery is not available
-                fetch_and_store_chat_data()
-                messages.success(
-                    request,
-                    "Manual data refresh completed successfully (synchronous mode).",
-                )
+                # Fall back to synchronous if Celery is not available; sources that are
+                # already being synced are skipped
+                results = [
+                    sync_source_now(source_id)
+                    for source_id in ExternalDataSource.objects.filter(is_active=True).values_list("id", flat=True)
+                ]
+                errors = [str(result["error"]) for result in results if not result["success"] and not result["skipped"]]
+                if errors:
+                    messages.error(request, f"Failed to refresh data: {'; '.join(errors)}")
+                else:
+                    messages.success(
+                        request,
+                        "Manual data refresh completed successfully (synchronous mode).",
+                    )
         except Exception as e:
             messages.error(request, f"Failed to refresh data: {e}")
     return redirect(request.headers.get("referer", "dashboard"))  # Redirect to previous page or dashboard
@@ -46,8 +53,11 @@ def refresh_specific_datasource(request, source_id):
 
     try:
         # Try to use Celery
-        task = refresh_specific_source.delay(source_id)
-        messages.success(request, f"Data refresh task started for {source.name} (Task ID: {task.id})")
+        task_id, started = queue_source_refresh(source)
+        if started:
+            messages.success(request, f"Data refresh task started for {source.name} (Task ID: {task_id})")
+        else:
+            messages.info(request, f"A refresh of {source.name} is already in progress (Task ID: {task_id})")
     except Exception as e:
         messages.error(request, f"Failed to refresh data source {source.name}: {e}")
 